@@ -33,7 +33,8 @@ st.set_page_config(
 # Import components
 from components.header import load_css, render_navigation, render_footer
 from components.resume import display_resume
-from components.chatbot import display_chat_ui
+from components.chatbot import display_chat_ui, warm_up_chat, cancel_pending_answer
+from utils.telemetry import start_metrics_export
 from data.resume_data import personal_info, key_achievements
 
 def display_enhanced_header():
@@ -41,114 +42,6 @@ def display_enhanced_header():
     Display an enhanced header with modern styling and visual elements.
     Makes sure to override any existing styling.
     """
-    # Add enhanced header CSS with higher specificity and !important flags
-    st.markdown("""
-    <style>
-    /* Reset any background styles that might interfere */
-    .main-header, .header-container, div[data-testid="stAppViewContainer"] > div:first-child {
-        background: none !important;
-        background-color: transparent !important;
-        box-shadow: none !important;
-        border: none !important;
-    }
-    
-    /* Enhanced header styling with high specificity */
-    body .enhanced-header {
-        position: relative;
-        border-radius: 12px !important;
-        padding: 2rem !important;
-        margin-bottom: 1.5rem !important;
-        box-shadow: 0 4px 12px rgba(0, 0, 0, 0.2) !important;
-        border-bottom: 3px solid #3B82F6 !important;
-        overflow: hidden !important;
-        text-align: center !important;
-        z-index: 0 !important;
-    }
-    
-    /* Full-width gradient background */
-    body .enhanced-header::after {
-        content: '' !important;
-        position: absolute !important;
-        top: 0 !important;
-        left: 0 !important;
-        right: 0 !important;
-        bottom: 0 !important;
-        background: linear-gradient(90deg, #10172a 0%, #1E3A8A 85%, #1E3A8A 100%) !important;
-        background-size: 100% 100% !important;
-        z-index: 0 !important;
-    }
-    
-    /* Decorative accent */
-    body .enhanced-header::before {
-        content: '' !important;
-        position: absolute !important;
-        top: 0 !important;
-        right: 0 !important;
-        width: 300px !important;
-        height: 100% !important;
-        background: linear-gradient(135deg, rgba(96, 165, 250, 0.1) 0%, rgba(37, 99, 235, 0) 100%) !important;
-        z-index: 0 !important;
-    }
-    
-    /* Force position to ensure it's on top */
-    body .header-content {
-        position: relative !important;
-        z-index: 2 !important;
-    }
-    
-    body .header-name {
-        color: #F9FAFB !important;
-        font-size: 2.6rem !important;
-        font-weight: 700 !important;
-        margin-bottom: 0.5rem !important;
-        letter-spacing: -0.025em !important;
-    }
-    
-    body .header-title {
-        color: #60A5FA !important;
-        font-size: 1.5rem !important;
-        font-weight: 500 !important;
-        opacity: 0.95 !important;
-        letter-spacing: 0.5px !important;
-        display: flex !important;
-        align-items: center !important;
-        justify-content: center !important;
-        flex-wrap: wrap !important;
-    }
-    
-    body .header-badge {
-        display: inline-block !important;
-        background: linear-gradient(90deg, #1E40AF, #3B82F6) !important;
-        color: white !important;
-        font-size: 0.875rem !important;
-        font-weight: 500 !important;
-        padding: 0.25rem 0.75rem !important;
-        border-radius: 9999px !important;
-        margin: 0.5rem 0.75rem !important;
-        box-shadow: 0 2px 4px rgba(0, 0, 0, 0.1) !important;
-    }
-    
-    body .header-badge.aws {
-        background: linear-gradient(90deg, #FF9900, #FFC400) !important;
-        color: #0F1629 !important;
-    }
-    
-    body .header-badge.ai {
-        background: linear-gradient(90deg, #1E40AF, #3B82F6) !important;
-    }
-    
-    body .header-badge.veteran {
-        background: linear-gradient(90deg, #991B1B, #DC2626) !important;
-    }
-    
-    body .enhanced-header-container {
-        background-color: transparent !important;
-        padding: 0 !important;
-        margin-bottom: -1rem !important;
-    }
-    </style>
-    """, unsafe_allow_html=True)
-    
     # Render enhanced header with a wrapper container
     st.markdown("""
     <div class="enhanced-header-container">
@@ -192,41 +85,6 @@ def display_home():
         # Call-to-action buttons
         col_btn1, col_btn2, _ = st.columns([1.2, 1.2, 2])
 
-        # Add very specific CSS to make both buttons look identical
-        st.markdown("""
-        <style>
-        /* Style the LinkedIn link button to have blue background */
-        [data-testid="stLinkButton"] > div {
-            background-color: #F3F4F6 !important;
-            color: #1E40AF !important;
-            padding: 0.75rem 1.5rem !important;
-            border-radius: 0.5rem !important;
-            font-weight: 500 !important;
-            border: 2px solid #1E40AF !important;
-        }
-
-        /* Style the Chatbot button to have white background with blue border */
-        [data-testid="element-container"]:has(button[key="chat_button"]) button {
-            background-color: #F3F4F6 !important;
-            color: #1E40AF !important;
-            border: 2px solid #1E40AF !important;
-            padding: 0.75rem 1.5rem !important;
-            border-radius: 0.5rem !important;
-            font-weight: 500 !important;
-            font-size: 1rem !important;
-        }
-
-        /* Remove any button-specific default styles */
-        [data-testid="stLinkButton"] > div, 
-        [data-testid="element-container"]:has(button[key="chat_button"]) button {
-            box-shadow: none !important;
-            text-transform: none !important;
-            letter-spacing: normal !important;
-            height: auto !important;
-        }
-        </style>
-        """, unsafe_allow_html=True)
-
         # LinkedIn button
         with col_btn1:
             st.link_button("View My LinkedIn", "https://www.linkedin.com/in/enevoldk/", use_container_width=True)
@@ -241,69 +99,6 @@ def display_home():
         # Profile image placeholder
         st.image("https://media.licdn.com/dms/image/v2/D5603AQEzEnXV23Hz-Q/profile-displayphoto-shrink_200_200/profile-displayphoto-shrink_200_200/0/1698954572182?e=1746662400&v=beta&t=URqecwO406XNBHXRTyIhADtN23usyaTDM6DqSHS0li0", width=300)
     
-    # Add shared CSS for card styling
-    st.markdown("""
-    <style>
-    .feature-card {
-        border: 1px solid #374151;
-        border-radius: 8px;
-        padding: 1.5rem;
-        background-color: #1F2937;
-        height: 100%;
-        position: relative;
-        transition: transform 0.3s ease, box-shadow 0.3s ease, border-color 0.3s ease;
-        display: flex;
-        flex-direction: column;
-    }
-    
-    .feature-card:hover {
-        transform: translateY(-5px);
-        box-shadow: 0 10px 25px rgba(0, 0, 0, 0.3);
-        border-color: #3B82F6;
-    }
-    
-    .feature-card:before {
-        content: '';
-        position: absolute;
-        top: 0;
-        left: 0;
-        width: 100%;
-        height: 4px;
-        background: linear-gradient(90deg, #1E40AF, #3B82F6);
-        border-top-left-radius: 8px;
-        border-top-right-radius: 8px;
-    }
-    
-    .card-icon {
-        font-size: 2.5rem;
-        margin-bottom: 1.25rem;
-        transition: transform 0.3s ease;
-    }
-    
-    .feature-card:hover .card-icon {
-        transform: scale(1.1);
-    }
-    
-    .card-title {
-        color: #60A5FA;
-        font-weight: 600;
-        font-size: 1.35rem;
-        margin-top: 0;
-        margin-bottom: 1rem;
-    }
-    
-    .card-description {
-        color: #D1D5DB;
-        line-height: 1.6;
-    }
-    
-    /* Hide the hidden button */
-    button[data-testid="baseButton-secondary"]:has(+ div:contains("hidden-chat-trigger")) {
-        display: none !important;
-    }
-    </style>
-    """, unsafe_allow_html=True)
-    
     # Create three highlight cards using Streamlit columns
     st.markdown("<div style='margin-top: 2rem; margin-bottom: 2rem;'></div>", unsafe_allow_html=True)
     cards = st.columns(3)
@@ -411,125 +206,28 @@ def main():
     Main function to run the Streamlit app.
     """
     try:
+        # Warm cached chatbot answers in the background (no-op after the first run)
+        warm_up_chat()
+        
+        # Dump chat metrics for scraping when CHAT_METRICS_FILE is set (no-op after the first run)
+        start_metrics_export()
+        
         # Load CSS (page config is now at the top of the file)
         load_css()
         
         # Display enhanced header (new addition)
         display_enhanced_header()
         
-        # Custom theme settings for better accessibility
-        st.markdown(
-            """
-            <style>
-            /* Message input styling */
-            .stTextInput>div>div>input {
-                background-color: #374151;
-                color: #F3F4F6;
-            }
-            
-            /* Chat message containers */
-            .stChatMessage {
-                background-color: #1F2937;
-                border: 1px solid #374151;
-                border-radius: 8px;
-            }
-            
-            .stChatMessage.user {
-                background-color: #374151;
-            }
-            
-            /* Header styling */
-            .stApp > header {
-                background-color: #1E1E1E;
-                color: #F3F4F6;
-            }
-            
-            /* Button styling */
-            .stButton button {
-                border-radius: 0.375rem;
-                font-weight: 500;
-                transition: background-color 0.2s;
-            }
-            
-            .stButton button[data-baseweb="button"] {
-                border-radius: 0.375rem;
-            }
-            
-            .stButton button[kind="primary"] {
-                background-color: #1E40AF;
-            }
-            
-            .stButton button[kind="primary"]:hover {
-                background-color: #2563EB;
-            }
-            
-            .stButton button[kind="secondary"] {
-                background-color: #1E40AF;
-                color: #F3F4F6;
-            }
-            
-            .stButton button[kind="secondary"]:hover {
-                background-color: #4B5563;
-            }
-            
-            /* Custom styling for the chat button */
-            [data-testid="column"]:has(button[key="chat_button"]) button {
-                background-color: #F3F4F6 !important;
-                color: #F3F4F6 !important;
-                border: 2px solid #1E40AF !important;
-                font-weight: 500 !important;
-                padding: 0.75rem 1.5rem !important;
-                height: 48px !important;
-                margin-top: 1rem !important;
-                margin-bottom: 0 !important;
-                text-transform: none !important;
-                width: 100% !important;
-                transition: all 0.2s ease !important;
-                display: flex !important;
-                align-items: center !important;
-                justify-content: center !important;
-                line-height: 1.2 !important;
-                position: relative !important;
-                top: 0 !important;
-            }
-            
-            [data-testid="column"]:has(button[key="chat_button"]) button:hover {
-                background-color: #F3F4F6 !important;
-                transform: translateY(-2px) !important;
-                box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1) !important;
-            }
-            
-            /* Hide the default tabs visually but keep them for state management */
-            .stTabs [data-baseweb="tab-list"] {
-                display: none;
-            }
-            
-            /* Main content area */
-            .main .block-container {
-                background-color: #1E1E1E;
-            }
-            
-            /* Chat input area */
-            .stChatInputContainer {
-                background-color: #374151;
-                border: 1px solid #374151;
-            }
-            
-            /* Hide the hidden chat trigger button */
-            button[data-testid="baseButton-secondary"]:has(div:contains("hidden-chat-trigger")) {
-                display: none !important;
-            }
-            </style>
-            """,
-            unsafe_allow_html=True,
-        )
-
         # Render navigation and get tabs (tabs are hidden but used for state)
         tabs = render_navigation()
         
         # Display content based on current tab in session state
         current_tab = st.session_state.get('current_tab', 'Home')
         
+        # Leaving the chat aborts an answer still being generated
+        if current_tab != "Chat With Assistant":
+            cancel_pending_answer("navigation")
+        
         if current_tab == "Home":
             display_home()
         elif current_tab == "Resume":
@@ -3,112 +3,96 @@ Chatbot component for portfolio website using streamlit-chat for UI and Claude A
 """
 
 import streamlit as st
-from utils.claude_api import ClaudeChat, MockClaudeChat
+from utils.claude_api import IdempotencyGuard, make_idempotency_key
+from utils.chat_registry import get_chat_backend, compute_data_version
+from utils.response_cache import CachedChat, get_response_cache
+from utils.warmup import collect_warmup_questions, start_warmup
+from utils.conversation_memory import ConversationMemory
+from utils.chat_workers import get_chat_worker_pool
+from utils.admission import get_admission_controller
+from utils.chat_engine import (
+    ChatEngine, build_chat_client, build_prefetch_chat, normalize_history, user_message,
+    assistant_message, export_json, export_markdown
+)
+from utils.prefetch import prefetch_candidates
+from utils.faq_matcher import faq_matching_enabled
 from data.resume_data import (
     personal_info, skills, work_experience, certifications, 
-    key_achievements, chatbot_context
+    testimonials, key_achievements, chatbot_context
 )
 import os
-import json
 from datetime import datetime
-import time
-import requests
 import logging
+import uuid
 
 # Configure component-level logging
 logger = logging.getLogger(__name__)
 
-def load_chatbot_css():
-    """
-    Load custom CSS for the chatbot component.
-    """
-    st.markdown("""
-    <style>
-    /* Chat message container styling for dark mode */
-    .chat-message {
-        padding: 1.5rem; 
-        border-radius: 0.5rem; 
-        margin-bottom: 1rem; 
-        display: flex;
-        background: #1F2937; /* Dark background */
-        color: #F3F4F6;      /* Light text */
-    }
-    .chat-message.user {
-        background: #374151; /* Slightly lighter for user messages */
-    }
-    .chat-message.assistant {
-        background: #1F2937; /* Dark for assistant messages */
-    }
-    .chat-message .avatar {
-        width: 40px; 
-        min-width: 40px; 
-        margin-right: 1rem;
-    }
-    .chat-message .avatar img {
-        max-width: 100%; 
-        max-height: 100%; 
-        border-radius: 50%;
-    }
-    .chat-message .message {
-        width: 100%;
-    }
-    /* Quick question buttons */
-    .quick-question {
-        display: inline-block;
-        margin: 0.25rem;
-        padding: 0.5rem 1rem;
-        background: #1E40AF;
-        color: #F3F4F6;
-        border-radius: 20px;
-        cursor: pointer;
-        font-size: 0.875rem;
-        transition: all 0.2s;
-    }
-    .quick-question:hover {
-        background: #2563EB;
-        transform: translateY(-1px);
-    }
-    /* Typing indicator */
-    .typing-indicator {
-        display: flex;
-        align-items: center;
-        margin: 1rem 0;
-    }
-    .typing-dot {
-        width: 8px;
-        height: 8px;
-        margin: 0 2px;
-        background-color: #1E40AF;
-        border-radius: 50%;
-        animation: typing 1s infinite ease-in-out;
-    }
-    .typing-dot:nth-child(2) { animation-delay: 0.2s; }
-    .typing-dot:nth-child(3) { animation-delay: 0.4s; }
-    @keyframes typing {
-        0%, 100% { transform: translateY(0); }
-        50% { transform: translateY(-10px); }
-    }
-    /* Dark mode input styling */
-    .stTextInput > div > div > input {
-        border-radius: 20px;
-        background-color: #374151;
-        color: #F3F4F6;
-        border: 1px solid #374151;
-    }
-    /* Dark mode button styling */
-    .stButton>button {
-        border-radius: 20px;
-        padding: 0.5rem 1rem;
-        background-color: #1E40AF;
-        color: #F3F4F6;
-        border: none;
-    }
-    </style>
-    """, unsafe_allow_html=True)
+# All resume data used as chatbot context, versioned once per import
+RESUME_DATA = {
+    "personal_info": personal_info,
+    "skills": skills,
+    "work_experience": work_experience,
+    "certifications": certifications,
+    "testimonials": testimonials,
+    "key_achievements": key_achievements,
+    "chatbot_context": chatbot_context
+}
+RESUME_DATA_VERSION = compute_data_version(RESUME_DATA)
+
+# Quick question buttons shown by render_quick_questions
+QUICK_QUESTIONS = [
+    "What are your key AWS skills?",
+    "Tell me about your recent projects",
+    "What certifications do you have?",
+    "What's your experience with AI/ML?",
+    "Describe your leadership experience",
+    "What are your career achievements?"
+]
+
+# Quick question buttons shown by display_chatbot (extended with FAQs at render time)
+CHATBOT_QUICK_QUESTIONS = [
+    "What are your core skills?",
+    "Tell me about your experience with AWS",
+    "What AI projects have you worked on?",
+    "How do you approach technical training?",
+    "What are you looking for in your next role?",
+    "Can you share some testimonials?"
+]
+
+# Every fixed question we can answer ahead of time (FAQs only when they aren't answered locally)
+WARMUP_QUESTIONS = collect_warmup_questions([QUICK_QUESTIONS, CHATBOT_QUICK_QUESTIONS],
+                                            None if faq_matching_enabled() else chatbot_context)
+
+# Likely follow-up questions in display_chat_ui, prefetched when CHAT_PREFETCH=1
+PREFETCH_CANDIDATES = prefetch_candidates(QUICK_QUESTIONS, chatbot_context)
+
+# Shown while an answer waits in the admission queue for the upstream API
+QUEUE_POSITION_HTML = """
+<div class="queue-position">
+    Lots of visitors right now — you're number {position} in line. Your answer will start shortly.
+</div>
+"""
+
+# Shown while an answer is pending and no text has arrived yet
+TYPING_INDICATOR_HTML = """
+<div class="typing-indicator">
+    <div class="typing-dot"></div>
+    <div class="typing-dot"></div>
+    <div class="typing-dot"></div>
+</div>
+"""
+
+# Marks the chat page, so the stylesheet can scope its chat-only input and button styles
+CHAT_PAGE_MARKER_HTML = '<div class="chat-page"></div>'
 
 def initialize_chat(resume_data):
     """
-    Initialize the chat component with Claude API or mock version.
+    Initialize the chat client for the current session with Claude API or mock version.
+    
+    See utils.chat_engine.build_chat_client for the layers (FAQ answers, rate
+    limits, retries and circuit breaker, answer cache, telemetry) around the
+    shared backend.
     
     Args:
         resume_data: Dictionary with resume information for context
@@ -116,20 +100,133 @@ def initialize_chat(resume_data):
     Returns:
         Initialized chat client
     """
-    # Get API key from session state or environment
-    api_key = st.session_state.get('anthropic_api_key', os.environ.get("ANTHROPIC_API_KEY", ""))
+    data_version = RESUME_DATA_VERSION if resume_data is RESUME_DATA else compute_data_version(resume_data)
+    return build_chat_client(resume_data, get_api_key(), data_version=data_version,
+                             session_id=get_session_id(), client_ip=get_client_ip())
+
+def get_api_key():
+    """
+    Get the Anthropic API key for the current session.
     
-    # Initialize chat client (real or mock based on API key availability)
-    if api_key:
-        chat_client = ClaudeChat(api_key=api_key)
-    else:
-        # For development/demo without API key, use mock responses
-        chat_client = MockClaudeChat()
+    Returns:
+        The key entered in API Settings, else ANTHROPIC_API_KEY, else ""
+    """
+    return st.session_state.get('anthropic_api_key', os.environ.get("ANTHROPIC_API_KEY", ""))
+
+def get_chat_engine():
+    """
+    Get the chat engine for the current session.
     
-    # Set system prompt with resume context
-    chat_client.set_system_prompt(resume_data)
+    Returns:
+        A ChatEngine over the session's chat client and conversation memory,
+        prefetching likely follow-ups if enabled
+    """
+    prefetch_chat = build_prefetch_chat(RESUME_DATA, get_api_key(), data_version=RESUME_DATA_VERSION)
+    return ChatEngine(initialize_chat(RESUME_DATA), get_conversation_memory(), prefetch_chat=prefetch_chat)
+
+def get_chat_history(greeting=None):
+    """
+    Get the current session's chat history in the engine's {"role", "content"} format.
+    
+    Args:
+        greeting: Optional assistant message to start a new conversation with
+    
+    Returns:
+        The session's chat history list
+    """
+    if 'chat_history' not in st.session_state:
+        st.session_state.chat_history = [assistant_message(greeting)] if greeting else []
+    elif any("role" not in message for message in st.session_state.chat_history):
+        # Upgrade a history started by an older version of the app
+        st.session_state.chat_history = normalize_history(st.session_state.chat_history)
+    return st.session_state.chat_history
+
+def warm_up_chat():
+    """
+    Start the background warm-up of quick-question answers (and FAQ answers
+    when FAQ matching is off).
+    
+    Runs once per process and resume data version, using the server's
+    ANTHROPIC_API_KEY only (never a visitor's session key). Set CHAT_WARMUP=0
+    to disable it.
     
-    return chat_client
+    Returns:
+        The WarmupJob, or None if warm-up is disabled or no server key is set
+    """
+    api_key = os.environ.get("ANTHROPIC_API_KEY", "")
+    if not api_key or os.environ.get("CHAT_WARMUP", "1") == "0":
+        return None
+    
+    backend = get_chat_backend(api_key, RESUME_DATA, data_version=RESUME_DATA_VERSION)
+    chat = CachedChat(backend, get_response_cache(), RESUME_DATA_VERSION)
+    return start_warmup(chat, WARMUP_QUESTIONS)
+
+def get_session_id():
+    """
+    Get a stable identifier for the current visitor session.
+    
+    Returns:
+        The session identifier as a hex string
+    """
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+    return st.session_state.session_id
+
+def get_client_ip():
+    """
+    Get the visitor's IP address from the request headers.
+    
+    Clients can send any X-Forwarded-For header, so it is ignored by default
+    and the connection's address is used. Behind reverse proxies, set
+    TRUSTED_PROXY_HOPS to their number to use the entry appended by the
+    outermost one (the TRUSTED_PROXY_HOPS-th from the end).
+    
+    Returns:
+        The address seen by the trusted proxy, the connection's address, or
+        None if neither is available
+    """
+    try:
+        headers = st.context.headers
+    except AttributeError:
+        # st.context is only available in newer Streamlit versions
+        return None
+    hops = int(os.environ.get("TRUSTED_PROXY_HOPS", "0"))
+    if hops > 0:
+        forwarded = [entry.strip() for entry in headers.get("X-Forwarded-For", "").split(",") if entry.strip()]
+        if len(forwarded) >= hops:
+            return forwarded[-hops]
+    return getattr(st.context, "ip_address", None)
+
+def accept_submission(message):
+    """
+    Check a chat submission against the session's idempotency guard.
+    
+    Args:
+        message: The submitted message
+    
+    Returns:
+        True if the message should be processed, False for a double submission
+    """
+    if 'submission_guard' not in st.session_state:
+        st.session_state.submission_guard = IdempotencyGuard(
+            window_seconds=float(os.environ.get("CHAT_DUPLICATE_WINDOW", "5"))
+        )
+    
+    accepted = st.session_state.submission_guard.accept(make_idempotency_key(get_session_id(), message))
+    if not accepted:
+        logger.info("Dropped duplicate chat submission")
+    return accepted
+
+def get_conversation_memory():
+    """
+    Get the token-budgeted conversation memory for the current session.
+    
+    Returns:
+        The session's ConversationMemory
+    """
+    if 'conversation_memory' not in st.session_state:
+        st.session_state.conversation_memory = ConversationMemory.from_env()
+    return st.session_state.conversation_memory
 
 def display_api_key_input():
     """
@@ -154,13 +251,16 @@ def display_api_key_input():
             st.success("API key saved for this session!")
             st.rerun()
 
-def render_chat_message(message, is_user=False):
+def chat_message_html(message, is_user=False):
     """
-    Render a single chat message with the appropriate styling.
+    Build the HTML for a single chat message with the appropriate styling.
     
     Args:
         message: The message text to display
         is_user: Whether this is a user message (True) or assistant message (False)
+    
+    Returns:
+        The chat message markup as a string
     """
     if is_user:
         avatar_url = "https://ui-avatars.com/api/?name=You&background=60A5FA&color=fff"
@@ -171,31 +271,101 @@ def render_chat_message(message, is_user=False):
         alignment = "flex-start"
         message_type = "assistant"
     
-    st.markdown(f"""
+    return f"""
     <div class="chat-message {message_type}" style="align-self: {alignment};">
         <div class="avatar">
             <img src="{avatar_url}">  
         </div>
         <div class="message">{message}</div>
     </div>
-    """, unsafe_allow_html=True)
+    """
+
+def render_chat_message(message, is_user=False):
+    """
+    Render a single chat message with the appropriate styling.
+    
+    Args:
+        message: The message text to display
+        is_user: Whether this is a user message (True) or assistant message (False)
+    """
+    st.markdown(chat_message_html(message, is_user), unsafe_allow_html=True)
+
+def render_pending_response(placeholder, job, poll_interval=0.25,
+                            message_html=chat_message_html, typing_html=TYPING_INDICATOR_HTML):
+    """
+    Render an answer being generated on the worker pool until it finishes.
+    
+    The placeholder is refreshed at least every poll_interval, so a rerun
+    triggered by the visitor interrupts the wait while the job keeps running.
+    While the request waits in the admission queue, the visitor's place in
+    line is shown instead of the typing indicator.
+    
+    Args:
+        placeholder: The st.empty() placeholder to render into
+        job: The session's ChatJob
+        poll_interval: Maximum seconds between refreshes
+        message_html: Function building an assistant message's markup from its text
+        typing_html: Markup shown until the first chunk arrives
+    
+    Returns:
+        The full response text once the job is done
+    """
+    seen = 0
+    while not job.done:
+        text = job.text
+        position = None if text else get_admission_controller().position(job.token)
+        if text:
+            placeholder.markdown(message_html(text + " ▌"), unsafe_allow_html=True)
+        elif position:
+            placeholder.markdown(QUEUE_POSITION_HTML.format(position=position), unsafe_allow_html=True)
+        else:
+            # Typing indicator until the first chunk arrives
+            placeholder.markdown(typing_html, unsafe_allow_html=True)
+        seen = job.wait_for_update(seen, poll_interval)
+    
+    response = job.text
+    placeholder.markdown(message_html(response), unsafe_allow_html=True)
+    return response
+
+def stopped_answer(job):
+    """
+    Build the chat entry for an answer that was cancelled before it finished.
+    
+    Args:
+        job: The cancelled ChatJob
+    
+    Returns:
+        The partial answer marked as stopped
+    """
+    text = job.text.rstrip()
+    return f"{text} … (stopped)" if text else "(Stopped before answering.)"
+
+def cancel_pending_answer(reason):
+    """
+    Cancel the session's answer still being generated, if any.
+    
+    The upstream request is aborted and whatever was generated so far is
+    kept in the chat history, marked as stopped.
+    
+    Args:
+        reason: Why the answer was cancelled ("navigation", "resubmitted", ...)
+    
+    Returns:
+        True if an answer was cancelled
+    """
+    job = get_chat_worker_pool().cancel(get_session_id(), reason)
+    if job is None:
+        return False
+    get_chat_history().append(assistant_message(stopped_answer(job)))
+    return True
 
 def render_quick_questions():
     """
     Display quick question buttons for common queries.
     """
     st.markdown("#### Quick Questions")
-    questions = [
-        "What are your key AWS skills?",
-        "Tell me about your recent projects",
-        "What certifications do you have?",
-        "What's your experience with AI/ML?",
-        "Describe your leadership experience",
-        "What are your career achievements?"
-    ]
-    
     cols = st.columns(2)
-    for i, question in enumerate(questions):
+    for i, question in enumerate(QUICK_QUESTIONS):
         with cols[i % 2]:
             if st.button(question, key=f"quick_q_{i}", use_container_width=True):
                 return question
@@ -205,50 +375,75 @@ def export_conversation():
     """
     Export the current conversation history to a JSON file.
     """
-    if not st.session_state.chat_history:
+    chat_history = get_chat_history()
+    if not chat_history:
         st.warning("  No conversation to export yet! Ask a question first.")
         return
-        
-    # Prepare conversation data
-    conversation_data = {
-        "timestamp": datetime.now().isoformat(),
-        "messages": st.session_state.chat_history
-    }
-    
-    # Convert to JSON string
-    json_str = json.dumps(conversation_data, indent=2)
     
     # Create download button
     st.download_button(
         label="📥 Export Conversation",
-        data=json_str,
+        data=export_json(chat_history),
         file_name=f"conversation_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
         mime="application/json"
     )
 
+def submit_question(engine, chat_history, question, with_history=True):
+    """
+    Add a question to the chat and start generating its answer in the background.
+    
+    An answer still being generated for the session is cancelled first.
+    
+    Args:
+        engine: The session's ChatEngine
+        chat_history: The session's chat history
+        question: The submitted question
+        with_history: Send prior turns with the question
+    
+    Returns:
+        The ChatJob generating the answer
+    """
+    session_id = get_session_id()
+    
+    # A new question supersedes an answer still being generated
+    if engine.workers.busy(session_id):
+        cancel_pending_answer("resubmitted")
+    
+    chat_history.append(user_message(question))
+    return engine.submit(session_id, chat_history[:-1], question, with_history=with_history)
+
+def collect_pending_answer(placeholder, chat_history, **render_options):
+    """
+    Stream the session's pending answer into a placeholder and add it to the chat once done.
+    
+    Args:
+        placeholder: The st.empty() placeholder to render into
+        chat_history: The session's chat history
+        **render_options: Passed through to render_pending_response (e.g. message_html)
+    
+    Returns:
+        True if an answer was collected, False if none was pending
+    """
+    workers = get_chat_worker_pool()
+    session_id = get_session_id()
+    job = workers.get(session_id)
+    if job is None:
+        return False
+    
+    response = render_pending_response(placeholder, job, **render_options)
+    workers.finish(session_id, job)
+    chat_history.append(assistant_message(response))
+    return True
+
 def display_chat_ui():
     """
     Display the chat interface and handle message exchanges.
     """
-    # Create a dictionary with all resume data for context
-    resume_data = {
-        "personal_info": personal_info,
-        "skills": skills,
-        "work_experience": work_experience,
-        "certifications": certifications,
-        "key_achievements": key_achievements,
-        "chatbot_context": chatbot_context
-    }
-    
-    # Initialize chat history in session state if it doesn't exist
-    if 'chat_history' not in st.session_state:
-        st.session_state.chat_history = []
+    chat_history = get_chat_history()
+    engine = get_chat_engine()
     
-    # Get chat client
-    chat_client = initialize_chat(resume_data)
-    
-    # Load custom CSS
-    load_chatbot_css()
+    # Mark the page for the chat styles
+    st.markdown(CHAT_PAGE_MARKER_HTML, unsafe_allow_html=True)
     
     # Create columns for title and export button
     col1, col2 = st.columns([3, 1])
@@ -262,11 +457,12 @@ def display_chat_ui():
     # Display quick questions
     quick_question = render_quick_questions()
     
-    # Display chat history
+    # Display chat history, with a slot for an answer still being generated
     chat_container = st.container()
     with chat_container:
-        for message in st.session_state.chat_history:
-            render_chat_message(message["text"], message["is_user"])
+        for message in chat_history:
+            render_chat_message(message["content"], message["role"] == "user")
+        pending_placeholder = st.empty()
     
     # User input
     with st.form(key="chat_form", clear_on_submit=True):
@@ -278,121 +474,22 @@ def display_chat_ui():
 )
         submit_button = st.form_submit_button("Send message")
     
-    # Process user input when submitted
-    if submit_button and user_input or quick_question:
-        input_text = quick_question if quick_question else user_input
-        
-        # Add user message to chat history
-        st.session_state.chat_history.append(
-            {"text": input_text, "is_user": True}
-        )
-        
-        # Show typing indicator
-        with st.empty():
-            st.markdown("""
-            <div class="typing-indicator">
-                <div class="typing-dot"></div>
-                <div class="typing-dot"></div>
-                <div class="typing-dot"></div>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            # Get response from Claude
-            response = chat_client.get_response(input_text)
-            
-            # Add assistant response to chat history
-            st.session_state.chat_history.append(
-                {"text": response, "is_user": False}
-            )
-        
-        # Rerun to update UI
+    # Process user input when submitted, dropping double submissions
+    input_text = quick_question if quick_question else (user_input if submit_button else None)
+    if input_text and accept_submission(input_text):
+        # Typed follow-ups carry a token-budgeted view of the conversation;
+        # quick questions stand alone so they can be answered from the cache
+        submit_question(engine, chat_history, input_text, with_history=not quick_question)
+        
+        # Rerun to show the question while the answer is generated
         st.rerun()
-
-def call_anthropic_api(prompt, api_key):
-    """
-    Call the Anthropic Claude API with the given prompt.
-    
-    Args:
-        prompt: The user's query
-        api_key: Anthropic API key
     
-    Returns:
-        The generated response text or an error message
-    """
-    try:
-        url = "https://api.anthropic.com/v1/messages"
-        headers = {
-            "x-api-key": api_key,
-            "content-type": "application/json",
-            "anthropic-version": "2023-06-01"
-        }
-        
-        # Build system prompt with context
-        system_prompt = f"""
-        You are an AI assistant representing {personal_info['name']}, a {personal_info['title']}. 
-        Your task is to answer questions about {personal_info['name']}'s background, experience, skills, and qualifications.
-        
-        Here's information about {personal_info['name']} to help you respond accurately:
-        
-        PERSONAL SUMMARY:
-        {personal_info['summary']}
-        
-        KEY STRENGTHS:
-        {', '.join(chatbot_context['strengths'])}
-        
-        UNIQUE SELLING POINTS:
-        {', '.join(chatbot_context['unique_selling_points'])}
-        
-        JOB PREFERENCES:
-        {', '.join(chatbot_context['job_seeking_preferences'])}
-        
-        PROJECT HIGHLIGHTS:
-        """
-        
-        # Add project highlights
-        for project in chatbot_context.get('project_highlights', []):
-            system_prompt += f"\n- {project['name']}: {project['description']}"
-            system_prompt += f"\n  Technologies: {', '.join(project['technologies'])}"
-        
-        # Add FAQs for context
-        system_prompt += "\n\nFREQUENTLY ASKED QUESTIONS:"
-        for faq in chatbot_context.get('frequently_asked_questions', []):
-            system_prompt += f"\n- Q: {faq['question']}"
-            system_prompt += f"\n  A: {faq['answer']}"
-            
-        system_prompt += """
-        
-        IMPORTANT INSTRUCTIONS:
-        1. Always represent yourself as if you are a personal AI assistant for{personal_info['name']}. 
-        2. Be professional but conversational in your tone.
-        3. If asked about your AI nature, politely redirect to {personal_info['name']}'s qualifications.
-        4. Keep responses concise and focused on {personal_info['name']}'s professional background.
-        5. If you don't have specific information, say so rather than inventing details.
-        """
-        
-        data = {
-            "model": "claude-instant-1",
-            "max_tokens": 500,
-            "messages": [{"role": "user", "content": prompt}],
-            "system": system_prompt
-        }
-        
-        response = requests.post(url, headers=headers, json=data)
-        response.raise_for_status()
-        
-        # Extract the response content
-        response_data = response.json()
-        return response_data["content"][0]["text"]
-    
-    except requests.exceptions.RequestException as e:
-        logger.error(f"API request error: {str(e)}")
-        return f"Sorry, I encountered an error communicating with the AI service. Error: {str(e)}"
-    except (KeyError, json.JSONDecodeError, IndexError) as e:
-        logger.error(f"Response parsing error: {str(e)}")
-        return "Sorry, I couldn't process the response from the AI service."
-    except Exception as e:
-        logger.error(f"Unexpected error: {str(e)}")
-        return f"An unexpected error occurred: {str(e)}"
+    # Stream a pending answer into the chat; the job survives reruns within the chat tab
+    if collect_pending_answer(pending_placeholder, chat_history):
+        # While the visitor reads, answer the questions they are likely to ask next
+        engine.prefetch(get_session_id(), chat_history, PREFETCH_CANDIDATES)
+        # Rerun to update UI
+        st.rerun()
 
 def format_message(message, is_user=False):
     """
@@ -420,37 +517,22 @@ def display_chatbot():
     Display the interactive chatbot component.
     """
     try:
-        load_chatbot_css()
+        st.markdown(CHAT_PAGE_MARKER_HTML, unsafe_allow_html=True)
         
         st.markdown("## Chat with Me")
         st.markdown("Ask me anything about my experience, skills, or how I can help your organization.")
         
-        # Initialize chat history in session state if it doesn't exist
-        if 'chat_history' not in st.session_state:
-            st.session_state.chat_history = [
-                {
-                    "role": "assistant", 
-                    "content": f"Hi there! I'm {personal_info['name']}, a {personal_info['title']}. How can I help you today?"
-                }
-            ]
-        
-        # Initialize typing state
-        if 'is_typing' not in st.session_state:
-            st.session_state.is_typing = False
+        # Start the conversation with a greeting if it doesn't exist yet
+        chat_history = get_chat_history(
+            greeting=f"Hi there! I'm {personal_info['name']}, a {personal_info['title']}. How can I help you today?"
+        )
         
         # Quick question buttons
         st.markdown("<div class='quick-questions'>", unsafe_allow_html=True)
         col1, col2, col3 = st.columns(3)
         
         # Define quick questions from FAQs and common queries
-        quick_questions = [
-            "What are your core skills?",
-            "Tell me about your experience with AWS",
-            "What AI projects have you worked on?",
-            "How do you approach technical training?",
-            "What are you looking for in your next role?",
-            "Can you share some testimonials?"
-        ]
+        quick_questions = list(CHATBOT_QUICK_QUESTIONS)
         
         # Additional questions from FAQs
         if 'frequently_asked_questions' in chatbot_context:
@@ -459,27 +541,12 @@ def display_chatbot():
                     quick_questions.append(faq['question'])
         
         # Display quick question buttons
-        with col1:
-            for i in range(0, min(3, len(quick_questions))):
-                if st.button(quick_questions[i], key=f"quick_{i}", use_container_width=True):
-                    st.session_state.chat_history.append({"role": "user", "content": quick_questions[i]})
-                    st.session_state.is_typing = True
-                    st.experimental_rerun()
-        
-        with col2:
-            for i in range(3, min(6, len(quick_questions))):
-                if st.button(quick_questions[i], key=f"quick_{i}", use_container_width=True):
-                    st.session_state.chat_history.append({"role": "user", "content": quick_questions[i]})
-                    st.session_state.is_typing = True
-                    st.experimental_rerun()
-        
-        with col3:
-            for i in range(6, min(9, len(quick_questions))):
-                if i < len(quick_questions):
+        quick_question = None
+        for col, first in ((col1, 0), (col2, 3), (col3, 6)):
+            with col:
+                for i in range(first, min(first + 3, len(quick_questions))):
                     if st.button(quick_questions[i], key=f"quick_{i}", use_container_width=True):
-                        st.session_state.chat_history.append({"role": "user", "content": quick_questions[i]})
-                        st.session_state.is_typing = True
-                        st.experimental_rerun()
+                        quick_question = quick_questions[i]
         
         st.markdown("</div>", unsafe_allow_html=True)
         
@@ -489,15 +556,14 @@ def display_chatbot():
             st.markdown('<div class="chat-container">', unsafe_allow_html=True)
             
             # Display chat history
-            for message in st.session_state.chat_history:
+            for message in chat_history:
                 st.markdown(
                     format_message(message["content"], message["role"] == "user"),
                     unsafe_allow_html=True
                 )
             
-            # Show typing indicator if applicable
-            if st.session_state.is_typing:
-                st.markdown(display_typing_indicator(), unsafe_allow_html=True)
+            # Slot for an answer still being generated
+            typing_placeholder = st.empty()
             
             st.markdown('</div>', unsafe_allow_html=True)
         
@@ -522,54 +588,32 @@ def display_chatbot():
                 type="password",
                 help="Your API key will not be stored permanently"
             )
+        if api_key:
+            # Kept for this session only, like display_api_key_input
+            st.session_state['anthropic_api_key'] = api_key
         
         # Add export conversation button
         if st.button("Export Conversation", key="export_chat"):
-            # Create text representation of the conversation
-            export_text = "# Conversation with Portfolio Chatbot\n\n"
-            for msg in st.session_state.chat_history:
-                role = "You" if msg["role"] == "user" else personal_info['name']
-                export_text += f"**{role}**: {msg['content']}\n\n"
-            
             # Create download link
             st.download_button(
                 label="Download Conversation",
-                data=export_text,
+                data=export_markdown(chat_history, personal_info['name']),
                 file_name="portfolio_chat_export.md",
                 mime="text/markdown"
             )
         
-        # Process new message if submitted
-        if submit_button and user_input:
-            # Add user message to chat history
-            st.session_state.chat_history.append({"role": "user", "content": user_input})
-            st.session_state.is_typing = True
-            st.experimental_rerun()
+        # Process new message if submitted, dropping double submissions
+        input_text = quick_question or (user_input if submit_button else None)
+        if input_text and accept_submission(input_text):
+            # The answer is generated by the shared chat engine, with the conversation so far
+            submit_question(get_chat_engine(), chat_history, input_text)
+            st.rerun()
         
-        # Process the response if we're in typing state
-        if st.session_state.is_typing:
-            # Get the last user message
-            last_user_message = next((msg["content"] for msg in reversed(st.session_state.chat_history) 
-                                     if msg["role"] == "user"), None)
-            
-            if last_user_message:
-                # Small delay to simulate typing
-                time.sleep(0.5)
-                
-                # Use a default API key if not provided
-                current_api_key = api_key if api_key else "dummy-api-key-for-demo-purposes"
-                
-                # Get response from API
-                response = call_anthropic_api(last_user_message, current_api_key)
-                
-                # Add response to chat history
-                st.session_state.chat_history.append({"role": "assistant", "content": response})
-                
-                # Turn off typing indicator
-                st.session_state.is_typing = False
-                
-                # Rerun to update the UI
-                st.experimental_rerun()
+        # Show the pending answer with the typing indicator; a click interrupts the wait, not the job
+        if collect_pending_answer(typing_placeholder, chat_history,
+                                  message_html=format_message, typing_html=display_typing_indicator()):
+            # Rerun to update the UI
+            st.rerun()
     
     except Exception as e:
         logger.error(f"Error in display_chatbot: {str(e)}")
@@ -4,134 +4,16 @@ Header component for portfolio website with navigation and theming.
 
 import streamlit as st
 
+from utils.css_bundle import stylesheet_html
+
 def load_css():
     """
-    Load custom CSS for styling the entire application.
-    """
-    st.markdown("""
-    <style>
-        /* Main styling */
-        @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap');
-
-        html, body, [class*="css"] {
-            font-family: 'Inter', sans-serif;
-        }
-        
-        /* Override Streamlit's default header styling */
-        .stMarkdown h1, abcdefg123
-        .stMarkdown h2, 
-        .stMarkdown h3,
-        h1, h2, h3,
-        div.stMarkdown h1,
-        div.stMarkdown h2,
-        div.stMarkdown h3 {
-            color: #F3F4F6 !important;
-            font-family: 'Inter', sans-serif !important;
-        }
+    Load the application's stylesheet (styles/*.css, bundled by utils.css_bundle).
 
-        /* Ensure markdown headers also follow the theme */
-        .element-container div.stMarkdown h1,
-        .element-container div.stMarkdown h2,
-        .element-container div.stMarkdown h3 {
-            color: #F3F4F6 !important;
-        }
-        
-        /* Header styling */
-        .main-header {
-            background-color: #1E1E1E;
-            padding: 1.5rem 0;
-            border-bottom: 1px solid #2D3748;
-            margin-bottom: 2rem;
-            box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.1), 0 2px 4px -1px rgba(0, 0, 0, 0.06);
-        }
-        
-        .header-container {
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            max-width: 1200px;
-            margin: 0 auto;
-            padding: 0 1rem;
-        }
-        
-        .header-text {
-            font-size: 1.5rem;
-            font-weight: 600;
-            color: #F3F4F6 !important;
-            margin: 0;
-        }
-        
-        /* Custom navigation styling */
-        .nav-container {
-            display: flex;
-            justify-content: center;
-            gap: 0.5rem;
-            margin: 1rem 0 2rem 0;
-            flex-wrap: wrap;
-        }
-        
-        .nav-tab {
-            display: inline-block;
-            background-color: #1E40AF;
-            color: #F3F4F6;
-            padding: 0.75rem 1.5rem;
-            border-radius: 0.375rem;
-            text-decoration: none;
-            font-weight: 500;
-            transition: background-color 0.2s;
-            cursor: pointer;
-            text-align: center;
-            min-width: 150px;
-        }
-        
-        .nav-tab:hover {
-            background-color: #2563EB;
-        }
-        
-        .nav-tab.active {
-            background-color: #2563EB;
-            box-shadow: 0 0 0 2px #60A5FA;
-        }
-        
-        /* Hide default streamlit tabs */
-        .stTabs {
-            display: none !important;
-        }
-        
-        /* Responsive adjustments */
-        @media (max-width: 768px) {
-            .nav-container {
-                flex-direction: column;
-                width: 100%;
-            }
-            
-            .nav-tab {
-                width: 100%;
-            }
-            
-            .header-text {
-                font-size: 1.2rem;
-            }
-        }
-        
-        /* Footer styling */
-        footer {
-            text-align: center;
-            padding: 2rem 0;
-            margin-top: 3rem;
-            border-top: 1px solid #374151;
-            color: #D1D5DB;
-        }
-    </style>
-    """, unsafe_allow_html=True)
-    
-    # Add custom script for tab functionality
-    st.markdown("""
-    <script>
-    // This script will be ignored by Streamlit, but we're keeping it for documentation
-    // The actual functionality is handled through the click event in Python
-    </script>
-    """, unsafe_allow_html=True)
+    The stylesheet is a single content-hashed static file, so each rerun only
+    sends a <link> to it and browsers fetch it once.
+    """
+    st.markdown(stylesheet_html(), unsafe_allow_html=True)
 
 def render_navigation():
     """
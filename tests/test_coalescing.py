@@ -0,0 +1,115 @@
+"""
+Tests for sharing one upstream stream between sessions (utils.claude_api.RequestCoalescer).
+"""
+
+import threading
+import time
+
+from utils.claude_api import RequestCoalescer
+from utils.chat_workers import ChatWorkerPool
+
+
+class GatedStream:
+    """An upstream stream that sends its first chunks, then waits for the test before finishing."""
+
+    def __init__(self):
+        self.calls = 0
+        self.closed = threading.Event()
+        self.gate = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        try:
+            yield "a "
+            yield "b "
+            yield "c "
+            self.gate.wait(5)
+            yield "d"
+        finally:
+            self.closed.set()
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_follower_gets_full_answer_when_leader_session_is_cancelled():
+    coalescer = RequestCoalescer()
+    upstream = GatedStream()
+    pool = ChatWorkerPool(max_workers=4, abandon_after=0)
+
+    leader = pool.submit("session-a", "q", coalescer.stream, "key", upstream)
+    wait_for(lambda: len(leader.chunks) == 3)
+    follower = pool.submit("session-b", "q", coalescer.stream, "key", upstream)
+    wait_for(lambda: len(follower.chunks) == 3)
+
+    pool.cancel("session-a", "navigation")
+    time.sleep(0.05)
+    assert not upstream.closed.is_set()
+
+    upstream.gate.set()
+    wait_for(lambda: follower.done)
+    assert follower.text == "a b c d"
+    assert follower.error is None
+    assert leader.text == "a b c "
+    assert upstream.calls == 1
+    assert coalescer.in_flight() == 0
+
+
+def test_upstream_stream_is_closed_once_every_session_has_gone():
+    coalescer = RequestCoalescer()
+    upstream = GatedStream()
+    pool = ChatWorkerPool(max_workers=4, abandon_after=0)
+
+    first = pool.submit("session-a", "q", coalescer.stream, "key", upstream)
+    second = pool.submit("session-b", "q", coalescer.stream, "key", upstream)
+    wait_for(lambda: len(first.chunks) == 3 and len(second.chunks) == 3)
+
+    pool.cancel("session-a", "navigation")
+    assert not upstream.closed.wait(0.1)
+    pool.cancel("session-b", "resubmitted")
+    wait_for(lambda: first.done and second.done)
+
+    upstream.gate.set()
+    assert upstream.closed.wait(5)
+    wait_for(lambda: coalescer.in_flight() == 0)
+
+    # A new request for the same key starts a fresh upstream call
+    third = pool.submit("session-c", "q", coalescer.stream, "key", upstream)
+    wait_for(lambda: third.done)
+    assert third.text == "a b c d"
+    assert upstream.calls == 2
+
+
+def test_errors_are_shared_with_every_waiter():
+    coalescer = RequestCoalescer()
+    started = threading.Event()
+    release = threading.Event()
+
+    def failing():
+        started.set()
+        release.wait(5)
+        raise ValueError("upstream failed")
+
+    results = []
+
+    def call():
+        try:
+            coalescer.run("key", failing)
+        except ValueError as e:
+            results.append(str(e))
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    threads[0].start()
+    started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    wait_for(lambda: coalescer.followers == 2)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert results == ["upstream failed"] * 3
+    assert coalescer.leaders == 1
@@ -0,0 +1,49 @@
+"""
+Tests for local FAQ answers (utils.faq_matcher) and their relaxed use while shedding load.
+"""
+
+from components.chatbot import RESUME_DATA
+from utils.faq_matcher import FAQMatcher
+from utils.load_shedding import LoadShedder, SheddingChat
+from utils.stubs import StubChatBackend
+
+AWS_FAQ = "What AWS services are you most experienced with?"
+
+
+def shedding_chat(matcher):
+    shedder = LoadShedder(slo_p95=1.0, min_samples=1)
+    shedder.observe(10.0)
+    assert shedder.level() == "shedding"
+    return SheddingChat(StubChatBackend(), matcher=matcher, shedder=shedder)
+
+
+def test_close_paraphrase_is_answered_from_the_faq():
+    matcher = FAQMatcher.from_resume_data(RESUME_DATA, threshold=0.85)
+    faq, score = matcher.match("Which AWS services are you most experienced with?")
+    assert faq["question"] == AWS_FAQ
+    assert score >= 0.85
+
+
+def test_other_questions_are_not_answered_from_the_faq():
+    matcher = FAQMatcher.from_resume_data(RESUME_DATA, threshold=0.85)
+    for question in ("Which Azure services are you most experienced with?",
+                     "What certifications do you have?",
+                     "What are your salary expectations?"):
+        assert matcher.answer(question) is None
+
+
+def test_relaxed_threshold_requires_the_faq_to_cover_the_question():
+    matcher = FAQMatcher.from_resume_data(RESUME_DATA, threshold=0.85)
+    question = "What GCP services are you least experienced with?"
+    _, score = matcher.match(question)
+    assert score >= 0.6
+    assert matcher.answer(question, threshold=0.6) is None
+    assert matcher.answer("What AWS services are you most experienced with", threshold=0.6) is not None
+
+
+def test_shedding_serves_only_covered_faq_answers():
+    matcher = FAQMatcher.from_resume_data(RESUME_DATA, threshold=0.85)
+    chat = shedding_chat(matcher)
+    aws_answer = matcher.faqs[0]["answer"]
+    assert chat.create_response("which aws services are you most experienced with") == aws_answer
+    assert chat.create_response("What GCP services are you least experienced with?") != aws_answer
@@ -0,0 +1,29 @@
+"""
+Tests for connection-reuse accounting on the shared SDK client (utils.http_transport).
+"""
+
+import anthropic
+
+from utils.fake_anthropic import FakeAnthropicServer, FakeServerConfig
+from utils.http_transport import ConnectionTracker, transport_stats
+
+
+def test_tracker_counts_new_and_reused_connections():
+    server = FakeAnthropicServer(config=FakeServerConfig(first_token_ms=1, latency_sigma=0, tokens_per_second=0)).start()
+    tracker = ConnectionTracker()
+    before = transport_stats()
+    client = anthropic.DefaultHttpxClient(event_hooks={"response": [tracker.on_response]})
+    body = {"model": "fake", "max_tokens": 10, "messages": [{"role": "user", "content": "hi"}]}
+    try:
+        for stream in (False, True, False):
+            response = client.post(f"{server.base_url}/v1/messages", json=dict(body, stream=stream))
+            response.read()
+            assert response.status_code == 200
+    finally:
+        client.close()
+        server.stop()
+
+    after = transport_stats()
+    assert after["requests"] - before["requests"] == 3
+    assert after["connections_opened"] - before["connections_opened"] == 1
+    assert after["reused"] - before["reused"] == 2
@@ -0,0 +1,60 @@
+"""
+Tests for routing mock answers through the compiled intent index (utils.intent_router).
+"""
+
+import pytest
+
+from components.chatbot import RESUME_DATA
+from utils.claude_api import MockClaudeChat
+from utils.intent_router import DEFAULT_RESPONSE, SAMPLE_QUESTIONS, IntentRouter, benchmark, get_intent_router
+
+FAQS = RESUME_DATA["chatbot_context"]["frequently_asked_questions"]
+
+
+@pytest.fixture(scope="module")
+def router():
+    return IntentRouter.from_resume_context(RESUME_DATA)
+
+
+def test_sample_questions_route_to_their_intents(router):
+    results = benchmark(router, repeat=1)
+    assert results["mismatches"] == []
+    assert results["accuracy"] == 1.0
+
+
+@pytest.mark.parametrize("faq", FAQS, ids=[faq["question"] for faq in FAQS])
+def test_each_resume_faq_is_answered_with_its_own_answer(router, faq):
+    intent, _ = router.route(faq["question"])
+    assert intent["name"] == f"faq:{faq['question']}"
+    assert router.respond(faq["question"]) == faq["answer"]
+
+
+def test_words_containing_a_keyword_do_not_match_it(router):
+    # "maintain" contains "ai" but is a different word
+    intent, _ = router.route("How do you maintain legacy systems?")
+    assert intent is None
+    assert router.respond("How do you maintain legacy systems?") == DEFAULT_RESPONSE
+
+
+def test_hand_written_intents_win_ties(router):
+    intent, _ = router.route("aws")
+    assert intent["name"] == "aws"
+
+
+def test_router_is_compiled_once_per_data_version():
+    first = get_intent_router(RESUME_DATA, data_version="intent-test-v1")
+    assert get_intent_router(RESUME_DATA, data_version="intent-test-v1") is first
+    assert get_intent_router(RESUME_DATA, data_version="intent-test-v2") is not first
+
+
+def test_sample_corpus_covers_every_resume_faq():
+    expected = {name for _, name in SAMPLE_QUESTIONS if name and name.startswith("faq:")}
+    assert expected == {f"faq:{faq['question']}" for faq in FAQS}
+
+
+def test_mock_backend_answers_through_the_router():
+    mock = MockClaudeChat()
+    mock.set_system_prompt(RESUME_DATA)
+    faq = FAQS[0]
+    assert mock.create_response(faq["question"]) == faq["answer"]
+    assert "".join(mock.stream_text(faq["question"])) == faq["answer"]
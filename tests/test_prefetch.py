@@ -0,0 +1,54 @@
+"""
+Tests for the per-session token accounting of follow-up prefetches (utils.prefetch).
+"""
+
+import threading
+
+from utils.prefetch import Prefetcher
+
+
+class BlockingChat:
+    """A chat backend whose answers wait for the test, so later prefetches stay queued."""
+
+    model = "stub"
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def is_cached(self, question):
+        return False
+
+    def stream_text(self, question, **options):
+        self.release.wait(5)
+        yield f"Answer to {question}"
+
+
+HISTORY = [
+    {"role": "user", "content": "Tell me about your AWS experience"},
+    {"role": "assistant", "content": "Kelby has built systems on AWS Bedrock and Lambda."},
+]
+CANDIDATES = ["Which AWS services have you used?", "What AWS certifications do you hold?"]
+
+
+def test_take_releases_reservations_of_prefetches_that_never_started():
+    prefetcher = Prefetcher(count=2, token_budget=6000, reserve_tokens=2000, max_workers=1)
+    chat = BlockingChat()
+
+    started = prefetcher.schedule("session", chat, HISTORY, CANDIDATES)
+    assert len(started) == 2
+    assert prefetcher.stats("session")["reserved"] == 4000
+
+    # The first prediction is running on the only worker; the second is queued and gets cancelled
+    future = prefetcher.take("session", started[0])
+    chat.release.set()
+    assert future.result(5) == f"Answer to {started[0]}"
+
+    stats = prefetcher.stats("session")
+    assert stats["pending"] == 0
+    assert stats["reserved"] == 0
+
+    # The budget is still available for the next turn's predictions
+    chat.release.clear()
+    history = HISTORY + [{"role": "user", "content": started[0]}, {"role": "assistant", "content": "More AWS."}]
+    assert prefetcher.schedule("session", chat, history, CANDIDATES) == [started[1]]
+    chat.release.set()
@@ -0,0 +1,67 @@
+"""
+Tests for the prompt-cache request shape, checked offline with utils.stubs.RecordingAnthropicClient.
+"""
+
+from components.chatbot import RESUME_DATA
+from utils.claude_api import ClaudeChat, build_system_blocks
+from utils.stubs import RecordingAnthropicClient, verify_prompt_cache_request
+
+
+def recording_chat(prompt_caching):
+    client = RecordingAnthropicClient()
+    chat = ClaudeChat(api_key="offline", client=client, prompt_caching=prompt_caching, metered=False)
+    chat.set_system_prompt(RESUME_DATA)
+    return chat, client
+
+
+def test_cached_requests_mark_the_static_prompt():
+    chat, client = recording_chat(prompt_caching=True)
+    chat.create_response("What certifications do you have?")
+    "".join(chat.stream_text("Which AWS services are you most experienced with?"))
+
+    assert len(client.requests) == 2
+    for request in client.requests:
+        assert verify_prompt_cache_request(request) == []
+        assert request["system"][0]["text"] == chat.system_prompt
+
+
+def test_retrieved_context_goes_after_the_breakpoint():
+    chat, client = recording_chat(prompt_caching=True)
+    chat.create_response("What certifications do you have?")
+    chat.create_response("Tell me about your teaching experience")
+
+    first, second = (request["system"] for request in client.requests)
+    assert first[0] == second[0]
+    assert all("cache_control" not in block for block in first[1:] + second[1:])
+
+
+def test_repeated_prefix_reads_from_the_cache():
+    chat, _ = recording_chat(prompt_caching=True)
+    chat.create_response("What certifications do you have?")
+    assert chat.last_usage["cache_creation_input_tokens"] > 0
+    assert chat.last_usage["cache_read_input_tokens"] == 0
+
+    chat.create_response("Are you open to relocation?")
+    assert chat.last_usage["cache_creation_input_tokens"] == 0
+    assert chat.last_usage["cache_read_input_tokens"] > 0
+
+
+def test_uncached_requests_send_a_plain_prompt():
+    chat, client = recording_chat(prompt_caching=False)
+    chat.create_response("What certifications do you have?")
+    assert isinstance(client.last_request["system"], str)
+    assert verify_prompt_cache_request(client.last_request)
+
+
+def test_verify_prompt_cache_request_reports_bad_shapes():
+    assert verify_prompt_cache_request({"system": "plain"}) == ["system must be a non-empty list of content blocks"]
+
+    unmarked = {"system": [{"type": "text", "text": "prompt"}]}
+    assert "no system block is marked with cache_control" in verify_prompt_cache_request(unmarked)
+
+    wrong_ttl = {"system": build_system_blocks("prompt", cache=True)}
+    wrong_ttl["system"][0]["cache_control"] = {"type": "persistent"}
+    assert any("unsupported cache_control" in problem for problem in verify_prompt_cache_request(wrong_ttl))
+
+    too_many = {"system": [{"type": "text", "text": str(i), "cache_control": {"type": "ephemeral"}} for i in range(5)]}
+    assert any("exceed the API limit" in problem for problem in verify_prompt_cache_request(too_many))
@@ -0,0 +1,71 @@
+"""
+Tests for the answer-cache warm-up (utils.warmup), run offline against utils.stubs.StubChatBackend.
+"""
+
+from utils.claude_api import RequestCoalescer
+from utils.response_cache import CachedChat, ResponseCache
+from utils.stubs import StubChatBackend
+from utils.warmup import WarmupJob, collect_warmup_questions, start_warmup
+
+
+class FlakyBackend(StubChatBackend):
+    """Stub backend that fails for one question."""
+
+    def __init__(self, failing: str):
+        super().__init__()
+        self.failing = failing
+
+    def create_response(self, user_message, **options):
+        if user_message == self.failing:
+            raise RuntimeError("upstream unavailable")
+        return super().create_response(user_message, **options)
+
+
+def cached_chat(backend, data_version="v1"):
+    return CachedChat(backend, ResponseCache(), data_version, coalescer=RequestCoalescer())
+
+
+def test_collect_warmup_questions_dedupes_and_adds_faqs():
+    context = {"frequently_asked_questions": [{"question": "Are you open to relocation?", "answer": "Yes."}]}
+    questions = collect_warmup_questions(
+        [["What certifications do you have?", "Tell me about AI"], ["what certifications do you have", ""]],
+        context,
+    )
+    assert questions == ["What certifications do you have?", "Tell me about AI", "Are you open to relocation?"]
+
+
+def test_warmup_answers_skips_cached_and_records_errors():
+    backend = FlakyBackend(failing="Are you open to relocation?")
+    chat = cached_chat(backend)
+    chat.cache.put(chat.cache_key("Tell me about AI"), "Already cached.")
+
+    questions = ["What certifications do you have?", "Tell me about AI", "Are you open to relocation?",
+                 "Which AWS services do you use?"]
+    job = WarmupJob(chat, questions, batch_size=2)
+    job.run()
+
+    assert job.done
+    assert sorted(job.answered) == ["What certifications do you have?", "Which AWS services do you use?"]
+    assert job.skipped == ["Tell me about AI"]
+    assert list(job.errors) == ["Are you open to relocation?"]
+    assert "upstream unavailable" in job.errors["Are you open to relocation?"]
+    assert sorted(backend.calls) == ["What certifications do you have?", "Which AWS services do you use?"]
+
+    # Warmed answers are served from the cache without another backend call
+    assert chat.create_response("What certifications do you have?") == "[stub answer] What certifications do you have?"
+    assert len(backend.calls) == 2
+
+
+def test_start_warmup_runs_once_per_model_and_data_version():
+    backend = StubChatBackend(model="warmup-test")
+    chat = cached_chat(backend, data_version="warmup-test-v1")
+    first = start_warmup(chat, ["What certifications do you have?"], batch_size=1, refresh_after=3600)
+    assert first.wait(5)
+    assert start_warmup(chat, ["What certifications do you have?"], batch_size=1, refresh_after=3600) is first
+    assert backend.calls == ["What certifications do you have?"]
+
+    other_version = cached_chat(backend, data_version="warmup-test-v2")
+    second = start_warmup(other_version, ["What certifications do you have?"], batch_size=1, refresh_after=3600)
+    assert second is not first
+    assert second.wait(5)
+    assert second.answered == ["What certifications do you have?"]
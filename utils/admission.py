@@ -0,0 +1,290 @@
+"""
+Process-wide admission control for upstream LLM calls.
+
+At most `max_concurrent` requests reach the Anthropic API at once. Further
+requests wait in a bounded FIFO queue, each with a wait deadline, and are
+rejected immediately when the queue is full. Keeping the upstream at a
+sustainable concurrency avoids bursts of 429s and the retry storms that
+follow. A waiting request's queue position can be looked up by its
+cancellation token, so the chat UI can show it to the visitor.
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from utils.chat_base import FriendlyChat
+from utils.cancellation import CancellationToken, RequestCancelled, current_token
+from utils import telemetry
+
+logger = logging.getLogger(__name__)
+
+# Seconds a rejected visitor is asked to wait before trying again
+RETRY_AFTER = 5.0
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request can't be admitted (queue full or wait deadline passed)."""
+
+    def __init__(self, reason: str, retry_after: float = 0.0):
+        """
+        Args:
+            reason: "queue_full" or "timeout"
+            retry_after: Suggested seconds before trying again
+        """
+        super().__init__(f"Chat request not admitted ({reason})")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Ticket:
+    """A place in the admission queue."""
+
+    def __init__(self, token: Optional[CancellationToken]):
+        self.token = token
+        self.enqueued_at = time.monotonic()
+
+
+class AdmissionController:
+    """
+    Bounded concurrency with a bounded FIFO wait queue.
+    """
+
+    def __init__(self, max_concurrent: int = 4, max_queue: int = 24, max_wait: float = 20.0):
+        """
+        Initialize the controller.
+
+        Args:
+            max_concurrent: Requests allowed upstream at once (0 disables admission control)
+            max_queue: Maximum requests waiting; more are rejected immediately
+            max_wait: Maximum seconds a request waits for a slot
+        """
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.active = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._queue: "deque[_Ticket]" = deque()
+        self._condition = threading.Condition()
+
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        """Build a controller from CHAT_ADMISSION_* environment variables."""
+        return cls(
+            max_concurrent=int(os.environ.get("CHAT_ADMISSION_CONCURRENCY", "4")),
+            max_queue=int(os.environ.get("CHAT_ADMISSION_QUEUE", "24")),
+            max_wait=float(os.environ.get("CHAT_ADMISSION_MAX_WAIT", "20")),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_concurrent > 0
+
+    def _reject(self, reason: str) -> AdmissionRejected:
+        """Count a rejection and build its exception. Must be called with the lock held."""
+        self.rejected += 1
+        telemetry.get_metrics().inc("chat_admission_rejected_total", reason=reason)
+        logger.info(f"Chat request not admitted ({reason}): {self.active} active, {len(self._queue)} queued")
+        return AdmissionRejected(reason, retry_after=RETRY_AFTER)
+
+    def acquire(self, timeout: Optional[float] = None, token: Optional[CancellationToken] = None):
+        """
+        Wait for an upstream slot in FIFO order.
+
+        Args:
+            timeout: Maximum seconds to wait (capped at max_wait)
+            token: Cancellation token of the request (defaults to the thread's);
+                cancelling it leaves the queue and identifies the request for position()
+
+        Raises:
+            AdmissionRejected: If the queue is full or no slot freed up in time
+            RequestCancelled: If the token was cancelled while waiting
+        """
+        if not self.enabled:
+            return
+        token = token if token is not None else current_token()
+        wait = self.max_wait if timeout is None else min(self.max_wait, timeout)
+
+        with self._condition:
+            if self.active < self.max_concurrent and not self._queue:
+                self.active += 1
+                self.admitted += 1
+                return
+            if len(self._queue) >= self.max_queue:
+                raise self._reject("queue_full")
+            ticket = _Ticket(token)
+            self._queue.append(ticket)
+
+        # Wake up as soon as the request is cancelled, not at the deadline
+        remove = token.add_callback(self._wake) if token is not None else None
+        try:
+            with self._condition:
+                deadline = ticket.enqueued_at + wait
+                while True:
+                    if token is not None and token.cancelled:
+                        self._queue.remove(ticket)
+                        self._condition.notify_all()
+                        raise RequestCancelled(token.reason)
+                    if self._queue[0] is ticket and self.active < self.max_concurrent:
+                        self._queue.popleft()
+                        self.active += 1
+                        self.admitted += 1
+                        # The next request in line may also fit
+                        self._condition.notify_all()
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._queue.remove(ticket)
+                        self._condition.notify_all()
+                        raise self._reject("timeout")
+                    self._condition.wait(remaining)
+        finally:
+            if remove is not None:
+                remove()
+        telemetry.get_metrics().observe("chat_admission_wait_seconds", time.monotonic() - ticket.enqueued_at)
+
+    def release(self):
+        """Give back an upstream slot."""
+        if not self.enabled:
+            return
+        with self._condition:
+            self.active -= 1
+            self._condition.notify_all()
+
+    def _wake(self):
+        with self._condition:
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, timeout: Optional[float] = None) -> Iterator[None]:
+        """
+        Hold an upstream slot for the duration of a block.
+
+        Args:
+            timeout: Maximum seconds to wait for the slot (capped at max_wait)
+        """
+        self.acquire(timeout)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def position(self, token: Optional[CancellationToken]) -> Optional[int]:
+        """
+        Look up a waiting request's place in line.
+
+        Args:
+            token: The request's cancellation token
+
+        Returns:
+            1 for the next request to be admitted, or None if it isn't waiting
+        """
+        if token is None:
+            return None
+        with self._condition:
+            for index, ticket in enumerate(self._queue):
+                # A shared upstream call (see RequestCoalescer) waits on behalf of every request holding it
+                if ticket.token is not None and ticket.token.represents(token):
+                    return index + 1
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report the controller's load.
+
+        Returns:
+            Dictionary with active and queued requests, the limits, and the
+            admitted and rejected totals
+        """
+        with self._condition:
+            return {
+                "active": self.active,
+                "queued": len(self._queue),
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+            }
+
+
+def admission_notice(error: AdmissionRejected) -> str:
+    """
+    Build the in-chat notice shown when a question wasn't admitted.
+
+    Args:
+        error: The AdmissionRejected error
+
+    Returns:
+        The notice text
+    """
+    return (f"The chatbot is very busy right now, so here's a quick answer from Kelby's profile. "
+            f"Try again in about {max(1, round(error.retry_after))} seconds for a full answer.\n\n")
+
+
+class AdmittedChat(FriendlyChat):
+    """
+    Wraps a live chat backend so every upstream call holds an admission slot.
+    """
+
+    def __init__(self, backend: Any, controller: Optional[AdmissionController] = None):
+        """
+        Initialize the wrapper.
+
+        Args:
+            backend: The live backend (ClaudeChat)
+            controller: The AdmissionController (defaults to the process-wide one)
+        """
+        self.backend = backend
+        self.controller = controller or get_admission_controller()
+
+    @property
+    def model(self) -> str:
+        return self.backend.model
+
+    def set_system_prompt(self, resume_context: Dict[str, Any]):
+        """Set the system prompt on the wrapped backend."""
+        self.backend.set_system_prompt(resume_context)
+
+    def create_response(self, user_message: str, **options) -> str:
+        """
+        Get an answer once admitted (raising on errors and rejections).
+
+        Args:
+            user_message: The message from the user/employer
+            **options: Passed through to the backend; timeout also bounds the wait
+
+        Returns:
+            The answer as a string
+        """
+        with self.controller.slot(options.get("timeout")):
+            return self.backend.create_response(user_message, **options)
+
+    def stream_text(self, user_message: str, **options) -> Iterator[str]:
+        """
+        Stream an answer once admitted, holding the slot until the stream ends
+        (raising on errors and rejections).
+
+        Args:
+            user_message: The message from the user/employer
+            **options: Passed through to the backend; timeout also bounds the wait
+
+        Yields:
+            Text deltas of the answer, in order
+        """
+        with self.controller.slot(options.get("timeout")):
+            for text in self.backend.stream_text(user_message, **options):
+                yield text
+
+
+# Shared controller for the whole Streamlit server process
+_admission_controller = AdmissionController.from_env()
+
+
+def get_admission_controller() -> AdmissionController:
+    """Get the process-wide admission controller."""
+    return _admission_controller
@@ -0,0 +1,211 @@
+"""
+Cancellation tokens for in-flight chat generations.
+
+Each background chat job owns a CancellationToken, bound to the thread that
+generates its answer. Backends register a callback with the bound token
+(e.g. closing the HTTP stream), so cancelling the job aborts the upstream
+generation instead of letting it run to completion. Upstream calls shared by
+several jobs run under a SharedCancellationToken, which is only cancelled once
+every job sharing it has gone.
+"""
+
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RequestCancelled(Exception):
+    """Raised by code that notices its thread's token was cancelled while it waited."""
+
+
+class CancellationToken:
+    """
+    A one-shot, thread-safe cancellation flag with callbacks.
+    """
+
+    def __init__(self):
+        self.reason: Optional[str] = None
+        self._event = threading.Event()
+        self._callbacks: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether the token has been cancelled."""
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "cancelled") -> bool:
+        """
+        Cancel the token and run its callbacks.
+
+        Args:
+            reason: Why the work was cancelled (e.g. "navigation", "resubmitted")
+
+        Returns:
+            True if this call cancelled the token, False if it already was
+        """
+        with self._lock:
+            if self._event.is_set():
+                return False
+            callbacks = self._mark_cancelled(reason)
+        self._run_callbacks(callbacks)
+        return True
+
+    def _mark_cancelled(self, reason: str) -> List[Callable[[], None]]:
+        """Set the flag and take the callbacks to run. Called with the lock held."""
+        self.reason = reason
+        self._event.set()
+        callbacks, self._callbacks = self._callbacks, []
+        return callbacks
+
+    @staticmethod
+    def _run_callbacks(callbacks: List[Callable[[], None]]):
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.debug(f"Cancellation callback failed: {str(e)}")
+
+    def add_callback(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """
+        Run a callback when the token is cancelled (immediately if it already is).
+
+        Args:
+            callback: Function taking no arguments, e.g. a stream's close()
+
+        Returns:
+            A function that unregisters the callback
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._remove(callback)
+        callback()
+        return lambda: None
+
+    def _remove(self, callback: Callable[[], None]):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def represents(self, token: Optional["CancellationToken"]) -> bool:
+        """
+        Check whether work running under this token is done on behalf of a request.
+
+        Args:
+            token: The request's cancellation token
+
+        Returns:
+            True if token is this token
+        """
+        return token is self
+
+
+class SharedCancellationToken(CancellationToken):
+    """
+    Token for work shared by several requests (e.g. one coalesced upstream
+    call). It is cancelled once every request holding it has released it, so
+    no single request going away aborts the work for the others.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._holders: List[Optional[CancellationToken]] = []
+
+    def hold(self, token: Optional[CancellationToken]) -> bool:
+        """
+        Register a request sharing the work.
+
+        Args:
+            token: The request's own cancellation token, if it has one
+
+        Returns:
+            False if the work was already cancelled and can't be joined
+        """
+        with self._lock:
+            if self._event.is_set():
+                return False
+            self._holders.append(token)
+            return True
+
+    def release(self, token: Optional[CancellationToken], reason: str = "abandoned") -> bool:
+        """
+        Drop a request that no longer needs the work, cancelling it if it was the last.
+
+        Args:
+            token: The token the request was registered with
+            reason: Why the work is cancelled if no request is left
+
+        Returns:
+            True if this call cancelled the token
+        """
+        with self._lock:
+            for index, holder in enumerate(self._holders):
+                if holder is token:
+                    del self._holders[index]
+                    break
+            if self._holders or self._event.is_set():
+                return False
+            callbacks = self._mark_cancelled(reason)
+        self._run_callbacks(callbacks)
+        return True
+
+    def represents(self, token: Optional[CancellationToken]) -> bool:
+        """
+        Check whether the shared work is done on behalf of a request.
+
+        Args:
+            token: The request's cancellation token
+
+        Returns:
+            True if token is this token or one of the requests holding it
+        """
+        if token is self:
+            return True
+        with self._lock:
+            return token is not None and any(holder is token for holder in self._holders)
+
+
+_local = threading.local()
+
+
+def current_token() -> Optional[CancellationToken]:
+    """Get the cancellation token bound to this thread, if any."""
+    return getattr(_local, "token", None)
+
+
+@contextmanager
+def bind_token(token: Optional[CancellationToken]) -> Iterator[None]:
+    """
+    Bind a cancellation token to the current thread.
+
+    Args:
+        token: The token (None binds nothing)
+    """
+    previous = current_token()
+    _local.token = token
+    try:
+        yield
+    finally:
+        _local.token = previous
+
+
+@contextmanager
+def on_cancel(callback: Callable[[], None]) -> Iterator[None]:
+    """
+    Run a callback if the thread's token is cancelled while the block runs.
+
+    Args:
+        callback: Function taking no arguments, e.g. a stream's close()
+    """
+    token = current_token()
+    remove = token.add_callback(callback) if token is not None else None
+    try:
+        yield
+    finally:
+        if remove is not None:
+            remove()
+
@@ -0,0 +1,63 @@
+"""
+Shared error handling for the chat backends and the wrappers layered over them.
+
+Every backend exposes raising calls (create_response, stream_text), which the
+wrappers chain together, and friendly ones (get_response, stream_response),
+which the chat page calls and which turn any error into a message for the
+visitor. FriendlyChat derives the friendly calls from the raising ones.
+"""
+
+from typing import Iterator
+
+
+def error_response(error: Exception) -> str:
+    """
+    Build the user-facing message shown when a chat request fails.
+
+    Args:
+        error: The exception raised by the backend
+
+    Returns:
+        A friendly error message as a string
+    """
+    return f"Sorry, I encountered an error: {str(error)}. Please try again or contact Kelby directly."
+
+
+class FriendlyChat:
+    """
+    Mixin adding get_response and stream_response to a class that defines
+    create_response and stream_text.
+    """
+
+    def get_response(self, user_message: str, **options) -> str:
+        """
+        Get an answer, returning a friendly message instead of raising on errors.
+
+        Args:
+            user_message: The message from the user/employer
+            **options: Passed through to create_response (e.g. timeout, history)
+
+        Returns:
+            The answer, or the error message
+        """
+        try:
+            return self.create_response(user_message, **options)
+        except Exception as e:
+            return error_response(e)
+
+    def stream_response(self, user_message: str, **options) -> Iterator[str]:
+        """
+        Stream an answer, yielding a friendly message instead of raising on errors.
+
+        Args:
+            user_message: The message from the user/employer
+            **options: Passed through to stream_text (e.g. timeout, history)
+
+        Yields:
+            Text deltas of the answer, then the error message if it failed
+        """
+        try:
+            for text in self.stream_text(user_message, **options):
+                yield text
+        except Exception as e:
+            yield error_response(e)
@@ -0,0 +1,317 @@
+"""
+The chat engine shared by every chat UI.
+
+All chat backends implement the ChatBackend protocol: the live ClaudeChat,
+the local MockClaudeChat and StubChatBackend, and the wrappers layered
+around them (FAQ answers, rate limits, retries and the circuit breaker, the
+answer cache and telemetry). build_chat_client() assembles that stack once,
+and ChatEngine generates answers from it on the background worker pool.
+
+Conversations use one history format, the Messages API's own:
+{"role": "user" | "assistant", "content": str}.
+"""
+
+import os
+import json
+import logging
+from datetime import datetime
+from concurrent.futures import Future
+from typing import List, Dict, Any, Iterator, Optional, Protocol
+
+from utils.claude_api import is_server_api_key
+from utils.chat_registry import get_chat_backend, compute_data_version
+from utils.response_cache import CachedChat, get_response_cache
+from utils.resilience import ResilientChat
+from utils.rate_limit import RateLimitedChat
+from utils.usage_ledger import BudgetedChat
+from utils.load_shedding import SheddingChat
+from utils.faq_matcher import FAQChat, faq_matching_enabled, get_faq_matcher
+from utils.conversation_memory import ConversationMemory, to_messages
+from utils.chat_workers import ChatJob, ChatWorkerPool, get_chat_worker_pool
+from utils.prefetch import Prefetcher, get_prefetcher, prefetch_enabled
+from utils.stubs import StubChatBackend
+from utils import telemetry
+
+logger = logging.getLogger(__name__)
+
+# Which backend answers: the Anthropic API, the local intent router, or the offline stub
+BACKEND_KINDS = ("live", "mock", "stub")
+
+class ChatBackend(Protocol):
+    """
+    The interface every chat backend and wrapper implements.
+
+    The raising variants (create_response, stream_text) let wrappers see
+    errors; the friendly variants (get_response, stream_response) turn them
+    into a message for the visitor. Options include timeout and history
+    (built with ConversationMemory.build_history()).
+    """
+
+    model: str
+
+    def set_system_prompt(self, resume_context: Dict[str, Any]):
+        ...
+
+    def create_response(self, user_message: str, **options) -> str:
+        ...
+
+    def stream_text(self, user_message: str, **options) -> Iterator[str]:
+        ...
+
+    def get_response(self, user_message: str, **options) -> str:
+        ...
+
+    def stream_response(self, user_message: str, **options) -> Iterator[str]:
+        ...
+
+def backend_kind(api_key: Optional[str]) -> str:
+    """
+    Decide which backend answers.
+
+    Args:
+        api_key: The Anthropic API key, if any
+
+    Returns:
+        "stub" if CHAT_BACKEND=stub, otherwise "live" with an API key and "mock" without
+    """
+    if os.environ.get("CHAT_BACKEND", "").lower() == "stub":
+        return "stub"
+    return "live" if api_key else "mock"
+
+def build_chat_client(resume_data: Dict[str, Any], api_key: Optional[str] = None,
+                      data_version: Optional[str] = None, session_id: Optional[str] = None,
+                      client_ip: Optional[str] = None, kind: Optional[str] = None) -> ChatBackend:
+    """
+    Assemble the chat client for one visitor session.
+
+    The backend comes from the process-wide registry, so the HTTP client and
+    compiled system prompt are reused across reruns and sessions, and is
+    fronted by the shared answer cache. Live backends are also wrapped with
+    retries and the circuit breaker (degrading to mock answers during
+    upstream incidents), with the session, IP and global rate limits, with
+    the daily budget caps (for the site's own API key only; visitors' keys
+    are never metered), and with latency-SLO load shedding.
+    Questions that closely match an FAQ are answered before any of that.
+
+    Args:
+        resume_data: Dictionary with resume information for context
+        api_key: The Anthropic API key (None or "" for local answers)
+        data_version: Precomputed resume data version (computed if None)
+        session_id: The visitor session, for the per-session rate limit
+        client_ip: The client's IP address, for the per-IP rate limit
+        kind: One of BACKEND_KINDS (defaults to backend_kind(api_key))
+
+    Returns:
+        The chat client, recording telemetry for every request
+    """
+    data_version = data_version or compute_data_version(resume_data)
+    kind = kind or backend_kind(api_key)
+
+    if kind == "stub":
+        backend = StubChatBackend()
+        backend.set_system_prompt(resume_data)
+    else:
+        backend = get_chat_backend(api_key if kind == "live" else None, resume_data, data_version=data_version)
+    cached_chat = CachedChat(backend, get_response_cache(), data_version)
+    chat_client = cached_chat
+    if kind == "live":
+        # The fallback is the registry's mock, so degraded answers come from the resume data
+        fallback = get_chat_backend(None, resume_data, data_version=data_version)
+        resilient_chat = ResilientChat(chat_client, fallback=fallback)
+        # Session, IP and global limits on questions that would reach the API
+        chat_client = RateLimitedChat(resilient_chat, fallback, session_id, client_ip,
+                                      is_cached=cached_chat.is_cached)
+        if is_server_api_key(api_key):
+            # Daily token and spend caps: cheaper answers past the soft cap, mock answers past the hard cap
+            chat_client = BudgetedChat(chat_client, fallback, cached_answer=resilient_chat.cached_answer)
+        # While live latency is over the SLO, answer from the cache and FAQs where possible
+        chat_client = SheddingChat(chat_client, get_faq_matcher(resume_data, data_version),
+                                   cached_answer=resilient_chat.cached_answer)
+    if faq_matching_enabled():
+        # Near-verbatim FAQ questions never reach the cache, the limits or the API
+        chat_client = FAQChat(chat_client, get_faq_matcher(resume_data, data_version))
+    # Record latency, tokens and the serving backend for every request
+    return telemetry.InstrumentedChat(chat_client)
+
+def build_prefetch_chat(resume_data: Dict[str, Any], api_key: Optional[str] = None,
+                        data_version: Optional[str] = None, kind: Optional[str] = None) -> Optional[CachedChat]:
+    """
+    Build the chat used to prefetch likely follow-up answers (see utils.prefetch).
+
+    It bypasses the visitor's rate limits and goes straight to the shared
+    answer cache and live backend; the prefetcher's own budget and idle
+    checks keep it in line instead.
+
+    Args:
+        resume_data: Dictionary with resume information for context
+        api_key: The Anthropic API key (None or "" for local answers)
+        data_version: Precomputed resume data version (computed if None)
+        kind: One of BACKEND_KINDS (defaults to backend_kind(api_key))
+
+    Returns:
+        The CachedChat, or None if prefetching is off or answers are local anyway
+    """
+    if not prefetch_enabled() or (kind or backend_kind(api_key)) != "live":
+        return None
+    data_version = data_version or compute_data_version(resume_data)
+    backend = get_chat_backend(api_key, resume_data, data_version=data_version)
+    return CachedChat(backend, get_response_cache(), data_version)
+
+def user_message(text: str) -> Dict[str, str]:
+    """Build a history entry for a message from the visitor."""
+    return {"role": "user", "content": text}
+
+def assistant_message(text: str) -> Dict[str, str]:
+    """Build a history entry for an answer."""
+    return {"role": "assistant", "content": text}
+
+def normalize_history(history: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """
+    Convert a chat history to the engine's format, upgrading any entries
+    in the old {"text", "is_user"} format.
+
+    Args:
+        history: Chat history entries
+
+    Returns:
+        List of {"role", "content"} entries
+    """
+    return to_messages(history)
+
+def export_json(history: List[Dict[str, str]]) -> str:
+    """
+    Export a conversation as JSON.
+
+    Args:
+        history: The chat history
+
+    Returns:
+        JSON with the export timestamp and the messages
+    """
+    return json.dumps({"timestamp": datetime.now().isoformat(), "messages": history}, indent=2)
+
+def export_markdown(history: List[Dict[str, str]], assistant_name: str) -> str:
+    """
+    Export a conversation as Markdown.
+
+    Args:
+        history: The chat history
+        assistant_name: Name shown for assistant messages
+
+    Returns:
+        The conversation as a Markdown document
+    """
+    export_text = "# Conversation with Portfolio Chatbot\n\n"
+    for message in history:
+        role = "You" if message["role"] == "user" else assistant_name
+        export_text += f"**{role}**: {message['content']}\n\n"
+    return export_text
+
+class ChatEngine:
+    """
+    Generates answers for one visitor session from a chat client, on the
+    shared background worker pool.
+    """
+
+    def __init__(self, client: ChatBackend, memory: ConversationMemory,
+                 workers: Optional[ChatWorkerPool] = None, prefetch_chat: Optional[CachedChat] = None,
+                 prefetcher: Optional[Prefetcher] = None):
+        """
+        Initialize the engine.
+
+        Args:
+            client: The chat client from build_chat_client()
+            memory: The session's token-budgeted ConversationMemory
+            workers: The worker pool (defaults to the process-wide one)
+            prefetch_chat: The chat from build_prefetch_chat() (None disables prefetching)
+            prefetcher: The Prefetcher (defaults to the process-wide one)
+        """
+        self.client = client
+        self.memory = memory
+        self.workers = workers or get_chat_worker_pool()
+        self.prefetch_chat = prefetch_chat
+        self.prefetcher = prefetcher or get_prefetcher()
+
+    def request_options(self, history: List[Dict[str, str]], with_history: bool = True) -> Dict[str, Any]:
+        """
+        Build the backend options for a new turn.
+
+        Args:
+            history: The chat history before the new message
+            with_history: Send prior turns; standalone questions (e.g. quick
+                questions) skip them so they can be answered from the cache
+
+        Returns:
+            Options for the backend's response methods
+        """
+        if not with_history:
+            return {}
+        return {"history": self.memory.build_history(history)}
+
+    def submit(self, session_id: str, history: List[Dict[str, str]], message: str,
+               with_history: bool = True) -> ChatJob:
+        """
+        Start generating the answer to a message on the worker pool.
+
+        Args:
+            session_id: The visitor session
+            history: The chat history before the new message
+            message: The message from the user/employer
+            with_history: Send prior turns with the message
+
+        Returns:
+            The session's ChatJob, streaming the answer
+        """
+        options = self.request_options(history, with_history)
+        # Prefetched answers were generated without history, so they only stand in for standalone questions
+        if self.prefetch_chat is not None and not options.get("history"):
+            prefetched = self.prefetcher.take(session_id, message)
+            if prefetched is not None:
+                return self.workers.submit(session_id, message, self._prefetched_response,
+                                           prefetched, message, **options)
+        return self.workers.submit(session_id, message, self.client.stream_response, message, **options)
+
+    def _prefetched_response(self, prefetched: Future, message: str, **options) -> Iterator[str]:
+        """
+        Serve a prefetched answer, waiting for it if it is still being generated.
+
+        The turn is tracked like any other request (as served by the "prefetch"
+        backend), so it shows up in the latency and backend metrics.
+
+        Args:
+            prefetched: The Future from Prefetcher.take()
+            message: The message from the user/employer
+            **options: Options for the chat client if the prefetch failed
+
+        Yields:
+            The answer
+        """
+        with telemetry.track_request(self.client.model) as record:
+            try:
+                answer = prefetched.result(timeout=self.prefetcher.wait_timeout)
+            except Exception:
+                answer = None
+            if answer:
+                telemetry.note(backend="prefetch")
+                record.first_chunk()
+                yield answer
+                return
+            # The client's own tracking reuses this record
+            for text in self.client.stream_response(message, **options):
+                yield text
+
+    def prefetch(self, session_id: str, history: List[Dict[str, str]], candidates: List[str]) -> List[str]:
+        """
+        Start prefetching answers to the questions likely to follow the latest answer.
+
+        Args:
+            session_id: The visitor session
+            history: The chat history, ending with the latest answer
+            candidates: Questions the visitor might ask next (see prefetch_candidates())
+
+        Returns:
+            The questions being prefetched (empty if prefetching is off)
+        """
+        if self.prefetch_chat is None:
+            return []
+        return self.prefetcher.schedule(session_id, self.prefetch_chat, history, candidates)
@@ -0,0 +1,161 @@
+"""
+Process-wide registry of chat backends shared across Streamlit reruns and sessions.
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+from utils.claude_api import ClaudeChat, HedgedChat, MockClaudeChat, hedging_enabled
+from utils.admission import AdmittedChat, get_admission_controller
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "claude-3-haiku-20240307"
+
+
+def compute_data_version(resume_data: Dict[str, Any]) -> str:
+    """
+    Compute a short, stable version hash for the resume data.
+
+    Args:
+        resume_data: Dictionary containing resume information
+
+    Returns:
+        A hex digest that changes whenever the resume data changes
+    """
+    payload = json.dumps(resume_data, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:12]
+
+
+def hash_api_key(api_key: str) -> str:
+    """
+    Hash an API key so it can be used as a registry key without keeping it in plain text.
+
+    Args:
+        api_key: The Anthropic API key
+
+    Returns:
+        A hex digest of the key
+    """
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+class ChatBackendRegistry:
+    """
+    Keeps initialized chat backends (HTTP client + compiled system prompt) alive
+    across reruns, keyed by (API key hash, model, resume data version).
+    """
+
+    def __init__(self, max_entries: int = 8, idle_ttl: float = 3600.0):
+        """
+        Initialize the registry.
+
+        Args:
+            max_entries: Maximum number of backends to keep before evicting the least recently used
+            idle_ttl: Seconds a backend may go unused before it is evicted
+        """
+        self.max_entries = max_entries
+        self.idle_ttl = idle_ttl
+        self._entries: "OrderedDict[Tuple[str, str, str], Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_backend(self, api_key: Optional[str], resume_data: Dict[str, Any],
+                    model: str = DEFAULT_MODEL, data_version: Optional[str] = None):
+        """
+        Return a ready-to-use chat backend, building it only on first use.
+
+        Args:
+            api_key: The Anthropic API key (falls back to MockClaudeChat if empty)
+            resume_data: Dictionary containing resume information for the system prompt
+            model: The Claude model to use
+            data_version: Precomputed resume data version (computed if None)
+
+        Returns:
+            A ClaudeChat (behind the admission queue, hedged if CHAT_HEDGING is on)
+            or MockClaudeChat with its system prompt already set
+        """
+        data_version = data_version or compute_data_version(resume_data)
+        key_hash = hash_api_key(api_key) if api_key else "mock"
+        key = (key_hash, model, data_version)
+        now = time.monotonic()
+
+        with self._lock:
+            self._evict_stale(key, now)
+
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry["last_used"] = now
+                self._entries.move_to_end(key)
+                return entry["backend"]
+
+            # Build the client and compile the system prompt once per key
+            # (retries are handled by utils.resilience, so the SDK's own are disabled)
+            backend = ClaudeChat(api_key=api_key, model=model, max_retries=0) if api_key else MockClaudeChat()
+            if api_key and get_admission_controller().enabled:
+                # Every upstream call, including warm-up, waits for a slot in the shared admission queue
+                backend = AdmittedChat(backend)
+            if api_key and hedging_enabled():
+                # Optional hedged requests to cut tail latency (CHAT_HEDGING); the primary and
+                # the hedge each hold their own admission slot
+                backend = HedgedChat.from_env(backend)
+            backend.set_system_prompt(resume_data)
+            self._entries[key] = {"backend": backend, "last_used": now}
+            logger.info(f"Created chat backend for model={model} data_version={data_version}")
+
+            # Enforce the size bound by dropping the least recently used backends
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+            return backend
+
+    def _evict_stale(self, key: Tuple[str, str, str], now: float):
+        """
+        Drop idle backends and backends built from an older resume data version.
+        Must be called with the lock held.
+        """
+        key_hash, model, data_version = key
+        for existing in list(self._entries):
+            entry = self._entries[existing]
+            outdated = existing[:2] == (key_hash, model) and existing[2] != data_version
+            idle = now - entry["last_used"] > self.idle_ttl
+            if outdated or idle:
+                del self._entries[existing]
+
+    def clear(self):
+        """Remove all cached backends."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+# Shared registry for the whole Streamlit server process
+_registry = ChatBackendRegistry(
+    max_entries=int(os.environ.get("CHAT_BACKEND_CACHE_SIZE", "8")),
+    idle_ttl=float(os.environ.get("CHAT_BACKEND_IDLE_TTL", "3600")),
+)
+
+
+def get_chat_backend(api_key: Optional[str], resume_data: Dict[str, Any],
+                     model: str = DEFAULT_MODEL, data_version: Optional[str] = None):
+    """
+    Get a chat backend from the process-wide registry.
+
+    Args:
+        api_key: The Anthropic API key (falls back to MockClaudeChat if empty)
+        resume_data: Dictionary containing resume information for the system prompt
+        model: The Claude model to use
+        data_version: Precomputed resume data version (computed if None)
+
+    Returns:
+        A ClaudeChat or MockClaudeChat with its system prompt already set
+    """
+    return _registry.get_backend(api_key, resume_data, model=model, data_version=data_version)
@@ -0,0 +1,310 @@
+"""
+Background worker pool for chat generation.
+
+Answers are generated on a bounded, process-wide thread pool instead of inside
+the Streamlit script run. Each visitor session has at most one pending job;
+its text is buffered chunk by chunk so the UI can poll it on a short refresh
+cycle, and the job keeps running if the visitor clicks something and the
+script reruns. The pool size caps concurrent generations per process;
+calls to the upstream API are further limited by utils.admission.
+
+Jobs are cancelled (see utils.cancellation) when the visitor navigates away
+from the chat, asks a new question before the answer is finished, or stops
+polling for it (e.g. the browser tab was closed), which aborts the upstream
+stream and frees the worker. Abandoned jobs are swept by a background thread,
+so they stop even if no other session submits a question.
+"""
+
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import List, Dict, Any, Callable, Iterable, Optional
+
+from utils.chat_base import error_response
+from utils.cancellation import CancellationToken, bind_token
+from utils import telemetry
+
+logger = logging.getLogger(__name__)
+
+
+class ChatJob:
+    """
+    One answer being generated in the background, with its buffered chunks.
+    """
+
+    def __init__(self, session_id: str, message: str):
+        """
+        Initialize the job.
+
+        Args:
+            session_id: The visitor session that asked
+            message: The question being answered
+        """
+        self.session_id = session_id
+        self.message = message
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.future: Optional[Future] = None
+        self.submitted_at = time.monotonic()
+        self.finished_at: Optional[float] = None
+        self.last_polled = self.submitted_at
+        self.token = CancellationToken()
+        self._condition = threading.Condition()
+
+    @property
+    def text(self) -> str:
+        """The answer text received so far."""
+        with self._condition:
+            return "".join(self.chunks)
+
+    @property
+    def started(self) -> bool:
+        """Whether a worker has picked the job up."""
+        return self.future is not None and (self.future.running() or self.future.done())
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether the job was cancelled before its answer finished."""
+        return self.token.cancelled
+
+    def cancel(self, reason: str) -> bool:
+        """
+        Cancel the job, aborting its upstream request.
+
+        The worker stops at the next chunk (or immediately, if the backend
+        registered a callback that closes its stream); chunks already
+        received are kept.
+
+        Args:
+            reason: Why the job was cancelled, for the metrics
+                ("navigation", "resubmitted" or "abandoned")
+
+        Returns:
+            True if the job was still running and is now cancelled
+        """
+        with self._condition:
+            if self.done:
+                return False
+        if not self.token.cancel(reason):
+            return False
+        logger.info(f"Cancelled chat job for session {self.session_id[:8]} ({reason})")
+        if self.future is not None:
+            # A job no worker has picked up yet never starts
+            self.future.cancel()
+        return True
+
+    def run(self, stream_fn: Callable[..., Iterable[str]], *args, **kwargs):
+        """
+        Generate the answer, buffering chunks as they arrive. Runs on a worker thread.
+
+        Args:
+            stream_fn: Callable returning an iterable of text chunks (a plain string counts as one chunk)
+            *args: Positional arguments for stream_fn
+            **kwargs: Keyword arguments for stream_fn
+        """
+        chunks = None
+        # Backends find the job's token on this thread and abort their stream when it is cancelled
+        with bind_token(self.token):
+            try:
+                if not self.token.cancelled:
+                    result = stream_fn(*args, **kwargs)
+                    chunks = [result] if isinstance(result, str) else result
+                    for chunk in chunks:
+                        with self._condition:
+                            # Anything after cancellation (e.g. the aborted stream's error) is dropped
+                            if self.token.cancelled:
+                                break
+                            self.chunks.append(chunk)
+                            self._condition.notify_all()
+            except Exception as e:
+                if not self.token.cancelled:
+                    logger.error(f"Background chat job failed: {str(e)}")
+                    with self._condition:
+                        self.error = e
+                        self.chunks = [error_response(e)]
+            finally:
+                # Closing the generator closes the backend's HTTP stream
+                if hasattr(chunks, "close"):
+                    chunks.close()
+                if self.token.cancelled:
+                    telemetry.get_metrics().inc("chat_cancelled_total", reason=self.token.reason)
+                with self._condition:
+                    self.done = True
+                    self.finished_at = time.monotonic()
+                    self._condition.notify_all()
+
+    def wait_for_update(self, seen_chunks: int, timeout: float) -> int:
+        """
+        Wait until more chunks arrive or the job finishes. Each call counts as
+        the session still waiting for the answer.
+
+        Args:
+            seen_chunks: Number of chunks the caller has already rendered
+            timeout: Maximum seconds to wait
+
+        Returns:
+            The current number of chunks
+        """
+        self.last_polled = time.monotonic()
+        with self._condition:
+            self._condition.wait_for(lambda: self.done or len(self.chunks) > seen_chunks, timeout)
+            return len(self.chunks)
+
+
+class ChatWorkerPool:
+    """
+    Bounded thread pool running at most one chat job per session.
+    """
+
+    def __init__(self, max_workers: int = 8, finished_ttl: float = 600.0, abandon_after: float = 30.0,
+                 sweep_interval: float = 5.0):
+        """
+        Initialize the worker pool.
+
+        Args:
+            max_workers: Maximum concurrent generations (and upstream calls) per process
+            finished_ttl: Seconds a finished job is kept for its session to collect it
+            abandon_after: Seconds without a poll after which a running job is cancelled
+                (its session is gone); 0 disables this
+            sweep_interval: Seconds between sweeps for abandoned and uncollected jobs
+        """
+        self.max_workers = max_workers
+        self.finished_ttl = finished_ttl
+        self.abandon_after = abandon_after
+        self.sweep_interval = sweep_interval
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="chat-worker")
+        self._jobs: Dict[str, ChatJob] = {}
+        self._lock = threading.Lock()
+        self._sweeper: Optional[threading.Thread] = None
+
+    def submit(self, session_id: str, message: str, stream_fn: Callable[..., Iterable[str]],
+               *args, **kwargs) -> ChatJob:
+        """
+        Start generating an answer for a session.
+
+        If the session already has a pending job, that job is returned instead
+        of starting a second one (cancel it first to replace it).
+
+        Args:
+            session_id: The visitor session
+            message: The question being answered
+            stream_fn: Callable returning an iterable of text chunks or a string
+            *args: Positional arguments for stream_fn
+            **kwargs: Keyword arguments for stream_fn
+
+        Returns:
+            The session's ChatJob
+        """
+        with self._lock:
+            self._drop_abandoned()
+            existing = self._jobs.get(session_id)
+            if existing is not None and not existing.done and not existing.cancelled:
+                return existing
+
+            job = ChatJob(session_id, message)
+            self._jobs[session_id] = job
+            job.future = self._executor.submit(job.run, stream_fn, *args, **kwargs)
+            self._start_sweeper()
+            return job
+
+    def get(self, session_id: str) -> Optional[ChatJob]:
+        """Get the session's current job (pending or finished but not yet collected)."""
+        with self._lock:
+            return self._jobs.get(session_id)
+
+    def busy(self, session_id: str) -> bool:
+        """Check whether the session has an answer still being generated."""
+        job = self.get(session_id)
+        return job is not None and not job.done and not job.cancelled
+
+    def cancel(self, session_id: str, reason: str) -> Optional[ChatJob]:
+        """
+        Cancel the session's pending job and forget it.
+
+        Args:
+            session_id: The visitor session
+            reason: Why the job was cancelled ("navigation", "resubmitted", ...)
+
+        Returns:
+            The cancelled job (with any partial text), or None if nothing was pending
+        """
+        with self._lock:
+            job = self._jobs.get(session_id)
+            if job is None or job.done:
+                return None
+            del self._jobs[session_id]
+        job.cancel(reason)
+        return job
+
+    def finish(self, session_id: str, job: Optional[ChatJob] = None):
+        """
+        Forget a session's job once its answer has been collected.
+
+        Args:
+            session_id: The visitor session
+            job: Only remove the entry if it is still this job
+        """
+        with self._lock:
+            if job is None or self._jobs.get(session_id) is job:
+                self._jobs.pop(session_id, None)
+
+    def _drop_abandoned(self):
+        """
+        Drop finished jobs nobody collected and cancel running jobs nobody is
+        waiting for (e.g. the visitor left). Must be called with the lock held.
+        """
+        now = time.monotonic()
+        for session_id, job in list(self._jobs.items()):
+            if job.done:
+                if now - job.finished_at > self.finished_ttl:
+                    del self._jobs[session_id]
+            elif self.abandon_after and now - job.last_polled > self.abandon_after:
+                del self._jobs[session_id]
+                job.cancel("abandoned")
+
+    def _start_sweeper(self):
+        """Start the sweeper thread on first use. Must be called with the lock held."""
+        if self._sweeper is None:
+            self._sweeper = threading.Thread(target=self._sweep_loop, name="chat-job-sweeper", daemon=True)
+            self._sweeper.start()
+
+    def _sweep_loop(self):
+        """Periodically cancel abandoned jobs and drop uncollected ones (runs on the sweeper thread)."""
+        while True:
+            time.sleep(self.sweep_interval)
+            with self._lock:
+                self._drop_abandoned()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report the pool's load.
+
+        Returns:
+            Dictionary with max_workers and the number of running, queued and finished jobs
+        """
+        with self._lock:
+            self._drop_abandoned()
+            jobs = list(self._jobs.values())
+        running = sum(1 for job in jobs if job.started and not job.done)
+        finished = sum(1 for job in jobs if job.done)
+        return {
+            "max_workers": self.max_workers,
+            "running": running,
+            "queued": len(jobs) - running - finished,
+            "finished": finished,
+        }
+
+
+# Shared worker pool for the whole Streamlit server process
+_pool = ChatWorkerPool(
+    max_workers=int(os.environ.get("CHAT_WORKER_THREADS", "32")),
+    abandon_after=float(os.environ.get("CHAT_ABANDON_AFTER", "30")),
+)
+
+
+def get_chat_worker_pool() -> ChatWorkerPool:
+    """Get the process-wide chat worker pool."""
+    return _pool
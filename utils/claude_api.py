@@ -3,21 +3,150 @@ Utility to interact with the Anthropic Claude API for the portfolio chatbot.
 """
 
 import os
+import re
+import time
+import hashlib
+import logging
+import queue
+import threading
+import unicodedata
 import anthropic
-from typing import List, Dict, Any
+from collections import deque
+from typing import List, Dict, Any, Callable, Hashable, Iterable, Iterator, Optional, Union
+
+from utils.conversation_memory import build_messages
+from utils.retrieval import get_resume_index, retrieval_settings
+from utils.intent_router import IntentRouter, get_intent_router
+from utils.http_transport import anthropic_base_url, get_sdk_http_client, sdk_timeout
+from utils import telemetry
+from utils.cancellation import CancellationToken, RequestCancelled, SharedCancellationToken, current_token, bind_token, on_cancel
+from utils.model_routing import get_model_router
+from utils.chat_base import FriendlyChat, error_response
+
+logger = logging.getLogger(__name__)
+
+# Anything that isn't a letter, digit or whitespace is folded away
+_PUNCTUATION_RE = re.compile(r"[^\w\s]+", re.UNICODE)
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# Usage fields reported by the Messages API, including prompt-cache counters
+USAGE_FIELDS = (
+    "input_tokens",
+    "output_tokens",
+    "cache_creation_input_tokens",
+    "cache_read_input_tokens",
+)
+
+def normalize_question(question: str) -> str:
+    """
+    Normalize a question so trivially different phrasings are treated as the same request.
+    
+    Case, whitespace and punctuation are folded, e.g.
+    "What certifications do you have?" and "what  certifications do you have"
+    normalize to the same string.
+    
+    Args:
+        question: The raw question text
+        
+    Returns:
+        The normalized question
+    """
+    text = unicodedata.normalize("NFKC", question).casefold()
+    text = _PUNCTUATION_RE.sub(" ", text)
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+def prompt_caching_enabled() -> bool:
+    """
+    Check whether prompt caching is switched on via ANTHROPIC_PROMPT_CACHING.
+    
+    Returns:
+        True if the environment variable is set to a truthy value
+    """
+    return os.environ.get("ANTHROPIC_PROMPT_CACHING", "").lower() in ("1", "true", "yes", "on")
+
+def is_server_api_key(api_key: Optional[str]) -> bool:
+    """
+    Check whether an API key is the site's own ANTHROPIC_API_KEY rather than one
+    a visitor entered; only the site's key counts against the daily budget.
+    
+    Args:
+        api_key: The Anthropic API key, if any
+        
+    Returns:
+        True if the key is set and matches ANTHROPIC_API_KEY
+    """
+    return bool(api_key) and api_key == os.environ.get("ANTHROPIC_API_KEY")
+
+def build_system_blocks(system_prompt: str, cache: bool = False,
+                        context: str = "") -> Union[str, List[Dict[str, Any]]]:
+    """
+    Build the `system` parameter for a Messages API request.
+    
+    With caching enabled the static resume context is sent as a text block
+    marked with an ephemeral cache_control breakpoint, so later requests can
+    read it from the prompt cache instead of processing it again. Note that
+    prompts below the model's minimum cacheable length are processed normally.
+    Per-question retrieved context goes after the breakpoint so it never
+    invalidates the cached prefix.
+    
+    Args:
+        system_prompt: The static system prompt text
+        cache: Whether to mark the static prompt as cacheable
+        context: Optional retrieved context relevant to the current question
+        
+    Returns:
+        The plain prompt string, or a list of text blocks (the first one cacheable)
+    """
+    context_text = f"\n\nRelevant background for this question:\n{context}" if context else ""
+    if not cache:
+        return system_prompt + context_text
+    blocks = [
+        {
+            "type": "text",
+            "text": system_prompt,
+            "cache_control": {"type": "ephemeral"},
+        }
+    ]
+    if context_text:
+        blocks.append({"type": "text", "text": context_text.lstrip()})
+    return blocks
+
+def usage_to_dict(usage: Any) -> Dict[str, int]:
+    """
+    Normalize a response usage object (SDK model or raw JSON dict) into a dict.
+    
+    Args:
+        usage: The `usage` attribute/field of a Messages API response
+        
+    Returns:
+        Dictionary with every field in USAGE_FIELDS (missing values count as 0)
+    """
+    if usage is None:
+        return {field: 0 for field in USAGE_FIELDS}
+    if isinstance(usage, dict):
+        return {field: usage.get(field) or 0 for field in USAGE_FIELDS}
+    return {field: getattr(usage, field, None) or 0 for field in USAGE_FIELDS}
 
 class ClaudeChat:
     """
     A class to handle Claude chat interactions with proper context management.
     """
     
-    def __init__(self, api_key: str = None, model: str = "claude-3-haiku-20240307"):
+    def __init__(self, api_key: str = None, model: str = "claude-3-haiku-20240307",
+                 prompt_caching: bool = None, client: Any = None, max_retries: int = 2,
+                 base_url: str = None, metered: bool = None):
         """
         Initialize the Claude chat integration.
         
         Args:
             api_key: The Anthropic API key (if None, will try to get from environment)
             model: The Claude model to use
+            prompt_caching: Mark the system prompt as cacheable (if None, read ANTHROPIC_PROMPT_CACHING)
+            client: Optional pre-built client, e.g. utils.stubs.RecordingAnthropicClient for offline checks
+            max_retries: SDK-level retries (set to 0 when wrapped in utils.resilience.ResilientChat)
+            base_url: API base URL (if None, ANTHROPIC_BASE_URL or the public API)
+            metered: Record usage in the daily ledger and apply its budget caps (if None,
+                only for the site's own ANTHROPIC_API_KEY, never for a visitor's key)
         """
         # Use provided API key or try to get from environment
         self.api_key = api_key or os.environ.get("ANTHROPIC_API_KEY")
@@ -25,8 +154,21 @@ class ClaudeChat:
             raise ValueError("No API key provided. Set ANTHROPIC_API_KEY environment variable or pass api_key parameter.")
             
         self.model = model
-        self.client = anthropic.Anthropic(api_key=self.api_key)
+        self.metered = is_server_api_key(self.api_key) if metered is None else metered
+        # Backends share one pooled keep-alive HTTP client with connect/read timeouts
+        self.client = client or anthropic.Anthropic(
+            api_key=self.api_key, max_retries=max_retries, base_url=base_url or anthropic_base_url(),
+            http_client=get_sdk_http_client(), timeout=sdk_timeout()
+        )
         self.system_prompt = ""
+        self.retriever = None
+        self.intent_router = None
+        self.prompt_caching = prompt_caching_enabled() if prompt_caching is None else prompt_caching
+        
+        # Token usage of the latest call and running totals (backends are shared across sessions)
+        self.last_usage = usage_to_dict(None)
+        self.usage_totals = usage_to_dict(None)
+        self._usage_lock = threading.Lock()
         
     def set_system_prompt(self, resume_context: Dict[str, Any]):
         """
@@ -60,29 +202,166 @@ class ClaudeChat:
         in the job process. Focus on factual information from the resume.
         """
         
-    def get_response(self, user_message: str) -> str:
+        # Index the full resume so each question gets the details relevant to it
+        self.retriever = get_resume_index(resume_context)
+        # Intent index used to classify questions for model routing
+        self.intent_router = get_intent_router(resume_context)
+        
+    def _system(self, user_message: str) -> Union[str, List[Dict[str, Any]]]:
+        """
+        Build the system parameter for a question: the static prompt plus retrieved context.
+        
+        Args:
+            user_message: The message from the user/employer
+            
+        Returns:
+            The `system` parameter for the request
+        """
+        context = ""
+        if self.retriever is not None:
+            token_budget, top_k = retrieval_settings()
+            context = self.retriever.build_context(user_message, token_budget=token_budget, k=top_k)
+        return build_system_blocks(self.system_prompt, cache=self.prompt_caching, context=context)
+        
+    def _route(self, user_message: str, history: List[Dict[str, str]] = None, model: str = None):
+        """
+        Pick the model tier and output-token cap for a question, within the latency
+        SLO and (for metered keys) the daily budget.
+        
+        Args:
+            user_message: The message from the user/employer
+            history: Prior turns sent with the question, if any
+            model: Optional model overriding the routed tier's model
+            
+        Returns:
+            The RoutingDecision (self.model is used for tiers without a configured model);
+            it names a faster model while shedding load, and the cheaper soft-cap
+            model past the soft budget cap
+            
+        Raises:
+            BudgetExceeded: Past the hard budget cap, for metered keys
+        """
+        # Imported here to avoid circular imports with the shedder and ledger modules
+        from utils.load_shedding import get_load_shedder
+        from utils.usage_ledger import get_usage_ledger
+        decision = get_model_router().route(user_message, self.model, history, self.intent_router)
+        if model:
+            decision.model = model
+        decision = get_load_shedder().apply(decision)
+        if not self.metered:
+            return decision
+        return get_usage_ledger().apply_budget(decision)
+        
+    def _record_usage(self, usage: Any, model: str):
+        """
+        Record token usage, including prompt-cache reads and writes, from a response.
+        
+        Args:
+            usage: The usage object of a Messages API response
+            model: The model that answered, for the daily usage ledger (metered keys only)
+        """
+        from utils.usage_ledger import get_usage_ledger
+        usage = usage_to_dict(usage)
+        with self._usage_lock:
+            self.last_usage = usage
+            for field in USAGE_FIELDS:
+                self.usage_totals[field] += usage[field]
+        telemetry.note(backend="live", usage=usage)
+        if self.metered:
+            get_usage_ledger().record(model, usage)
+        logger.debug(
+            f"Claude usage: input={usage['input_tokens']} output={usage['output_tokens']} "
+            f"cache_read={usage['cache_read_input_tokens']} cache_write={usage['cache_creation_input_tokens']}"
+        )
+        
+    def create_response(self, user_message: str, timeout: float = None,
+                        history: List[Dict[str, str]] = None, model: str = None) -> str:
+        """
+        Get a response from Claude, raising on API errors.
+        
+        Args:
+            user_message: The message from the user/employer
+            timeout: Optional per-request timeout in seconds
+            history: Prior turns from ConversationMemory.build_history(), if any
+            model: Optional model overriding the routed tier's model (e.g. for a hedge request)
+            
+        Returns:
+            Claude's response as a string
+        """
+        # Call the Claude API with the system prompt and user message, on the routed model tier
+        decision = self._route(user_message, history, model)
+        telemetry.note(model=decision.model)
+        response = self.client.messages.create(
+            model=decision.model,
+            system=self._system(user_message),
+            messages=build_messages(history, user_message),
+            max_tokens=decision.max_tokens,
+            **({"timeout": timeout} if timeout is not None else {}),
+        )
+        self._record_usage(response.usage, decision.model)
+        return response.content[0].text
+        
+    def stream_text(self, user_message: str, timeout: float = None,
+                    history: List[Dict[str, str]] = None, model: str = None) -> Iterator[str]:
+        """
+        Stream Claude's response as text deltas, raising on API errors.
+        
+        Args:
+            user_message: The message from the user/employer
+            timeout: Optional per-request timeout in seconds
+            history: Prior turns from ConversationMemory.build_history(), if any
+            model: Optional model overriding the routed tier's model (e.g. for a hedge request)
+            
+        Yields:
+            Text deltas of Claude's response, in order
+        """
+        # Open a streaming request so text arrives as soon as it is generated
+        decision = self._route(user_message, history, model)
+        telemetry.note(model=decision.model)
+        with self.client.messages.stream(
+            model=decision.model,
+            system=self._system(user_message),
+            messages=build_messages(history, user_message),
+            max_tokens=decision.max_tokens,
+            **({"timeout": timeout} if timeout is not None else {}),
+        ) as stream, on_cancel(stream.close):
+            # Cancelling the job closes the stream, aborting the generation upstream
+            for text in stream.text_stream:
+                yield text
+            self._record_usage(stream.get_final_message().usage, decision.model)
+        
+    def get_response(self, user_message: str, **options) -> str:
         """
         Get a response from Claude based on the user's message.
         
         Args:
             user_message: The message from the user/employer
+            **options: Passed through to create_response (e.g. timeout, history)
             
         Returns:
             Claude's response as a string
         """
         try:
-            # Call the Claude API with the system prompt and user message
-            response = self.client.messages.create(
-                model=self.model,
-                system=self.system_prompt,
-                messages=[
-                    {"role": "user", "content": user_message}
-                ],
-                max_tokens=1000,
-            )
-            return response.content[0].text
+            return self.create_response(user_message, **options)
+        except Exception as e:
+            return error_response(e)
+
+    def stream_response(self, user_message: str, **options) -> Iterator[str]:
+        """
+        Stream Claude's response to the user's message as it is generated.
+        
+        Args:
+            user_message: The message from the user/employer
+            **options: Passed through to stream_text (e.g. timeout, history)
+            
+        Yields:
+            Text deltas of Claude's response, in order
+        """
+        try:
+            for text in self.stream_text(user_message, **options):
+                yield text
         except Exception as e:
-            return f"Sorry, I encountered an error: {str(e)}. Please try again or contact Kelby directly."
+            yield error_response(e)
 
 # Mock version for development without API key
 class MockClaudeChat:
@@ -91,38 +370,511 @@ class MockClaudeChat:
     """
     
     def __init__(self, *args, **kwargs):
+        self.model = "mock"
         self.system_prompt = ""
+        # Keyword intents only until resume data is provided
+        self.router = IntentRouter.from_resume_context({})
     
     def set_system_prompt(self, resume_context: Dict[str, Any]):
-        """Sets the mock system prompt"""
+        """Sets the mock system prompt and compiles the intent router from the resume data"""
         self.system_prompt = "Mock system prompt set"
+        self.router = get_intent_router(resume_context)
     
-    def get_response(self, user_message: str) -> str:
+    def get_response(self, user_message: str, **options) -> str:
         """
-        Return mock responses based on keywords in the user message.
+        Return the mock response of the intent that best matches the user message.
         
         Args:
             user_message: The message from the user/employer
+            **options: Accepted for interface compatibility and ignored
             
         Returns:
             A mock response as a string
         """
-        user_message = user_message.lower()
+        telemetry.note(backend="mock")
+        return self.router.respond(user_message)
+
+    def stream_response(self, user_message: str, **options) -> Iterator[str]:
+        """
+        Stream the mock response word by word, mirroring ClaudeChat.stream_response.
         
-        if "experience" in user_message or "background" in user_message:
-            return "Kelby has over 15 years of experience in IT, with a strong focus on AWS cloud technologies, training, and AI implementation. Most recently, Kelby served as a Technical Enablement Lead at Mission Cloud, developing AI/GenAI solutions and cloud training programs."
+        Args:
+            user_message: The message from the user/employer
+            **options: Accepted for interface compatibility and ignored
             
-        elif "aws" in user_message or "cloud" in user_message:
-            return "Kelby has extensive AWS experience across multiple services including Bedrock, Q, OpenSearch, EC2, RDS, S3, and CloudFormation. Kelby has held AWS certifications including Solutions Architect Associate, SysOps Administrator Associate, and Database Specialty, and has worked directly at AWS as a Cloud Support Engineer."
+        Yields:
+            Chunks of the mock response, in order
+        """
+        for chunk in re.findall(r"\S+\s*", self.get_response(user_message)):
+            yield chunk
+
+    # Mock responses never fail, so the raising variants are the same calls
+    create_response = get_response
+    stream_text = stream_response
+
+class _InFlightCall:
+    """State shared between the callers of one coalesced request."""
+    
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.chunks: List[str] = []
+        self.done = False
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        # Held by every caller waiting for the call; the upstream call is aborted once all have gone
+        self.token = SharedCancellationToken()
+
+class RequestCoalescer:
+    """
+    Single-flight coalescing of identical in-flight requests.
+    
+    The first caller for a key (the leader) starts the upstream call; callers
+    that arrive with the same key while it is running (followers) wait for,
+    and share, its result instead of making their own call. The upstream call
+    runs on its own thread under a SharedCancellationToken, so a caller that is
+    cancelled or stops reading (including the leader) only stops waiting: the
+    call is aborted once every caller has gone.
+    """
+    
+    def __init__(self):
+        self._calls: Dict[Hashable, _InFlightCall] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.followers = 0
+        
+    def _join(self, key: Hashable, token: Optional[CancellationToken]):
+        """Register as leader or follower for a key. Returns (call, is_leader)."""
+        with self._lock:
+            call = self._calls.get(key)
+            # A call every earlier caller abandoned is being aborted, so it can't be joined
+            if call is not None and call.token.hold(token):
+                self.followers += 1
+                return call, False
+            call = self._calls[key] = _InFlightCall()
+            call.token.hold(token)
+            self.leaders += 1
+            return call, True
             
-        elif "ai" in user_message or "generative" in user_message or "claude" in user_message:
-            return "Kelby has hands-on experience with AI and GenAI technologies, including building RAG systems with Amazon Bedrock, creating Custom GPTs, and implementing AI solutions for business teams. Kelby also developed and launched an AI/GenAI Essentials course completed by over 240 employees."
+    def _finish(self, key: Hashable, call: _InFlightCall, result: Any = None, error: BaseException = None):
+        """Publish the call's outcome and release the key for new requests."""
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+        with call.condition:
+            call.result = result
+            call.error = error
+            call.done = True
+            call.condition.notify_all()
             
-        elif "training" in user_message or "teaching" in user_message or "education" in user_message:
-            return "Kelby excels in technical training and enablement, having created AWS certification programs, developed an apprenticeship program with a 73% conversion rate to full-time roles, and served as an AWS Training Architect at Linux Academy/A Cloud Guru creating courses and hands-on labs."
+    def _start(self, key: Hashable, call: _InFlightCall, streaming: bool,
+               fn: Callable[..., Any], args: tuple, kwargs: Dict[str, Any]):
+        """Run the upstream call on a helper thread, publishing its chunks and outcome."""
+        # The leader's telemetry record is annotated with the backend and usage of the call
+        record = telemetry.current_record()
+        
+        def produce():
+            with telemetry.bind_record(record), bind_token(call.token):
+                chunks = None
+                try:
+                    if not streaming:
+                        result = fn(*args, **kwargs)
+                    else:
+                        chunks = fn(*args, **kwargs)
+                        for chunk in chunks:
+                            if call.token.cancelled:
+                                raise RequestCancelled(call.token.reason)
+                            with call.condition:
+                                call.chunks.append(chunk)
+                                call.condition.notify_all()
+                        result = "".join(call.chunks)
+                except BaseException as e:
+                    self._finish(key, call, error=e)
+                else:
+                    self._finish(key, call, result=result)
+                finally:
+                    # Closing the generator closes the upstream HTTP stream
+                    if hasattr(chunks, "close"):
+                        chunks.close()
+        
+        threading.Thread(target=produce, name="chat-coalesced", daemon=True).start()
+        
+    def _wait(self, call: _InFlightCall, token: Optional[CancellationToken]) -> Iterator[str]:
+        """
+        Follow a call's chunks until it finishes, raising its error, if any.
+        
+        Raises:
+            RequestCancelled: If the caller's token is cancelled first
+        """
+        def wake():
+            with call.condition:
+                call.condition.notify_all()
+        
+        remove = token.add_callback(wake) if token is not None else None
+        index = 0
+        try:
+            while True:
+                with call.condition:
+                    call.condition.wait_for(
+                        lambda: call.done or len(call.chunks) > index or (token is not None and token.cancelled))
+                    new_chunks = call.chunks[index:]
+                    finished = call.done
+                if token is not None and token.cancelled:
+                    raise RequestCancelled(token.reason)
+                for chunk in new_chunks:
+                    yield chunk
+                index += len(new_chunks)
+                if finished and index >= len(call.chunks):
+                    break
+        finally:
+            if remove is not None:
+                remove()
+            # Leaving (done, cancelled or no longer read) aborts the call if no one else waits for it
+            call.token.release(token)
+        if call.error is not None:
+            raise call.error
+        
+    def run(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Call fn(*args, **kwargs) unless an identical call is already in flight.
+        
+        Args:
+            key: Identity of the request (e.g. normalized prompt, model, context version)
+            fn: The upstream call
             
-        elif "salary" in user_message or "compensation" in user_message:
-            return "For specific discussions about salary expectations and compensation, I'd recommend reaching out to Kelby directly via email at kelby.james.enevold@gmail.com or phone at 208-553-8095."
+        Returns:
+            The result of the shared call (errors are re-raised to every waiter)
+        """
+        token = current_token()
+        call, is_leader = self._join(key, token)
+        if is_leader:
+            self._start(key, call, False, fn, args, kwargs)
+        else:
+            telemetry.note(backend="coalesced")
+        for _ in self._wait(call, token):
+            pass
+        return call.result
+        
+    def stream(self, key: Hashable, fn: Callable[..., Iterator[str]], *args, **kwargs) -> Iterator[str]:
+        """
+        Stream fn(*args, **kwargs) unless an identical stream is already in flight,
+        in which case its chunks so far are replayed and then followed live.
+        
+        Args:
+            key: Identity of the request (e.g. normalized prompt, model, context version)
+            fn: The upstream streaming call
             
+        Yields:
+            Text chunks of the shared stream
+        """
+        token = current_token()
+        call, is_leader = self._join(key, token)
+        if is_leader:
+            self._start(key, call, True, fn, args, kwargs)
         else:
-            return "I'd be happy to tell you more about Kelby's experience and qualifications. Feel free to ask about specific skills, projects, or how Kelby might fit with your team's needs. Kelby is particularly skilled in AWS technologies, AI implementation, and technical training/enablement."
\ No newline at end of file
+            telemetry.note(backend="coalesced")
+        for chunk in self._wait(call, token):
+            yield chunk
+        
+    def in_flight(self) -> int:
+        """Number of distinct requests currently in flight."""
+        with self._lock:
+            return len(self._calls)
+
+class IdempotencyGuard:
+    """
+    Drops repeated submissions of the same idempotency key within a short window,
+    e.g. a double-clicked send button.
+    """
+    
+    def __init__(self, window_seconds: float = 5.0):
+        """
+        Initialize the guard.
+        
+        Args:
+            window_seconds: How long a key counts as a duplicate after it was accepted
+        """
+        self.window_seconds = window_seconds
+        self._seen: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        
+    def accept(self, key: str) -> bool:
+        """
+        Check a submission and remember it.
+        
+        Args:
+            key: Idempotency key from make_idempotency_key()
+            
+        Returns:
+            True if the submission is new, False if it is a duplicate to drop
+        """
+        now = time.monotonic()
+        with self._lock:
+            # Forget keys outside the window so the map stays small
+            self._seen = {k: t for k, t in self._seen.items() if now - t < self.window_seconds}
+            if key in self._seen:
+                return False
+            self._seen[key] = now
+            return True
+
+def make_idempotency_key(session_id: str, message: str) -> str:
+    """
+    Build the idempotency key for a chat submission.
+    
+    Args:
+        session_id: Identifier of the visitor's session
+        message: The submitted message
+        
+    Returns:
+        A hex digest identifying this session/message pair
+    """
+    payload = f"{session_id}\x00{normalize_question(message)}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+# Shared coalescer for the whole Streamlit server process
+_coalescer = RequestCoalescer()
+
+def get_request_coalescer() -> RequestCoalescer:
+    """
+    Get the process-wide request coalescer.
+    
+    Returns:
+        The shared RequestCoalescer instance
+    """
+    return _coalescer
+
+def hedging_enabled() -> bool:
+    """
+    Check whether hedged requests are switched on via CHAT_HEDGING.
+    
+    Returns:
+        True if the environment variable is set to a truthy value
+    """
+    return os.environ.get("CHAT_HEDGING", "").lower() in ("1", "true", "yes", "on")
+
+class HedgedChat(FriendlyChat):
+    """
+    Hedged requests around a ClaudeChat to cut tail latency.
+    
+    If the primary request has not produced its first token within a threshold,
+    a second request is fired (optionally to a faster model) and whichever
+    produces text first is used. The loser is cancelled: it stops reading at
+    its next chunk and its stream is closed, and a losing hedge that is still
+    waiting for an admission slot leaves the queue. The threshold is a percentile of
+    recently observed time-to-first-token, clamped to [min_delay, max_delay].
+    """
+    
+    def __init__(self, backend: Any, percentile: float = 0.95, initial_delay: float = 2.0,
+                 min_delay: float = 0.25, max_delay: float = 10.0, hedge_model: Optional[str] = None,
+                 window: int = 200, min_samples: int = 20):
+        """
+        Initialize the hedging wrapper.
+        
+        Args:
+            backend: The ClaudeChat to hedge, or an AdmittedChat around it so each
+                attempt holds its own admission slot (must accept a `model` option)
+            percentile: Time-to-first-token percentile used as the hedge threshold
+            initial_delay: Threshold in seconds until min_samples requests have been observed
+            min_delay: Lower bound of the threshold in seconds
+            max_delay: Upper bound of the threshold in seconds
+            hedge_model: Model for the hedge request (None = the primary's routed model)
+            window: Number of recent time-to-first-token samples kept
+            min_samples: Samples needed before the percentile is used
+        """
+        self.backend = backend
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.hedge_model = hedge_model
+        self.min_samples = min_samples
+        self._samples: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        
+    @classmethod
+    def from_env(cls, backend: Any) -> "HedgedChat":
+        """Wrap a backend using CHAT_HEDGE_* environment variables."""
+        return cls(
+            backend,
+            percentile=float(os.environ.get("CHAT_HEDGE_PERCENTILE", "0.95")),
+            initial_delay=float(os.environ.get("CHAT_HEDGE_INITIAL_DELAY", "2.0")),
+            min_delay=float(os.environ.get("CHAT_HEDGE_MIN_DELAY", "0.25")),
+            max_delay=float(os.environ.get("CHAT_HEDGE_MAX_DELAY", "10")),
+            hedge_model=os.environ.get("CHAT_HEDGE_MODEL") or None,
+        )
+        
+    @property
+    def model(self) -> str:
+        return self.backend.model
+        
+    def set_system_prompt(self, resume_context: Dict[str, Any]):
+        """Set the system prompt on the wrapped backend."""
+        self.backend.set_system_prompt(resume_context)
+        
+    def hedge_delay(self) -> float:
+        """
+        Get the current hedge threshold.
+        
+        Returns:
+            Seconds to wait for the primary's first token before hedging
+        """
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return self.initial_delay
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(self.percentile * len(ordered)))
+        return min(self.max_delay, max(self.min_delay, ordered[index]))
+        
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report how often requests were hedged and how often the hedge won.
+        
+        Returns:
+            Dictionary with requests, hedged, hedge_wins, hedge_rate, hedge_win_rate and the current threshold
+        """
+        with self._lock:
+            requests, hedged, wins = self.requests, self.hedged, self.hedge_wins
+        return {
+            "requests": requests,
+            "hedged": hedged,
+            "hedge_wins": wins,
+            "hedge_rate": hedged / requests if requests else 0.0,
+            "hedge_win_rate": wins / hedged if hedged else 0.0,
+            "threshold_seconds": self.hedge_delay(),
+        }
+        
+    def _race(self, start: Callable[[Dict[str, Any]], Iterable[str]]) -> Iterator[str]:
+        """
+        Run the primary request and, if it is slow to start, a hedge; yield the winner's chunks.
+        
+        Args:
+            start: Callable taking extra options ({} for the primary, {"model": ...} for the
+                hedge) and returning the request's chunks; it runs on a helper thread
+                
+        Yields:
+            Text chunks of the winning request
+        """
+        events: "queue.Queue" = queue.Queue()
+        cancelled = {"primary": threading.Event(), "hedge": threading.Event()}
+        record = telemetry.current_record()
+        token = current_token()
+        # The hedge runs under its own token, so losing the race closes its stream at once
+        # (or takes it out of the admission queue); cancelling the caller's job cancels it too
+        hedge_token = CancellationToken()
+        unlink = token.add_callback(lambda: hedge_token.cancel(token.reason)) if token is not None else None
+        tokens = {"primary": token, "hedge": hedge_token}
+        
+        def run(name: str, extra: Dict[str, Any]):
+            # Usage of both requests is reported on the caller's telemetry record,
+            # and cancelling the caller's job closes both streams
+            with telemetry.bind_record(record), bind_token(tokens[name]):
+                chunks = None
+                try:
+                    chunks = start(extra)
+                    for chunk in chunks:
+                        if cancelled[name].is_set():
+                            return
+                        events.put((name, "chunk", chunk))
+                    events.put((name, "done", None))
+                except BaseException as e:
+                    events.put((name, "error", e))
+                finally:
+                    # Closing the generator closes the loser's HTTP stream
+                    if hasattr(chunks, "close"):
+                        chunks.close()
+        
+        def launch(name: str, extra: Dict[str, Any]):
+            threading.Thread(target=run, args=(name, extra), name=f"chat-hedge-{name}", daemon=True).start()
+        
+        started = time.monotonic()
+        threshold = self.hedge_delay()
+        launch("primary", {})
+        running = {"primary"}
+        hedged = False
+        errors: Dict[str, BaseException] = {}
+        winner = None
+        try:
+            # Wait for the first event that decides the race
+            while winner is None:
+                try:
+                    timeout = None if hedged else max(0.0, started + threshold - time.monotonic())
+                    name, kind, value = events.get(timeout=timeout)
+                except queue.Empty:
+                    hedged = True
+                    running.add("hedge")
+                    launch("hedge", {"model": self.hedge_model} if self.hedge_model else {})
+                    logger.info(f"Hedging chat request after {threshold:.2f}s without a first token")
+                    continue
+                if kind == "error":
+                    errors[name] = value
+                    running.discard(name)
+                    if not running:
+                        raise errors.get("primary", value)
+                    continue
+                winner = name
+            
+            self._record_race(time.monotonic() - started, hedged, winner)
+            if hedged:
+                cancelled["hedge" if winner == "primary" else "primary"].set()
+                if winner == "primary":
+                    hedge_token.cancel("hedge lost")
+            
+            # Relay the winner's chunks, ignoring whatever the loser still sends
+            while True:
+                if kind == "chunk":
+                    yield value
+                elif kind == "done":
+                    return
+                else:
+                    raise value
+                name, kind, value = events.get()
+                while name != winner:
+                    name, kind, value = events.get()
+        finally:
+            for event in cancelled.values():
+                event.set()
+            if winner != "hedge":
+                hedge_token.cancel("hedge lost")
+            if unlink is not None:
+                unlink()
+        
+    def _record_race(self, first_token_seconds: float, hedged: bool, winner: str):
+        """Update the threshold samples and hedge statistics after a race is decided."""
+        with self._lock:
+            self._samples.append(first_token_seconds)
+            self.requests += 1
+            if hedged:
+                self.hedged += 1
+                if winner == "hedge":
+                    self.hedge_wins += 1
+        if hedged:
+            telemetry.get_metrics().inc("chat_hedges_total", winner=winner)
+        
+    def create_response(self, user_message: str, **options) -> str:
+        """
+        Get a response, hedging if the primary is slow (raising on errors).
+        
+        Args:
+            user_message: The message from the user/employer
+            **options: Passed through to the backend (e.g. timeout, history)
+            
+        Returns:
+            The response text
+        """
+        return "".join(self._race(lambda extra: [self.backend.create_response(user_message, **options, **extra)]))
+        
+    def stream_text(self, user_message: str, **options) -> Iterator[str]:
+        """
+        Stream a response, hedging if the primary's first token is slow (raising on errors).
+        
+        Args:
+            user_message: The message from the user/employer
+            **options: Passed through to the backend (e.g. timeout, history)
+            
+        Yields:
+            Text deltas of the winning response, in order
+        """
+        for text in self._race(lambda extra: self.backend.stream_text(user_message, **options, **extra)):
+            yield text
@@ -0,0 +1,195 @@
+"""
+Token-budgeted conversation memory for multi-turn chat.
+
+Recent turns are sent verbatim; older turns are folded into a compact running
+summary, so the input size of each request stays bounded however long the
+conversation gets. Token counts are estimated locally (no network calls).
+"""
+
+import os
+import re
+from typing import List, Dict, Any, Optional
+
+# Roughly four characters per token for English text
+CHARS_PER_TOKEN = 4
+
+# Fixed per-message overhead (role markers, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens in a piece of text.
+
+    Args:
+        text: The text to measure
+
+    Returns:
+        Estimated token count (at least 1 for non-empty text)
+    """
+    if not text:
+        return 0
+    return max(1, (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN)
+
+
+def to_messages(history: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """
+    Convert chat history entries to Messages API format.
+
+    Accepts the chat engine's {"role", "content"} entries as well as the
+    {"text", "is_user"} entries of histories saved by older versions.
+
+    Args:
+        history: Chat history entries
+
+    Returns:
+        List of {"role", "content"} messages
+    """
+    messages = []
+    for entry in history:
+        if "role" in entry:
+            messages.append({"role": entry["role"], "content": entry["content"]})
+        else:
+            messages.append({"role": "user" if entry["is_user"] else "assistant", "content": entry["text"]})
+    return messages
+
+
+def _first_sentence(text: str, max_chars: int) -> str:
+    """Take the first sentence of text, truncated to max_chars."""
+    sentence = _SENTENCE_END_RE.split(" ".join(text.split()), maxsplit=1)[0]
+    if len(sentence) > max_chars:
+        sentence = sentence[:max_chars - 3].rstrip() + "..."
+    return sentence
+
+
+class ConversationMemory:
+    """
+    Builds the message history to send with each turn within a token budget.
+
+    One instance is kept per visitor session; it remembers how much of the
+    history it has already folded into the running summary.
+    """
+
+    def __init__(self, token_budget: int = 1200, recent_messages: int = 6,
+                 summary_budget: int = 250, line_chars: int = 160):
+        """
+        Initialize the conversation memory.
+
+        Args:
+            token_budget: Maximum estimated tokens for summary plus verbatim history
+            recent_messages: Maximum number of recent messages sent verbatim
+            summary_budget: Maximum estimated tokens for the running summary
+            line_chars: Maximum characters kept per summarized message
+        """
+        self.token_budget = token_budget
+        self.recent_messages = recent_messages
+        self.summary_budget = min(summary_budget, token_budget)
+        self.line_chars = line_chars
+        self.summary_lines: List[str] = []
+        self.summarized_count = 0
+
+    @classmethod
+    def from_env(cls) -> "ConversationMemory":
+        """Build a memory from CHAT_MEMORY_* environment variables."""
+        return cls(
+            token_budget=int(os.environ.get("CHAT_MEMORY_TOKEN_BUDGET", "1200")),
+            recent_messages=int(os.environ.get("CHAT_MEMORY_RECENT_MESSAGES", "6")),
+            summary_budget=int(os.environ.get("CHAT_MEMORY_SUMMARY_BUDGET", "250")),
+        )
+
+    @property
+    def summary(self) -> str:
+        return " ".join(self.summary_lines)
+
+    def _fold(self, messages: List[Dict[str, str]]):
+        """Fold messages into the running summary, dropping the oldest lines past the budget."""
+        for message in messages:
+            speaker = "Visitor asked" if message["role"] == "user" else "Assistant answered"
+            self.summary_lines.append(f"{speaker}: {_first_sentence(message['content'], self.line_chars)}")
+        while self.summary_lines and estimate_tokens(self.summary) > self.summary_budget:
+            self.summary_lines.pop(0)
+
+    def build_history(self, history: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+        """
+        Build the prior-turn messages to send before the new user message.
+
+        Args:
+            history: Chat history so far, excluding the new user message
+
+        Returns:
+            Messages API messages starting with a user turn and alternating roles
+        """
+        messages = to_messages(history)
+
+        # The history was cleared or replaced; start a fresh summary
+        if len(messages) < self.summarized_count:
+            self.summary_lines = []
+            self.summarized_count = 0
+
+        # Keep the newest messages verbatim while they fit the budget
+        verbatim_budget = self.token_budget - self.summary_budget
+        start = len(messages)
+        used = 0
+        while start > self.summarized_count and len(messages) - start < self.recent_messages:
+            cost = estimate_tokens(messages[start - 1]["content"]) + MESSAGE_OVERHEAD_TOKENS
+            if used + cost > verbatim_budget:
+                break
+            used += cost
+            start -= 1
+
+        # Everything older than the verbatim window goes into the running summary
+        if start > self.summarized_count:
+            self._fold(messages[self.summarized_count:start])
+            self.summarized_count = start
+
+        recent = messages[start:]
+        if self.summary_lines:
+            recent = [{"role": "user", "content": f"(Summary of our earlier conversation: {self.summary})"},
+                      {"role": "assistant", "content": "Understood."}] + recent
+        return _alternate(recent)
+
+    def estimate_history_tokens(self, history_messages: List[Dict[str, str]]) -> int:
+        """
+        Estimate the tokens a built history will add to a request.
+
+        Args:
+            history_messages: Output of build_history()
+
+        Returns:
+            Estimated token count
+        """
+        return sum(estimate_tokens(m["content"]) + MESSAGE_OVERHEAD_TOKENS for m in history_messages)
+
+
+def _alternate(messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """
+    Make messages valid for the Messages API when followed by a user turn:
+    start with a user message, alternate roles, and end with an assistant message.
+    """
+    merged: List[Dict[str, str]] = []
+    for message in messages:
+        if merged and merged[-1]["role"] == message["role"]:
+            merged[-1] = {"role": message["role"], "content": merged[-1]["content"] + "\n\n" + message["content"]}
+        else:
+            merged.append(dict(message))
+    while merged and merged[0]["role"] != "user":
+        merged.pop(0)
+    while merged and merged[-1]["role"] != "assistant":
+        merged.pop()
+    return merged
+
+
+def build_messages(history_messages: Optional[List[Dict[str, str]]], user_message: str) -> List[Dict[str, str]]:
+    """
+    Append the new user message to a built history.
+
+    Args:
+        history_messages: Output of ConversationMemory.build_history(), or None
+        user_message: The new message from the user/employer
+
+    Returns:
+        The full `messages` list for a Messages API request
+    """
+    return list(history_messages or []) + [{"role": "user", "content": user_message}]
@@ -0,0 +1,220 @@
+"""
+Build step for the app's stylesheet.
+
+The CSS of every page lives in styles/*.css. build_bundle() merges the
+sheets in cascade order, hoists their @import rules, drops duplicate rules
+and minifies the result into one content-hashed file under static/, which
+Streamlit serves at app/static/ (server.enableStaticServing). Each rerun
+then sends a single <link> to that file instead of several kilobytes of
+<style> blocks, and browsers cache it until its content (and so its name)
+changes.
+
+The bundle is built on first use if it is missing; to build it ahead of
+time (e.g. in the Docker image), run:
+
+    python -m utils.css_bundle
+"""
+
+import os
+import re
+import glob
+import hashlib
+import logging
+import threading
+from typing import Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STYLES_DIR = os.path.join(ROOT_DIR, "styles")
+STATIC_DIR = os.path.join(ROOT_DIR, "static")
+
+# Sheets in cascade order (later sheets win ties, as when they were injected page by page)
+STYLESHEETS = ("header.css", "app.css", "home.css", "resume.css", "timeline.css", "chatbot.css")
+
+# Bundles are written to static/css/portfolio.<hash>.css
+BUNDLE_SUBDIR = "css"
+BUNDLE_PREFIX = "portfolio"
+
+# URL prefix Streamlit serves the static/ directory under
+STATIC_URL = "app/static"
+
+_COMMENT_RE = re.compile(r"/\*.*?\*/", re.DOTALL)
+_STRING_RE = re.compile(r"(\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*')")
+_WHITESPACE_RE = re.compile(r"\s+")
+_PUNCTUATION_SPACE_RE = re.compile(r"\s*([{};,>])\s*")
+_DECLARATION_COLON_RE = re.compile(r"([{;][-\w]+)\s*:\s*")
+
+
+def minify_css(css: str) -> str:
+    """
+    Strip comments and insignificant whitespace from a stylesheet.
+
+    Quoted strings are kept as they are, and whitespace that can be a
+    descendant combinator or matter inside values (e.g. calc()) is kept as
+    a single space.
+
+    Args:
+        css: The stylesheet
+
+    Returns:
+        The minified stylesheet
+    """
+    parts = _STRING_RE.split(_COMMENT_RE.sub("", css))
+    for i in range(0, len(parts), 2):
+        # Even parts are outside quoted strings
+        text = _WHITESPACE_RE.sub(" ", parts[i])
+        text = _PUNCTUATION_SPACE_RE.sub(r"\1", text)
+        parts[i] = _DECLARATION_COLON_RE.sub(r"\1:", text)
+    return "".join(parts).replace(";}", "}").strip()
+
+
+def split_statements(css: str) -> List[str]:
+    """
+    Split a minified stylesheet into its top-level statements.
+
+    Args:
+        css: The minified stylesheet
+
+    Returns:
+        Rules and at-rules (including nested blocks like @media), in order
+    """
+    statements = []
+    start = depth = parens = 0
+    quote = None
+    for i, char in enumerate(css):
+        if quote:
+            if char == quote and css[i - 1] != "\\":
+                quote = None
+        elif char in "\"'":
+            quote = char
+        elif char == "(":
+            parens += 1
+        elif char == ")":
+            parens -= 1
+        elif parens:
+            # Semicolons and braces inside url(...) aren't syntax
+            continue
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                statements.append(css[start:i + 1])
+                start = i + 1
+        elif char == ";" and depth == 0:
+            statements.append(css[start:i + 1])
+            start = i + 1
+    if css[start:].strip():
+        statements.append(css[start:].strip())
+    return statements
+
+
+def bundle_css(sheets: Iterable[str]) -> str:
+    """
+    Merge stylesheets into one minified sheet.
+
+    @import rules are hoisted to the top (CSS ignores them anywhere else)
+    and de-duplicated. A rule repeated verbatim is kept only at its last
+    position, which is the one that decided the cascade.
+
+    Args:
+        sheets: Stylesheet sources in cascade order
+
+    Returns:
+        The bundled stylesheet
+    """
+    imports: List[str] = []
+    rules: List[str] = []
+    for sheet in sheets:
+        for statement in split_statements(minify_css(sheet)):
+            if statement.startswith("@import"):
+                if statement not in imports:
+                    imports.append(statement)
+            else:
+                rules.append(statement)
+
+    seen = set()
+    unique = []
+    for rule in reversed(rules):
+        if rule not in seen:
+            seen.add(rule)
+            unique.append(rule)
+    return "".join(imports + unique[::-1]) + "\n"
+
+
+def build_bundle(styles_dir: str = STYLES_DIR, static_dir: str = STATIC_DIR,
+                 stylesheets: Iterable[str] = STYLESHEETS) -> str:
+    """
+    Write the content-hashed bundle of the stylesheets, removing stale bundles.
+
+    Args:
+        styles_dir: Directory of the source sheets
+        static_dir: Streamlit's static directory
+        stylesheets: Source sheet file names, in cascade order
+
+    Returns:
+        The bundle's path relative to static_dir (e.g. "css/portfolio.<hash>.css")
+    """
+    sheets = []
+    for name in stylesheets:
+        with open(os.path.join(styles_dir, name), encoding="utf-8") as f:
+            sheets.append(f.read())
+    bundle = bundle_css(sheets)
+    digest = hashlib.sha256(bundle.encode("utf-8")).hexdigest()[:12]
+    relative_path = f"{BUNDLE_SUBDIR}/{BUNDLE_PREFIX}.{digest}.css"
+
+    bundle_dir = os.path.join(static_dir, BUNDLE_SUBDIR)
+    path = os.path.join(static_dir, relative_path)
+    if not os.path.exists(path):
+        os.makedirs(bundle_dir, exist_ok=True)
+        # Write then rename, so another server process never serves a partial file
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(bundle)
+        os.replace(temp_path, path)
+        source_size = sum(len(sheet.encode("utf-8")) for sheet in sheets)
+        logger.info(f"Built CSS bundle {relative_path}: {source_size} -> {len(bundle.encode('utf-8'))} bytes")
+
+    for stale in glob.glob(os.path.join(bundle_dir, f"{BUNDLE_PREFIX}.*.css")):
+        if os.path.abspath(stale) != os.path.abspath(path):
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+    return relative_path
+
+
+_bundle_path: Optional[str] = None
+_bundle_lock = threading.Lock()
+
+
+def stylesheet_html() -> str:
+    """
+    Get the HTML that applies the app's stylesheet, building the bundle once per process.
+
+    Returns:
+        A <link> to the bundle under app/static/, or the bundle inlined in a
+        <style> block if it couldn't be written (e.g. a read-only file system)
+    """
+    global _bundle_path
+    with _bundle_lock:
+        if _bundle_path is None:
+            try:
+                _bundle_path = build_bundle()
+            except OSError as e:
+                logger.warning(f"Could not write the CSS bundle, inlining it instead: {str(e)}")
+                _bundle_path = ""
+    if _bundle_path:
+        return f'<link rel="stylesheet" href="{STATIC_URL}/{_bundle_path}">'
+
+    sheets = []
+    for name in STYLESHEETS:
+        with open(os.path.join(STYLES_DIR, name), encoding="utf-8") as f:
+            sheets.append(f.read())
+    return f"<style>{bundle_css(sheets)}</style>"
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(build_bundle())
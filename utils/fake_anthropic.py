@@ -0,0 +1,424 @@
+"""
+Local stand-in for the Anthropic Messages endpoint, for offline load testing.
+
+FakeAnthropicServer implements POST /v1/messages (JSON and SSE streaming) with
+configurable latency, token rate and error injection, and deterministic canned
+answers. Point the chat backends at it with ANTHROPIC_BASE_URL, e.g.:
+
+    python -m utils.fake_anthropic --requests 200 --concurrency 16 --stream
+
+starts a server and load-tests it through the chat client the app assembles
+(build_chat_client: FAQ answers, rate limits, budget, answer cache,
+coalescing and admission), with the quick questions, the FAQs and a share of
+unique prompts spread over many visitor sessions. It prints throughput,
+latency percentiles and how many requests each backend served.
+"""
+
+import os
+import json
+import time
+import random
+import hashlib
+import argparse
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Any, Callable, Optional
+
+from utils.conversation_memory import estimate_tokens
+
+CANNED_ANSWERS = [
+    "Kelby has over 15 years of experience in IT, focused on AWS cloud technologies, training and AI implementation.",
+    "Kelby has built RAG systems with Amazon Bedrock and launched an AI/GenAI Essentials course for over 240 employees.",
+    "Kelby created AWS certification programs and an apprenticeship program with a 73% conversion rate to full-time roles.",
+    "Kelby has held AWS certifications including Solutions Architect Associate, SysOps Administrator Associate and Database Specialty.",
+]
+
+
+class FakeServerConfig:
+    """
+    Latency, token rate and error injection settings for the fake server.
+    """
+
+    def __init__(self, first_token_ms: float = 300.0, latency_sigma: float = 0.5,
+                 tokens_per_second: float = 80.0, error_rates: Optional[Dict[str, float]] = None,
+                 hang_seconds: float = 30.0, seed: int = 0):
+        """
+        Initialize the configuration.
+
+        Args:
+            first_token_ms: Median delay before the first token (lognormal distribution)
+            latency_sigma: Spread of the first-token delay (sigma of the underlying normal; 0 = fixed)
+            tokens_per_second: Output token rate after the first token
+            error_rates: Probability per request of each injected failure:
+                "429" (rate limited), "529" (overloaded), "500" and "timeout" (hang, then drop)
+            hang_seconds: How long a "timeout" request hangs before the connection is closed
+            seed: Random seed, so a run's latencies and failures are reproducible
+        """
+        self.first_token_ms = first_token_ms
+        self.latency_sigma = latency_sigma
+        self.tokens_per_second = tokens_per_second
+        self.error_rates = dict(error_rates or {})
+        self.hang_seconds = hang_seconds
+        self.random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def first_token_delay(self) -> float:
+        """Draw a first-token delay in seconds."""
+        with self._lock:
+            factor = self.random.lognormvariate(0.0, self.latency_sigma) if self.latency_sigma > 0 else 1.0
+        return self.first_token_ms / 1000.0 * factor
+
+    def draw_failure(self) -> Optional[str]:
+        """Draw which failure (if any) to inject into a request."""
+        with self._lock:
+            roll = self.random.random()
+        for failure, rate in self.error_rates.items():
+            if roll < rate:
+                return failure
+            roll -= rate
+        return None
+
+
+def canned_answer(request: Dict[str, Any]) -> str:
+    """
+    Pick a deterministic answer for a request (same last user message, same answer).
+
+    Args:
+        request: The Messages API request body
+
+    Returns:
+        The answer text
+    """
+    content = request.get("messages", [{}])[-1].get("content", "")
+    if isinstance(content, list):
+        content = " ".join(block.get("text", "") for block in content)
+    digest = hashlib.sha256(str(content).encode("utf-8")).digest()
+    return CANNED_ANSWERS[digest[0] % len(CANNED_ANSWERS)]
+
+
+def _input_tokens(request: Dict[str, Any]) -> int:
+    system = request.get("system", "")
+    if isinstance(system, list):
+        system = " ".join(block.get("text", "") for block in system)
+    return estimate_tokens(system) + sum(estimate_tokens(str(m.get("content", ""))) for m in request.get("messages", []))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "FakeAnthropicServer"
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_error(self, status: int, error_type: str, message: str, headers: Optional[Dict[str, str]] = None):
+        self._send_json(status, {"type": "error", "error": {"type": error_type, "message": message}}, headers)
+
+    def _send_event(self, event: str, data: Dict[str, Any]):
+        # Sent as one chunk of a chunked response, so the connection stays open for reuse
+        payload = f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8")
+        self.wfile.write(f"{len(payload):x}\r\n".encode("ascii") + payload + b"\r\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        if self.path.split("?")[0] != "/v1/messages":
+            self._send_error(404, "not_found_error", f"Unknown path {self.path}")
+            return
+
+        request = json.loads(self.rfile.read(int(self.headers.get("content-length", 0))) or b"{}")
+        config = self.server.config
+        self.server.count("requests")
+
+        failure = config.draw_failure()
+        if failure == "timeout":
+            self.server.count("timeouts")
+            time.sleep(config.hang_seconds)
+            self.close_connection = True
+            return
+        if failure in ("429", "529", "500"):
+            self.server.count(f"status_{failure}")
+            error_types = {"429": "rate_limit_error", "529": "overloaded_error", "500": "api_error"}
+            self._send_error(int(failure), error_types[failure], "Injected failure", {"retry-after": "1"})
+            return
+
+        answer = canned_answer(request)
+        words = answer.split(" ")
+        words = [word + " " for word in words[:-1]] + words[-1:]
+        usage = {"input_tokens": _input_tokens(request), "output_tokens": estimate_tokens(answer),
+                 "cache_creation_input_tokens": 0, "cache_read_input_tokens": 0}
+        # One word is roughly one token, paced at the configured rate
+        token_delay = 1.0 / config.tokens_per_second if config.tokens_per_second > 0 else 0.0
+        message = {
+            "id": f"msg_fake_{self.server.count('responses'):08d}", "type": "message", "role": "assistant",
+            "model": request.get("model", "fake"), "stop_reason": None, "stop_sequence": None,
+        }
+
+        time.sleep(config.first_token_delay())
+        if not request.get("stream"):
+            time.sleep(token_delay * len(words))
+            self._send_json(200, dict(message, content=[{"type": "text", "text": answer}],
+                                      stop_reason="end_turn", usage=usage))
+            return
+
+        self.send_response(200)
+        self.send_header("content-type", "text/event-stream")
+        self.send_header("cache-control", "no-cache")
+        self.send_header("transfer-encoding", "chunked")
+        self.end_headers()
+
+        try:
+            self._stream_message(message, usage, words, token_delay)
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading, e.g. a cancelled hedge request
+            self.server.count("client_disconnects")
+            self.close_connection = True
+
+    def _stream_message(self, message: Dict[str, Any], usage: Dict[str, int], words: List[str], token_delay: float):
+        self._send_event("message_start", {"type": "message_start", "message": dict(
+            message, content=[], usage=dict(usage, output_tokens=1))})
+        self._send_event("content_block_start", {"type": "content_block_start", "index": 0,
+                                                 "content_block": {"type": "text", "text": ""}})
+        self._send_event("ping", {"type": "ping"})
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(token_delay)
+            self._send_event("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                                     "delta": {"type": "text_delta", "text": word}})
+        self._send_event("content_block_stop", {"type": "content_block_stop", "index": 0})
+        self._send_event("message_delta", {"type": "message_delta",
+                                           "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                                           "usage": {"output_tokens": usage["output_tokens"]}})
+        self._send_event("message_stop", {"type": "message_stop"})
+
+
+class FakeAnthropicServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server implementing POST /v1/messages.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, config: Optional[FakeServerConfig] = None):
+        """
+        Create the server (bound, but not serving until start() is called).
+
+        Args:
+            host: Interface to bind
+            port: Port to bind (0 picks a free port)
+            config: Latency and error injection settings
+        """
+        super().__init__((host, port), _Handler)
+        self.config = config or FakeServerConfig()
+        self.counters: Dict[str, int] = {}
+        self._counters_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """Base URL to use as ANTHROPIC_BASE_URL."""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, name: str) -> int:
+        """Increment a counter and return its new value."""
+        with self._counters_lock:
+            self.counters[name] = self.counters.get(name, 0) + 1
+            return self.counters[name]
+
+    def start(self) -> "FakeAnthropicServer":
+        """Serve requests on a background thread."""
+        self._thread = threading.Thread(target=self.serve_forever, name="fake-anthropic", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and close the socket."""
+        self.shutdown()
+        self.server_close()
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))]
+
+
+def load_test(ask: Callable[[str], Any], questions: List[str], total_requests: int = 100,
+              concurrency: int = 8) -> Dict[str, Any]:
+    """
+    Fire questions at a chat callable from concurrent threads and measure it.
+
+    Args:
+        ask: Callable taking a question; a returned iterator is consumed as a stream
+            (its first item marks time to first token)
+        questions: Questions to cycle through
+        total_requests: Number of requests to send
+        concurrency: Number of concurrent callers
+
+    Returns:
+        Dictionary with throughput, error count and latency / time-to-first-token
+        percentiles in milliseconds
+    """
+    latencies: List[float] = []
+    first_tokens: List[float] = []
+    errors: List[str] = []
+    lock = threading.Lock()
+
+    def one(i: int):
+        started = time.perf_counter()
+        first = None
+        try:
+            result = ask(questions[i % len(questions)])
+            if not isinstance(result, str):
+                for _ in result:
+                    if first is None:
+                        first = time.perf_counter() - started
+        except Exception as e:
+            with lock:
+                errors.append(type(e).__name__)
+            return
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            if first is not None:
+                first_tokens.append(first)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one, range(total_requests)))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    first_tokens.sort()
+    result = {
+        "requests": total_requests,
+        "errors": len(errors),
+        "error_types": sorted(set(errors)),
+        "seconds": wall,
+        "throughput_rps": total_requests / wall if wall else 0.0,
+    }
+    for name, values in (("latency", latencies), ("ttft", first_tokens)):
+        for q in (0.5, 0.95, 0.99):
+            result[f"{name}_p{int(q * 100)}_ms"] = _percentile(values, q) * 1000
+    return result
+
+
+# Questions no cache or FAQ can answer, so they always exercise the live path
+UNIQUE_TOPICS = ["serverless", "data pipelines", "security reviews", "mentoring", "cost optimization",
+                 "incident response", "curriculum design", "stakeholder updates"]
+
+# Backends a request can be served by, as recorded in chat_latency_seconds
+SERVED_BY = ("live", "cache", "coalesced", "faq", "mock", "prefetch")
+
+
+def build_questions(fixed: List[str], total_requests: int, unique_share: float, seed: int = 0) -> List[str]:
+    """
+    Build the question mix for a load test.
+
+    Args:
+        fixed: Fixed questions (quick questions and FAQs), cycled through in order
+        total_requests: Number of questions to build
+        unique_share: Share of questions that are unique prompts
+        seed: Random seed for which requests are unique
+
+    Returns:
+        One question per request
+    """
+    rng = random.Random(seed)
+    questions = []
+    for i in range(total_requests):
+        if rng.random() < unique_share:
+            topic = UNIQUE_TOPICS[i % len(UNIQUE_TOPICS)]
+            questions.append(f"Load test {i}: how does Kelby approach {topic}?")
+        else:
+            questions.append(fixed[i % len(fixed)])
+    return questions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the chat stack against a local fake Anthropic server.")
+    parser.add_argument("--requests", type=int, default=100, help="Total requests to send")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent callers")
+    parser.add_argument("--sessions", type=int, default=50, help="Visitor sessions (each with its own IP) to spread requests over")
+    parser.add_argument("--unique", type=float, default=0.3, help="Share of requests with a unique, uncacheable prompt")
+    parser.add_argument("--stream", action="store_true", help="Use streaming requests")
+    parser.add_argument("--first-token-ms", type=float, default=300.0, help="Median first-token delay")
+    parser.add_argument("--sigma", type=float, default=0.5, help="Spread of the first-token delay")
+    parser.add_argument("--tokens-per-second", type=float, default=80.0, help="Output token rate")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests failing with 529")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = parser.parse_args()
+
+    config = FakeServerConfig(first_token_ms=args.first_token_ms, latency_sigma=args.sigma,
+                              tokens_per_second=args.tokens_per_second,
+                              error_rates={"529": args.error_rate}, seed=args.seed)
+    server = FakeAnthropicServer(config=config).start()
+    # Every ClaudeChat built from here on talks to the fake server
+    os.environ["ANTHROPIC_BASE_URL"] = server.base_url
+
+    # Imported here so the chat stack is configured after the base URL is set
+    from components.chatbot import QUICK_QUESTIONS, CHATBOT_QUICK_QUESTIONS, RESUME_DATA, RESUME_DATA_VERSION
+    from utils.chat_engine import build_chat_client
+    from utils.warmup import collect_warmup_questions
+    from utils.http_transport import transport_stats
+    from utils import telemetry
+
+    # The full assembled client (FAQ answers, limits, budget, cache, coalescing, admission),
+    # one per visitor session as in the app
+    clients: Dict[int, Any] = {}
+    clients_lock = threading.Lock()
+    next_request = itertools.count()
+
+    def client_for_next_request() -> Any:
+        session = next(next_request) % max(1, args.sessions)
+        with clients_lock:
+            if session not in clients:
+                clients[session] = build_chat_client(
+                    RESUME_DATA, api_key="fake-key", data_version=RESUME_DATA_VERSION,
+                    session_id=f"load-test-{session}", client_ip=f"10.0.{session // 250}.{session % 250 + 1}",
+                )
+            return clients[session]
+
+    if args.stream:
+        ask = lambda question: client_for_next_request().stream_text(question)
+    else:
+        ask = lambda question: client_for_next_request().create_response(question)
+    fixed = collect_warmup_questions([QUICK_QUESTIONS, CHATBOT_QUICK_QUESTIONS], RESUME_DATA["chatbot_context"])
+    questions = build_questions(fixed, args.requests, args.unique, seed=args.seed)
+    try:
+        results = load_test(ask, questions, total_requests=args.requests, concurrency=args.concurrency)
+    finally:
+        server.stop()
+
+    print(f"{results['requests']} requests in {results['seconds']:.2f}s "
+          f"({results['throughput_rps']:.1f} req/s), {results['errors']} errors {results['error_types']}")
+    print(f"latency p50/p95/p99: {results['latency_p50_ms']:.0f} / {results['latency_p95_ms']:.0f} / "
+          f"{results['latency_p99_ms']:.0f} ms")
+    if args.stream:
+        print(f"ttft    p50/p95/p99: {results['ttft_p50_ms']:.0f} / {results['ttft_p95_ms']:.0f} / "
+              f"{results['ttft_p99_ms']:.0f} ms")
+    metrics = telemetry.get_metrics()
+    for backend in SERVED_BY:
+        served = metrics.quantiles("chat_latency_seconds", backend=backend)
+        if served["count"]:
+            print(f"served by {backend:9}: {served['count']:5} requests, p95 {served['p95'] * 1000:.0f} ms")
+    reuse = transport_stats()
+    print(f"connections: {reuse['connections_opened']} opened for {reuse['requests']} HTTP requests "
+          f"({reuse['reuse_ratio']:.0%} reused, pool size {reuse['pool_size']})")
+    print(f"server counters: {server.counters}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""
+Local answers for questions that closely match a curated FAQ.
+
+The FAQ questions in the resume data's chatbot_context are indexed as
+TF-IDF vectors of the character n-grams of their content words, with NumPy.
+A question whose cosine similarity to an FAQ question reaches the threshold
+is answered straight from the FAQ entry, without calling the chat backend.
+Every lookup logs its best score so the threshold can be tuned, e.g. with:
+
+    python -m utils.faq_matcher "Which AWS services are you most experienced with?"
+"""
+
+import os
+import logging
+import threading
+from collections import Counter
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+
+import numpy as np
+
+from utils.chat_base import FriendlyChat
+from utils.retrieval import tokenize
+from utils import telemetry
+
+logger = logging.getLogger(__name__)
+
+# Word swaps like "AWS" -> "Azure" still score about 0.8, so stay above that
+DEFAULT_THRESHOLD = 0.85
+
+
+def char_ngrams(text: str, min_n: int = 3, max_n: int = 5) -> Counter:
+    """
+    Count the character n-grams of each content word in a text.
+
+    Stopwords are dropped (see utils.retrieval.tokenize), so "what are you"
+    phrasing doesn't dominate the similarity. Words are padded with spaces,
+    so n-grams at word boundaries are distinct from the same letters inside
+    a word.
+
+    Args:
+        text: The text
+        min_n: Shortest n-gram length
+        max_n: Longest n-gram length
+
+    Returns:
+        Counter of n-grams
+    """
+    counts = Counter()
+    for word in tokenize(text):
+        padded = f" {word} "
+        for n in range(min_n, max_n + 1):
+            for start in range(max(1, len(padded) - n + 1)):
+                counts[padded[start:start + n]] += 1
+    return counts
+
+
+class FAQMatcher:
+    """
+    Cosine similarity between a question and the FAQ questions over
+    character n-gram TF-IDF vectors.
+    """
+
+    def __init__(self, faqs: List[Dict[str, str]], threshold: float = DEFAULT_THRESHOLD,
+                 min_n: int = 3, max_n: int = 5):
+        """
+        Build the index.
+
+        Args:
+            faqs: FAQ entries with "question" and "answer" keys
+            threshold: Minimum cosine similarity for a question to be answered from an FAQ
+            min_n: Shortest character n-gram length
+            max_n: Longest character n-gram length
+        """
+        self.faqs = faqs
+        self.threshold = threshold
+        self.min_n = min_n
+        self.max_n = max_n
+        # Content words of each FAQ question, for lookups at a relaxed threshold
+        self.terms = [set(tokenize(faq["question"])) for faq in faqs]
+
+        documents = [char_ngrams(faq["question"], min_n, max_n) for faq in faqs]
+        self.vocabulary: Dict[str, int] = {}
+        for document in documents:
+            for gram in document:
+                self.vocabulary.setdefault(gram, len(self.vocabulary))
+
+        term_freqs = np.zeros((len(faqs), max(1, len(self.vocabulary))), dtype=np.float32)
+        for row, document in enumerate(documents):
+            for gram, count in document.items():
+                term_freqs[row, self.vocabulary[gram]] = count
+
+        # Smoothed IDF; n-grams no FAQ contains get the highest weight (document frequency 0)
+        doc_freqs = (term_freqs > 0).sum(axis=0)
+        self.idf = (np.log((1.0 + len(faqs)) / (1.0 + doc_freqs)) + 1.0).astype(np.float32)
+        self.unseen_idf = float(np.log(1.0 + len(faqs)) + 1.0)
+
+        vectors = term_freqs * self.idf[None, :]
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        self.vectors = vectors / np.maximum(norms, 1e-9)
+
+    @classmethod
+    def from_resume_data(cls, resume_data: Dict[str, Any], threshold: Optional[float] = None) -> "FAQMatcher":
+        """
+        Build a matcher over the FAQs in the resume data's chatbot_context.
+
+        Args:
+            resume_data: Dictionary containing resume information
+            threshold: Minimum similarity (defaults to CHAT_FAQ_THRESHOLD)
+
+        Returns:
+            The FAQMatcher
+        """
+        if threshold is None:
+            threshold = float(os.environ.get("CHAT_FAQ_THRESHOLD", str(DEFAULT_THRESHOLD)))
+        faqs = resume_data.get("chatbot_context", {}).get("frequently_asked_questions", [])
+        return cls(faqs, threshold=threshold)
+
+    def scores(self, question: str) -> np.ndarray:
+        """
+        Score every FAQ question against a question.
+
+        Args:
+            question: The question text
+
+        Returns:
+            Array of cosine similarities, one per FAQ
+        """
+        if not self.faqs:
+            return np.zeros(0, dtype=np.float32)
+        grams = char_ngrams(question, self.min_n, self.max_n)
+        columns, weights = [], []
+        unseen = 0.0
+        for gram, count in grams.items():
+            column = self.vocabulary.get(gram)
+            if column is None:
+                # Still counts towards the question's norm, so extra words lower the score
+                unseen += (count * self.unseen_idf) ** 2
+            else:
+                columns.append(column)
+                weights.append(count * self.idf[column])
+        if not columns:
+            return np.zeros(len(self.faqs), dtype=np.float32)
+        weights = np.asarray(weights, dtype=np.float32)
+        norm = np.sqrt(float(weights @ weights) + unseen)
+        return self.vectors[:, columns] @ weights / norm
+
+    def match(self, question: str, threshold: Optional[float] = None) -> Tuple[Optional[Dict[str, str]], float]:
+        """
+        Find the FAQ closest to a question, logging the score.
+
+        Character n-grams can't tell "AWS" from "GCP" or "most" from "least",
+        so a lookup at a threshold below the matcher's own (e.g. while shedding
+        load) also requires every content word of the question to appear in
+        the FAQ question.
+
+        Args:
+            question: The question text
+            threshold: Minimum similarity for this lookup (defaults to self.threshold)
+
+        Returns:
+            (faq, score), or (None, best score) if no FAQ reached the threshold
+        """
+        scores = self.scores(question)
+        if not len(scores):
+            return None, 0.0
+        best = int(np.argmax(scores))
+        score = float(scores[best])
+        threshold = self.threshold if threshold is None else threshold
+        matched = score >= threshold
+        unmatched = set()
+        if matched and score < self.threshold:
+            unmatched = set(tokenize(question)) - self.terms[best]
+            matched = not unmatched
+        logger.info(
+            f"FAQ match: score={score:.3f} threshold={threshold} matched={matched} "
+            f"faq=\"{self.faqs[best]['question']}\" question=\"{question[:80]}\""
+            + (f" unmatched_words={sorted(unmatched)}" if unmatched else "")
+        )
+        return (self.faqs[best] if matched else None), score
+
+    def answer(self, question: str, threshold: Optional[float] = None) -> Optional[str]:
+        """
+        Answer a question from the closest FAQ, if it is close enough.
+
+        Args:
+            question: The question text
+            threshold: Minimum similarity for this lookup (defaults to self.threshold)
+
+        Returns:
+            The FAQ answer, or None if no FAQ reached the threshold
+        """
+        faq, _ = self.match(question, threshold)
+        return faq["answer"] if faq else None
+
+
+def faq_matching_enabled() -> bool:
+    """Check whether local FAQ answers are switched on (CHAT_FAQ_MATCHING, on by default)."""
+    return os.environ.get("CHAT_FAQ_MATCHING", "1") != "0"
+
+
+class FAQChat(FriendlyChat):
+    """
+    Wraps a chat backend, answering questions that match an FAQ locally.
+    """
+
+    def __init__(self, backend: Any, matcher: FAQMatcher):
+        """
+        Initialize the wrapper.
+
+        Args:
+            backend: The chat backend used for everything else
+            matcher: The FAQMatcher for the backend's resume data
+        """
+        self.backend = backend
+        self.matcher = matcher
+
+    @property
+    def model(self) -> str:
+        return self.backend.model
+
+    def set_system_prompt(self, resume_context: Dict[str, Any]):
+        """Set the system prompt on the wrapped backend."""
+        self.backend.set_system_prompt(resume_context)
+
+    def local_answer(self, user_message: str) -> Optional[str]:
+        """Get the FAQ answer for a message, noting it in the request telemetry."""
+        answer = self.matcher.answer(user_message)
+        if answer is not None:
+            telemetry.note(backend="faq")
+        return answer
+
+    def create_response(self, user_message: str, **options) -> str:
+        """
+        Get an answer from a matching FAQ, or from the backend (raising on errors).
+
+        Args:
+            user_message: The message from the user/employer
+            **options: Passed through to the backend
+
+        Returns:
+            The answer as a string
+        """
+        answer = self.local_answer(user_message)
+        if answer is not None:
+            return answer
+        return self.backend.create_response(user_message, **options)
+
+    def stream_text(self, user_message: str, **options) -> Iterator[str]:
+        """
+        Stream an answer, serving FAQ matches as a single chunk (raising on errors).
+
+        Args:
+            user_message: The message from the user/employer
+            **options: Passed through to the backend
+
+        Yields:
+            Text deltas of the answer, in order
+        """
+        answer = self.local_answer(user_message)
+        if answer is not None:
+            yield answer
+            return
+        for text in self.backend.stream_text(user_message, **options):
+            yield text
+
+
+# One matcher per resume data version for the whole process
+_matchers: Dict[str, FAQMatcher] = {}
+_matchers_lock = threading.Lock()
+
+
+def get_faq_matcher(resume_data: Dict[str, Any], data_version: Optional[str] = None) -> FAQMatcher:
+    """
+    Get the FAQ matcher for the resume data, building it only when the data changes.
+
+    Args:
+        resume_data: Dictionary containing resume information
+        data_version: Precomputed resume data version (computed if None)
+
+    Returns:
+        The FAQMatcher for this data version
+    """
+    if data_version is None:
+        # Imported here to avoid a circular import with the registry module
+        from utils.chat_registry import compute_data_version
+        data_version = compute_data_version(resume_data)
+
+    with _matchers_lock:
+        matcher = _matchers.get(data_version)
+        if matcher is None:
+            matcher = FAQMatcher.from_resume_data(resume_data)
+            _matchers.clear()
+            _matchers[data_version] = matcher
+        return matcher
+
+
+if __name__ == "__main__":
+    import sys
+    from data.resume_data import chatbot_context
+
+    matcher = FAQMatcher.from_resume_data({"chatbot_context": chatbot_context})
+    for question in sys.argv[1:] or [faq["question"] for faq in matcher.faqs]:
+        faq, score = matcher.match(question)
+        print(f"{score:.3f}  {'MATCH' if faq else '-----'}  {question}")
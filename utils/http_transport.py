@@ -0,0 +1,151 @@
+"""
+Shared, pooled HTTP transport for requests to the Anthropic Messages endpoint.
+
+One keep-alive connection pool is kept for the whole server process, so chat
+turns reuse open TLS connections instead of paying DNS, TCP and TLS setup on
+every request, and every request has connect and read timeouts. Whether each
+request reused a pooled connection is counted in the telemetry metrics
+(chat_http_requests_total), see transport_stats().
+"""
+
+import os
+import weakref
+import threading
+from typing import Any, Dict
+
+import anthropic
+
+from utils import telemetry
+
+
+class TransportSettings:
+    """
+    Pool size and timeouts for the shared transport.
+    """
+
+    def __init__(self, pool_size: int = 10, connect_timeout: float = 3.05,
+                 read_timeout: float = 60.0, keepalive_expiry: float = 30.0):
+        """
+        Initialize the transport settings.
+
+        Args:
+            pool_size: Maximum number of connections kept open per host
+            connect_timeout: Seconds to wait for a connection to be established
+            read_timeout: Seconds to wait between bytes of the response
+            keepalive_expiry: Seconds an idle connection is kept open
+        """
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.keepalive_expiry = keepalive_expiry
+
+    @classmethod
+    def from_env(cls) -> "TransportSettings":
+        """Build settings from CHAT_HTTP_* environment variables."""
+        return cls(
+            pool_size=int(os.environ.get("CHAT_HTTP_POOL_SIZE", "10")),
+            connect_timeout=float(os.environ.get("CHAT_HTTP_CONNECT_TIMEOUT", "3.05")),
+            read_timeout=float(os.environ.get("CHAT_HTTP_READ_TIMEOUT", "60")),
+            keepalive_expiry=float(os.environ.get("CHAT_HTTP_KEEPALIVE_EXPIRY", "30")),
+        )
+
+
+DEFAULT_BASE_URL = "https://api.anthropic.com"
+
+
+def anthropic_base_url() -> str:
+    """
+    Get the base URL of the Anthropic API.
+
+    Returns:
+        ANTHROPIC_BASE_URL if set (e.g. a local utils.fake_anthropic server), otherwise the public API
+    """
+    return (os.environ.get("ANTHROPIC_BASE_URL") or DEFAULT_BASE_URL).rstrip("/")
+
+
+class ConnectionTracker:
+    """
+    Counts requests on the shared client by whether they opened a new connection
+    or reused a pooled one.
+
+    The HTTP library reports the network stream each response arrived on; a
+    stream that hasn't been seen before belongs to a newly opened connection.
+    """
+
+    def __init__(self):
+        # Weak, so streams of closed connections are forgotten
+        self._streams: "weakref.WeakSet[Any]" = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    def on_response(self, response: Any):
+        """
+        Count one response (registered as a response event hook of the HTTP client).
+
+        Args:
+            response: The HTTP response, before its body is read
+        """
+        stream = response.extensions.get("network_stream")
+        if stream is None:
+            return
+        with self._lock:
+            reused = stream in self._streams
+            self._streams.add(stream)
+        telemetry.get_metrics().inc("chat_http_requests_total", connection="reused" if reused else "new")
+
+
+_settings = TransportSettings.from_env()
+_tracker = ConnectionTracker()
+_sdk_client: Any = None
+_lock = threading.Lock()
+
+
+def get_sdk_http_client():
+    """
+    Get the shared HTTP client for the Anthropic SDK, so every ClaudeChat
+    backend draws from the same keep-alive pool.
+
+    Returns:
+        The SDK's default HTTP client with the configured pool limits and timeouts
+    """
+    global _sdk_client
+    with _lock:
+        if _sdk_client is None:
+            # Built from the SDK's own Limits type, so it matches the HTTP library the SDK ships with
+            limits_type = type(anthropic.DEFAULT_CONNECTION_LIMITS)
+            _sdk_client = anthropic.DefaultHttpxClient(
+                limits=limits_type(
+                    max_connections=_settings.pool_size,
+                    max_keepalive_connections=_settings.pool_size,
+                    keepalive_expiry=_settings.keepalive_expiry,
+                ),
+                timeout=sdk_timeout(),
+                event_hooks={"response": [_tracker.on_response]},
+            )
+        return _sdk_client
+
+
+def sdk_timeout() -> anthropic.Timeout:
+    """Build the SDK timeout from the configured connect and read timeouts."""
+    return anthropic.Timeout(_settings.read_timeout, connect=_settings.connect_timeout)
+
+
+
+def transport_stats() -> Dict[str, Any]:
+    """
+    Report connection reuse on the shared SDK client.
+
+    Returns:
+        Dictionary with requests sent, connections opened, reused requests,
+        the reuse ratio and the pool size
+    """
+    metrics = telemetry.get_metrics()
+    opened = int(metrics.counter_value("chat_http_requests_total", connection="new"))
+    reused = int(metrics.counter_value("chat_http_requests_total", connection="reused"))
+    sent = opened + reused
+    return {
+        "requests": sent,
+        "connections_opened": opened,
+        "reused": reused,
+        "reuse_ratio": reused / sent if sent else 0.0,
+        "pool_size": _settings.pool_size,
+    }
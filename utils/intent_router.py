@@ -0,0 +1,344 @@
+"""
+Compiled intent index for MockClaudeChat.
+
+Intents come from two places: a small table of hand-written keyword intents,
+and intents generated from the resume data (strengths, project highlights,
+FAQs, certifications, achievements, testimonials, job preferences). Messages
+are tokenized on word boundaries and scored against an inverted index, so
+"maintain" no longer matches "ai" and the best-scoring intent wins.
+"""
+
+import time
+import threading
+from collections import defaultdict
+from typing import List, Dict, Any, Optional, Tuple
+
+from utils.retrieval import tokenize
+
+# Below this score the generic answer is returned
+MIN_SCORE = 1.0
+
+DEFAULT_RESPONSE = "I'd be happy to tell you more about Kelby's experience and qualifications. Feel free to ask about specific skills, projects, or how Kelby might fit with your team's needs. Kelby is particularly skilled in AWS technologies, AI implementation, and technical training/enablement."
+
+# Hand-written intents: (name, keyword weights, response)
+KEYWORD_INTENTS = [
+    (
+        "experience",
+        {"experience": 1.0, "background": 1.5, "career": 0.5, "history": 0.5, "years": 0.5},
+        "Kelby has over 15 years of experience in IT, with a strong focus on AWS cloud technologies, training, and AI implementation. Most recently, Kelby served as a Technical Enablement Lead at Mission Cloud, developing AI/GenAI solutions and cloud training programs.",
+    ),
+    (
+        "aws",
+        {"aws": 2.0, "cloud": 1.5, "amazon": 1.0, "ec2": 1.0, "s3": 1.0, "rds": 1.0, "bedrock": 1.0, "cloudformation": 1.0},
+        "Kelby has extensive AWS experience across multiple services including Bedrock, Q, OpenSearch, EC2, RDS, S3, and CloudFormation. Kelby has held AWS certifications including Solutions Architect Associate, SysOps Administrator Associate, and Database Specialty, and has worked directly at AWS as a Cloud Support Engineer.",
+    ),
+    (
+        "ai",
+        {"ai": 2.0, "genai": 2.0, "generative": 1.5, "claude": 1.5, "ml": 1.5, "llm": 1.5, "rag": 1.5, "gpt": 1.0, "machine": 0.5, "learning": 0.5},
+        "Kelby has hands-on experience with AI and GenAI technologies, including building RAG systems with Amazon Bedrock, creating Custom GPTs, and implementing AI solutions for business teams. Kelby also developed and launched an AI/GenAI Essentials course completed by over 240 employees.",
+    ),
+    (
+        "training",
+        {"training": 2.0, "teaching": 2.0, "education": 1.5, "enablement": 1.5, "apprenticeship": 1.5, "mentor": 1.0, "course": 1.0},
+        "Kelby excels in technical training and enablement, having created AWS certification programs, developed an apprenticeship program with a 73% conversion rate to full-time roles, and served as an AWS Training Architect at Linux Academy/A Cloud Guru creating courses and hands-on labs.",
+    ),
+    (
+        "salary",
+        {"salary": 3.0, "compensation": 3.0, "pay": 2.0, "rate": 1.0, "availability": 2.0, "available": 1.5},
+        "For specific discussions about salary expectations and compensation, I'd recommend reaching out to Kelby directly via email at kelby.james.enevold@gmail.com or phone at 208-553-8095.",
+    ),
+]
+
+
+def _compile_keywords(weights: Dict[str, float]) -> Dict[str, float]:
+    """Run keyword weights through the tokenizer so they match tokenized messages."""
+    compiled = {}
+    for word, weight in weights.items():
+        for term in tokenize(word):
+            compiled[term] = max(compiled.get(term, 0.0), weight)
+    return compiled
+
+
+def _question_keywords(text: str, weight: float = 1.0) -> Dict[str, float]:
+    """Give every content word of a question the same weight."""
+    return {term: weight for term in tokenize(text)}
+
+
+def build_intents(resume_context: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Build the intent list from the keyword table and the resume data.
+
+    Args:
+        resume_context: Dictionary with resume information (any missing section is skipped)
+
+    Returns:
+        List of intents with "name", "keywords" and "response" keys, in priority order
+    """
+    intents = [
+        {"name": name, "keywords": _compile_keywords(weights), "response": response}
+        for name, weights, response in KEYWORD_INTENTS
+    ]
+
+    name = resume_context.get("personal_info", {}).get("name", "Kelby").split()[0]
+    context = resume_context.get("chatbot_context", {})
+
+    if context.get("strengths"):
+        intents.append({
+            "name": "strengths",
+            "keywords": _compile_keywords({"strength": 2.0, "skill": 1.5, "core": 1.0, "best": 1.0, "expertise": 1.0}),
+            "response": f"{name}'s key strengths include: " + "; ".join(context["strengths"]) + ".",
+        })
+
+    if context.get("job_seeking_preferences"):
+        intents.append({
+            "name": "job_preferences",
+            "keywords": _compile_keywords({"looking": 1.5, "next": 1.0, "role": 1.0, "position": 1.0, "remote": 1.5,
+                                           "prefer": 1.5, "preference": 1.5, "opportunity": 1.0, "seeking": 1.5}),
+            "response": f"{name} is looking for: " + "; ".join(context["job_seeking_preferences"]) + ".",
+        })
+
+    projects = context.get("project_highlights", [])
+    if projects:
+        intents.append({
+            "name": "projects",
+            "keywords": _compile_keywords({"project": 2.0, "built": 1.0, "portfolio": 1.0, "recent": 0.5}),
+            "response": f"Some of {name}'s highlighted projects: " + " ".join(
+                f"{project['name']}: {project['description']}" for project in projects),
+        })
+    for project in projects:
+        keywords = _question_keywords(project["name"], 1.5)
+        keywords.update(_question_keywords(" ".join(project["technologies"]), 0.5))
+        intents.append({
+            "name": f"project:{project['name']}",
+            "keywords": keywords,
+            "response": f"{project['name']}: {project['description']} Technologies: {', '.join(project['technologies'])}.",
+        })
+
+    certifications = resume_context.get("certifications", [])
+    if certifications:
+        intents.append({
+            "name": "certifications",
+            "keywords": _compile_keywords({"certification": 2.5, "certified": 2.5, "cert": 2.5, "credential": 2.0}),
+            "response": f"{name} holds these certifications: " + ", ".join(
+                f"{cert['name']} ({cert['date_earned']})" for cert in certifications) + ".",
+        })
+
+    achievements = resume_context.get("key_achievements", [])
+    if achievements:
+        intents.append({
+            "name": "achievements",
+            "keywords": _compile_keywords({"achievement": 2.0, "accomplishment": 2.0, "accomplished": 2.0, "proud": 1.5}),
+            "response": f"Some of {name}'s key achievements: " + "; ".join(achievements) + ".",
+        })
+
+    testimonials = resume_context.get("testimonials", [])
+    if testimonials:
+        intents.append({
+            "name": "testimonials",
+            "keywords": _compile_keywords({"testimonial": 3.0, "recommendation": 2.5, "reference": 2.0, "colleague": 1.0}),
+            "response": " ".join(
+                f"\"{t['quote']}\" — {t['author']}, {t['title']} at {t['company']}." for t in testimonials[:2]),
+        })
+
+    for faq in context.get("frequently_asked_questions", []):
+        intents.append({
+            "name": f"faq:{faq['question']}",
+            "keywords": _question_keywords(faq["question"]),
+            "response": faq["answer"],
+        })
+
+    return intents
+
+
+class IntentRouter:
+    """
+    Scores a message against every intent through an inverted index of keyword terms.
+    """
+
+    def __init__(self, intents: List[Dict[str, Any]], min_score: float = MIN_SCORE,
+                 default_response: str = DEFAULT_RESPONSE):
+        """
+        Compile the intent index.
+
+        Args:
+            intents: Intents from build_intents()
+            min_score: Minimum score for an intent to be chosen
+            default_response: Answer used when no intent scores high enough
+        """
+        self.intents = intents
+        self.min_score = min_score
+        self.default_response = default_response
+
+        # term -> [(intent index, weight), ...]
+        self.postings: Dict[str, List[Tuple[int, float]]] = defaultdict(list)
+        for index, intent in enumerate(intents):
+            for term, weight in intent["keywords"].items():
+                self.postings[term].append((index, weight))
+        self.postings = dict(self.postings)
+
+    @classmethod
+    def from_resume_context(cls, resume_context: Dict[str, Any]) -> "IntentRouter":
+        """Build a router from resume data (see build_intents)."""
+        return cls(build_intents(resume_context))
+
+    def route(self, message: str) -> Tuple[Optional[Dict[str, Any]], float]:
+        """
+        Find the best intent for a message.
+
+        Ties go to the intent listed first, so hand-written intents win over
+        generated ones with the same score.
+
+        Args:
+            message: The message from the user/employer
+
+        Returns:
+            (intent, score), or (None, best score) if nothing reached min_score
+        """
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(message)):
+            for index, weight in self.postings.get(term, ()):
+                scores[index] = scores.get(index, 0.0) + weight
+        if not scores:
+            return None, 0.0
+
+        best = min(scores, key=lambda index: (-scores[index], index))
+        if scores[best] < self.min_score:
+            return None, scores[best]
+        return self.intents[best], scores[best]
+
+    def respond(self, message: str) -> str:
+        """
+        Answer a message from the best-matching intent.
+
+        Args:
+            message: The message from the user/employer
+
+        Returns:
+            The intent's response, or the default response
+        """
+        intent, _ = self.route(message)
+        return intent["response"] if intent else self.default_response
+
+
+# One router per resume data version for the whole process
+_routers: Dict[str, IntentRouter] = {}
+_routers_lock = threading.Lock()
+
+
+def get_intent_router(resume_context: Dict[str, Any], data_version: Optional[str] = None) -> IntentRouter:
+    """
+    Get the intent router for the resume data, compiling it only when the data changes.
+
+    Args:
+        resume_context: Dictionary containing resume information
+        data_version: Precomputed resume data version (computed if None)
+
+    Returns:
+        The compiled IntentRouter
+    """
+    if data_version is None:
+        # Imported here to avoid a circular import with the registry module
+        from utils.chat_registry import compute_data_version
+        data_version = compute_data_version(resume_context)
+
+    with _routers_lock:
+        router = _routers.get(data_version)
+        if router is None:
+            router = IntentRouter.from_resume_context(resume_context)
+            _routers.clear()
+            _routers[data_version] = router
+        return router
+
+
+# Sample questions and the intent each should route to, for the benchmark
+SAMPLE_QUESTIONS = [
+    ("What are your key AWS skills?", "aws"),
+    ("Tell me about your recent projects", "projects"),
+    ("What certifications do you have?", "certifications"),
+    ("What's your experience with AI/ML?", "ai"),
+    ("What are your career achievements?", "achievements"),
+    ("What are your core skills?", "strengths"),
+    ("Tell me about your experience with AWS", "aws"),
+    ("What AI projects have you worked on?", "ai"),
+    ("How do you approach technical training?", "faq:What makes your technical training approach effective?"),
+    ("What are you looking for in your next role?", "job_preferences"),
+    ("Can you share some testimonials?", "testimonials"),
+    ("What AWS services are you most experienced with?", "faq:What AWS services are you most experienced with?"),
+    ("How do you approach implementing AI solutions in enterprise environments?",
+     "faq:How do you approach implementing AI solutions in enterprise environments?"),
+    ("What makes your technical training approach effective?", "faq:What makes your technical training approach effective?"),
+    ("What are your salary expectations?", "salary"),
+    ("When are you available to start?", "salary"),
+    ("How do you maintain legacy systems?", None),
+    ("Tell me about your background", "experience"),
+    ("Have you used Claude or other LLMs?", "ai"),
+    ("Do you have cloud certifications?", "certifications"),
+    ("Tell me about the apprenticeship program", "project:Cloud Engineering Apprenticeship Program"),
+    ("Do you have teaching experience?", "training"),
+    ("What did you build with Bedrock and RAG?", "ai"),
+    ("Do you prefer remote work?", "job_preferences"),
+    ("What do former colleagues say about you?", "testimonials"),
+    ("Hello!", None),
+]
+
+
+def benchmark(router: IntentRouter, questions: List[Tuple[str, Optional[str]]] = None,
+              repeat: int = 200) -> Dict[str, Any]:
+    """
+    Time routing over a corpus of sample questions and check the chosen intents.
+
+    Args:
+        router: The router to measure
+        questions: (question, expected intent name or None) pairs (defaults to SAMPLE_QUESTIONS)
+        repeat: Number of passes over the corpus
+
+    Returns:
+        Dictionary with per-call latency (mean/p50/p99 in microseconds),
+        accuracy, and the list of mismatches
+    """
+    questions = questions or SAMPLE_QUESTIONS
+    timings = []
+    for _ in range(repeat):
+        for question, _ in questions:
+            start = time.perf_counter()
+            router.route(question)
+            timings.append(time.perf_counter() - start)
+    timings.sort()
+
+    mismatches = []
+    for question, expected in questions:
+        intent, score = router.route(question)
+        actual = intent["name"] if intent else None
+        if actual != expected:
+            mismatches.append({"question": question, "expected": expected, "actual": actual, "score": score})
+
+    return {
+        "calls": len(timings),
+        "mean_us": sum(timings) / len(timings) * 1e6,
+        "p50_us": timings[len(timings) // 2] * 1e6,
+        "p99_us": timings[min(len(timings) - 1, int(len(timings) * 0.99))] * 1e6,
+        "accuracy": 1 - len(mismatches) / len(questions),
+        "mismatches": mismatches,
+    }
+
+
+if __name__ == "__main__":
+    from data.resume_data import (
+        personal_info, work_experience, certifications, testimonials, key_achievements, chatbot_context
+    )
+
+    router = IntentRouter.from_resume_context({
+        "personal_info": personal_info,
+        "work_experience": work_experience,
+        "certifications": certifications,
+        "testimonials": testimonials,
+        "key_achievements": key_achievements,
+        "chatbot_context": chatbot_context,
+    })
+    results = benchmark(router)
+    print(f"{len(router.intents)} intents, {len(router.postings)} indexed terms")
+    print(f"{results['calls']} calls: mean {results['mean_us']:.1f}us, "
+          f"p50 {results['p50_us']:.1f}us, p99 {results['p99_us']:.1f}us")
+    print(f"accuracy {results['accuracy']:.0%}")
+    for mismatch in results["mismatches"]:
+        print(f"  {mismatch}")
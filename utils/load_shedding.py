@@ -0,0 +1,306 @@
+"""
+Latency-SLO driven load shedding for chat requests.
+
+The LoadShedder tracks a rolling p95 of the latency of requests answered by
+the live API (from telemetry). When it breaches the configured SLO, chat
+degrades in steps to bring latency back under the target:
+
+- "degraded" (p95 above the SLO): questions are routed to the fast model
+  tier with a lower output cap, and follow-up questions are answered from
+  the answer cache when possible;
+- "shedding" (p95 above the SLO times the shed factor): in addition, the
+  closest FAQ answer is served at a slightly relaxed similarity threshold,
+  if the FAQ question contains every content word of the question.
+
+Levels rise as soon as the p95 crosses a threshold but fall one step at a
+time, only once the p95 is comfortably below it (the recover ratio) and the
+level has been held for a while, so the controller doesn't flap. This is
+separate from error handling (see utils.resilience): it holds a latency
+target while the API is slow but healthy.
+"""
+
+import os
+import math
+import time
+import logging
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from utils.chat_base import FriendlyChat
+from utils.model_routing import get_model_router
+from utils import telemetry
+
+logger = logging.getLogger(__name__)
+
+SHED_LEVELS = ("normal", "degraded", "shedding")
+
+
+class LoadShedder:
+    """
+    Rolling-p95 latency controller with hysteresis.
+    """
+
+    def __init__(self, slo_p95: float = 0.0, window: float = 60.0, min_samples: int = 10,
+                 shed_factor: float = 1.5, recover_ratio: float = 0.8, hold: float = 30.0,
+                 max_tokens: int = 250, faq_threshold: float = 0.75):
+        """
+        Initialize the controller.
+
+        Args:
+            slo_p95: Target p95 latency in seconds of live answers (0 disables shedding)
+            window: Seconds of latency samples the p95 is computed over
+            min_samples: Samples needed in the window before the level can rise
+            shed_factor: The "shedding" level starts at slo_p95 * shed_factor
+            recover_ratio: A level is left once the p95 falls below its threshold times this
+            hold: Minimum seconds between a level change and stepping down
+            max_tokens: Output-token cap while degraded
+            faq_threshold: FAQ similarity threshold while shedding (below the matcher's
+                own, an answer also needs every content word of the question in its FAQ)
+        """
+        self.slo_p95 = slo_p95
+        self.window = window
+        self.min_samples = min_samples
+        self.shed_factor = shed_factor
+        self.recover_ratio = recover_ratio
+        self.hold = hold
+        self.max_tokens = max_tokens
+        self.faq_threshold = faq_threshold
+        self._samples: "deque[tuple]" = deque(maxlen=4096)
+        self._level = 0
+        self._changed_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "LoadShedder":
+        """Build a controller from CHAT_SLO_* environment variables."""
+        return cls(
+            slo_p95=float(os.environ.get("CHAT_SLO_P95", "0")),
+            window=float(os.environ.get("CHAT_SLO_WINDOW", "60")),
+            min_samples=int(os.environ.get("CHAT_SLO_MIN_SAMPLES", "10")),
+            shed_factor=float(os.environ.get("CHAT_SLO_SHED_FACTOR", "1.5")),
+            recover_ratio=float(os.environ.get("CHAT_SLO_RECOVER_RATIO", "0.8")),
+            hold=float(os.environ.get("CHAT_SLO_HOLD", "30")),
+            max_tokens=int(os.environ.get("CHAT_SLO_MAX_TOKENS", "250")),
+            faq_threshold=float(os.environ.get("CHAT_SLO_FAQ_THRESHOLD", "0.75")),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.slo_p95 > 0
+
+    def _threshold(self, level: int) -> float:
+        """The p95 at which a level starts (level 1 or 2)."""
+        return self.slo_p95 * (self.shed_factor if level == 2 else 1.0)
+
+    def _p95(self, now: float) -> Optional[float]:
+        """Compute the window's p95. Must be called with the lock held."""
+        while self._samples and self._samples[0][0] < now - self.window:
+            self._samples.popleft()
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(latency for _, latency in self._samples)
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(0.95 * len(ordered)) - 1))]
+
+    def _update(self, now: float):
+        """Re-evaluate the level. Must be called with the lock held."""
+        p95 = self._p95(now)
+        level = self._level
+        if p95 is not None and p95 > self._threshold(2):
+            target = 2
+        elif p95 is not None and p95 > self._threshold(1):
+            target = max(level, 1)
+        else:
+            target = level
+        if target == level and level > 0 and now - self._changed_at >= self.hold:
+            # Step down only once the p95 is well under the current level's threshold
+            # (or there is too little live traffic left to tell)
+            if p95 is None or p95 < self._threshold(level) * self.recover_ratio:
+                target = level - 1
+        if target != level:
+            self._level = target
+            self._changed_at = now
+            telemetry.get_metrics().inc("chat_shed_level_changes_total", level=SHED_LEVELS[target])
+            log = logger.warning if target > level else logger.info
+            p95_text = f"{p95:.2f}s" if p95 is not None else "n/a"
+            log(f"Chat load shedding level is now {SHED_LEVELS[target]}: "
+                f"p95={p95_text} slo={self.slo_p95:.2f}s samples={len(self._samples)}")
+
+    def observe(self, latency: float, now: Optional[float] = None):
+        """
+        Record the latency of one live answer.
+
+        Args:
+            latency: Seconds from the question to the end of the answer
+            now: Monotonic timestamp (defaults to time.monotonic())
+        """
+        if not self.enabled:
+            return
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._samples.append((now, latency))
+            self._update(now)
+
+    def observe_record(self, record: telemetry.RequestRecord, latency: float, outcome: str):
+        """Telemetry listener: sample successful requests answered by the live API."""
+        if record.backend == "live" and outcome == "ok":
+            self.observe(latency)
+
+    def level(self, now: Optional[float] = None) -> str:
+        """
+        Get the current shedding level, stepping down if latency has recovered.
+
+        Args:
+            now: Monotonic timestamp (defaults to time.monotonic())
+
+        Returns:
+            "normal", "degraded" or "shedding"
+        """
+        if not self.enabled:
+            return "normal"
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self._level:
+                self._update(now)
+            return SHED_LEVELS[self._level]
+
+    def apply(self, decision: Any) -> Any:
+        """
+        Adjust a routing decision to the shedding level.
+
+        Args:
+            decision: The RoutingDecision for a question
+
+        Returns:
+            The decision, switched to the fast tier's model and a lower output cap
+            unless the level is normal
+        """
+        if self.level() == "normal":
+            return decision
+        fast_model = get_model_router().tiers["fast"]["model"]
+        if fast_model:
+            decision.model = fast_model
+        decision.max_tokens = min(decision.max_tokens, self.max_tokens)
+        decision.reason = f"{decision.reason}; shedding load"
+        return decision
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report the controller's state.
+
+        Returns:
+            Dictionary with the level, the window's p95 and sample count, and the SLO
+        """
+        with self._lock:
+            now = time.monotonic()
+            return {
+                "level": SHED_LEVELS[self._level],
+                "p95": self._p95(now),
+                "samples": len(self._samples),
+                "slo_p95": self.slo_p95,
+                "seconds_at_level": now - self._changed_at,
+            }
+
+
+class SheddingChat(FriendlyChat):
+    """
+    Wraps a live chat client, answering locally what it can while latency is over the SLO.
+    """
+
+    def __init__(self, backend: Any, matcher: Any = None,
+                 cached_answer: Optional[Callable[[str], Optional[str]]] = None,
+                 shedder: Optional[LoadShedder] = None):
+        """
+        Initialize the wrapper.
+
+        Args:
+            backend: The live chat client
+            matcher: The FAQMatcher for the resume data (None skips FAQ answers)
+            cached_answer: Looks up the cached answer to a standalone question, if any
+                (e.g. ResilientChat.cached_answer)
+            shedder: The LoadShedder (defaults to the process-wide one)
+        """
+        self.backend = backend
+        self.matcher = matcher
+        self.cached_answer = cached_answer
+        self.shedder = shedder or get_load_shedder()
+
+    @property
+    def model(self) -> str:
+        return self.backend.model
+
+    def set_system_prompt(self, resume_context: Dict[str, Any]):
+        """Set the system prompt on the wrapped backend."""
+        self.backend.set_system_prompt(resume_context)
+
+    def local_answer(self, user_message: str, **options) -> Optional[str]:
+        """
+        Answer without the API if the shedding level calls for it.
+
+        Args:
+            user_message: The message from the user/employer
+            **options: The request options
+
+        Returns:
+            The local answer, or None to ask the backend
+        """
+        level = self.shedder.level()
+        if level == "normal":
+            return None
+        if options.get("history") and self.cached_answer is not None:
+            # Standalone questions already check the cache; follow-ups usually don't
+            answer = self.cached_answer(user_message)
+            if answer is not None:
+                telemetry.get_metrics().inc("chat_shed_total", source="cache")
+                return answer
+        if level == "shedding" and self.matcher is not None:
+            answer = self.matcher.answer(user_message, threshold=self.shedder.faq_threshold)
+            if answer is not None:
+                telemetry.get_metrics().inc("chat_shed_total", source="faq")
+                telemetry.note(backend="faq")
+                return answer
+        return None
+
+    def create_response(self, user_message: str, **options) -> str:
+        """
+        Get an answer, locally if shedding load (raising on errors).
+
+        Args:
+            user_message: The message from the user/employer
+            **options: Passed through to the backend
+
+        Returns:
+            The answer as a string
+        """
+        answer = self.local_answer(user_message, **options)
+        if answer is not None:
+            return answer
+        return self.backend.create_response(user_message, **options)
+
+    def stream_text(self, user_message: str, **options) -> Iterator[str]:
+        """
+        Stream an answer, serving local answers as a single chunk (raising on errors).
+
+        Args:
+            user_message: The message from the user/employer
+            **options: Passed through to the backend
+
+        Yields:
+            Text deltas of the answer, in order
+        """
+        answer = self.local_answer(user_message, **options)
+        if answer is not None:
+            yield answer
+            return
+        for text in self.backend.stream_text(user_message, **options):
+            yield text
+
+
+# Shared controller for the whole Streamlit server process, fed by telemetry
+_load_shedder = LoadShedder.from_env()
+telemetry.add_listener(_load_shedder.observe_record)
+
+
+def get_load_shedder() -> LoadShedder:
+    """Get the process-wide load shedder."""
+    return _load_shedder
@@ -0,0 +1,173 @@
+"""
+Per-question model tier and output-token cap.
+
+A local classifier looks at the question's length, whether it matches a
+known intent or FAQ (utils.intent_router), open-ended phrasing and how long
+the conversation is, then picks a tier:
+
+- fast: short factual questions the resume answers directly
+- standard: everything else
+- deep: open-ended, long or multi-turn questions
+
+Each decision is logged so latency and cost savings can be audited.
+"""
+
+import os
+import re
+import logging
+from typing import Dict, Any, List, Optional
+
+from utils.retrieval import tokenize
+
+logger = logging.getLogger(__name__)
+
+_OPEN_ENDED_RE = re.compile(
+    r"\b(why|explain|compare|contrast|describe|design|strategy|strategies|difference|differences|"
+    r"pros and cons|trade-?offs?|walk me through|how would|what would|what if|example of|elaborate)\b",
+    re.IGNORECASE,
+)
+
+# Intents answered by a single fact from the resume data
+FACTUAL_INTENTS = ("certifications", "salary", "strengths", "achievements", "job_preferences", "testimonials")
+
+
+class RoutingDecision:
+    """
+    The model tier chosen for one question.
+    """
+
+    def __init__(self, tier: str, model: str, max_tokens: int, reason: str, features: Dict[str, Any]):
+        """
+        Args:
+            tier: "fast", "standard" or "deep"
+            model: Model to call
+            max_tokens: Output-token cap
+            reason: Short explanation of the choice
+            features: Classifier inputs (words, intent, score, coverage, open_ended, turns)
+        """
+        self.tier = tier
+        self.model = model
+        self.max_tokens = max_tokens
+        self.reason = reason
+        self.features = features
+
+    def __repr__(self) -> str:
+        return f"RoutingDecision(tier={self.tier!r}, model={self.model!r}, max_tokens={self.max_tokens})"
+
+
+class ModelRouter:
+    """
+    Classifies questions and maps them to a model tier.
+    """
+
+    def __init__(self, tiers: Dict[str, Dict[str, Any]], enabled: bool = True,
+                 long_question_words: int = 30, fast_max_words: int = 15, deep_history_turns: int = 4):
+        """
+        Initialize the router.
+
+        Args:
+            tiers: {"fast"|"standard"|"deep": {"model": name or None, "max_tokens": int}};
+                a None model means "the caller's default model"
+            enabled: If False, every question gets the standard tier
+            long_question_words: Questions longer than this go to the deep tier
+            fast_max_words: Questions longer than this never go to the fast tier
+            deep_history_turns: Conversations with at least this many prior messages go to the deep tier
+        """
+        self.tiers = tiers
+        self.enabled = enabled
+        self.long_question_words = long_question_words
+        self.fast_max_words = fast_max_words
+        self.deep_history_turns = deep_history_turns
+
+    @classmethod
+    def from_env(cls) -> "ModelRouter":
+        """Build a router from CHAT_MODEL_* / CHAT_MAX_TOKENS_* environment variables."""
+        return cls(
+            tiers={
+                "fast": {"model": os.environ.get("CHAT_MODEL_FAST", "claude-3-haiku-20240307"),
+                         "max_tokens": int(os.environ.get("CHAT_MAX_TOKENS_FAST", "300"))},
+                "standard": {"model": os.environ.get("CHAT_MODEL_STANDARD") or None,
+                             "max_tokens": int(os.environ.get("CHAT_MAX_TOKENS_STANDARD", "600"))},
+                "deep": {"model": os.environ.get("CHAT_MODEL_DEEP") or None,
+                         "max_tokens": int(os.environ.get("CHAT_MAX_TOKENS_DEEP", "1000"))},
+            },
+            enabled=os.environ.get("CHAT_MODEL_ROUTING", "1") != "0",
+        )
+
+    def classify(self, question: str, history: Optional[List[Dict[str, str]]] = None,
+                 intent_router: Any = None) -> Dict[str, Any]:
+        """
+        Extract the classifier features of a question.
+
+        Args:
+            question: The message from the user/employer
+            history: Prior turns sent with the question, if any
+            intent_router: Optional IntentRouter for intent and FAQ proximity
+
+        Returns:
+            Dictionary of features
+        """
+        intent, score = intent_router.route(question) if intent_router is not None else (None, 0.0)
+        keywords = intent["keywords"] if intent else {}
+        # Share of the intent's total keyword weight the question hit (1.0 = the FAQ itself)
+        coverage = score / sum(keywords.values()) if keywords else 0.0
+        return {
+            "words": len(question.split()),
+            "terms": len(tokenize(question)),
+            "intent": intent["name"] if intent else None,
+            "score": round(score, 2),
+            "coverage": round(coverage, 2),
+            "open_ended": bool(_OPEN_ENDED_RE.search(question)),
+            "turns": len(history or []),
+        }
+
+    def route(self, question: str, default_model: str, history: Optional[List[Dict[str, str]]] = None,
+              intent_router: Any = None) -> RoutingDecision:
+        """
+        Choose the model tier and output-token cap for a question, and log the decision.
+
+        Args:
+            question: The message from the user/employer
+            default_model: Model used for tiers without a configured model
+            history: Prior turns sent with the question, if any
+            intent_router: Optional IntentRouter for intent and FAQ proximity
+
+        Returns:
+            The RoutingDecision
+        """
+        features = self.classify(question, history, intent_router)
+        intent = features["intent"] or ""
+
+        if not self.enabled:
+            tier, reason = "standard", "routing disabled"
+        elif intent.startswith("faq:") and features["coverage"] >= 0.6:
+            tier, reason = "fast", "near-duplicate of an FAQ"
+        elif features["turns"] >= self.deep_history_turns:
+            tier, reason = "deep", "long conversation"
+        elif features["words"] > self.long_question_words:
+            tier, reason = "deep", "long question"
+        elif features["open_ended"]:
+            tier, reason = "deep", "open-ended question"
+        elif intent and features["words"] <= self.fast_max_words and \
+                (intent in FACTUAL_INTENTS or intent.startswith(("faq:", "project:"))):
+            tier, reason = "fast", f"short factual question ({intent})"
+        else:
+            tier, reason = "standard", "general question"
+
+        config = self.tiers[tier]
+        decision = RoutingDecision(tier, config["model"] or default_model, config["max_tokens"], reason, features)
+        logger.info(
+            f"Model routing: tier={decision.tier} model={decision.model} max_tokens={decision.max_tokens} "
+            f"reason=\"{reason}\" words={features['words']} intent={features['intent']} "
+            f"coverage={features['coverage']} open_ended={features['open_ended']} turns={features['turns']}"
+        )
+        return decision
+
+
+# Shared router for the whole Streamlit server process
+_model_router = ModelRouter.from_env()
+
+
+def get_model_router() -> ModelRouter:
+    """Get the process-wide model router."""
+    return _model_router
@@ -0,0 +1,264 @@
+"""
+Speculative prefetch of likely follow-up answers.
+
+After an answer is shown, the remaining quick questions (and FAQ questions)
+are ranked by similarity to the conversation's current topic, using the
+same character n-gram TF-IDF model as utils.faq_matcher. The top few are
+answered at low priority on a small dedicated pool, only while the upstream
+API is otherwise idle, and kept for the session. If the visitor then asks a
+predicted question, its answer is served at once (or as soon as the
+prefetch finishes). Answers are standalone, so they also fill the shared
+answer cache.
+
+Each session has a strict token budget: every prefetch reserves its
+estimated cost up front, is settled to its actual usage afterwards, and no
+prefetch starts if the reservation would exceed the budget.
+"""
+
+import os
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from utils.claude_api import USAGE_FIELDS
+from utils.response_cache import normalize_question
+from utils.faq_matcher import FAQMatcher, faq_matching_enabled
+from utils.warmup import collect_warmup_questions
+from utils.admission import get_admission_controller
+from utils.load_shedding import get_load_shedder
+from utils.usage_ledger import billable_tokens, get_usage_ledger
+from utils import telemetry
+
+logger = logging.getLogger(__name__)
+
+
+def prefetch_enabled() -> bool:
+    """Check whether follow-up prefetching is switched on (CHAT_PREFETCH, off by default)."""
+    return os.environ.get("CHAT_PREFETCH", "0") == "1"
+
+
+def prefetch_candidates(quick_questions: List[str], chatbot_context: Optional[Dict[str, Any]] = None) -> List[str]:
+    """
+    Gather the questions a visitor is likely to ask next.
+
+    Args:
+        quick_questions: The quick-question button labels
+        chatbot_context: The chatbot_context dict; its FAQ questions are included
+            unless FAQ matching already answers them locally
+
+    Returns:
+        The unique candidate questions
+    """
+    return collect_warmup_questions([quick_questions], None if faq_matching_enabled() else chatbot_context)
+
+
+def predict_followups(topic: str, candidates: List[str], count: int = 2, min_score: float = 0.05) -> List[str]:
+    """
+    Rank candidate questions by similarity to the current topic.
+
+    Args:
+        topic: The latest question and answer
+        candidates: Questions the visitor might ask next
+        count: Maximum predictions
+        min_score: Minimum cosine similarity for a prediction
+
+    Returns:
+        Up to count candidates, most similar first
+    """
+    if not candidates:
+        return []
+    matcher = FAQMatcher([{"question": question, "answer": ""} for question in candidates])
+    scores = matcher.scores(topic)
+    ranked = sorted(range(len(candidates)), key=lambda i: scores[i], reverse=True)
+    return [candidates[i] for i in ranked[:count] if scores[i] >= min_score]
+
+
+class _SessionPrefetches:
+    """Prefetched answers and token spend for one visitor session."""
+
+    def __init__(self):
+        self.futures: Dict[str, Future] = {}
+        self.spent = 0
+        self.reserved = 0
+
+
+class Prefetcher:
+    """
+    Generates predicted follow-up answers on a low-priority pool, per session
+    and within a per-session token budget.
+    """
+
+    def __init__(self, count: int = 2, token_budget: int = 6000, reserve_tokens: int = 2000,
+                 max_workers: int = 2, max_sessions: int = 512, wait_timeout: float = 30.0):
+        """
+        Initialize the prefetcher.
+
+        Args:
+            count: Follow-ups predicted after each answer
+            token_budget: Billable tokens (input, cache writes and output) a session
+                may spend on prefetching
+            reserve_tokens: Tokens reserved for each prefetch until its usage is known
+            max_workers: Concurrent prefetches per process
+            max_sessions: Sessions tracked (least recently used are forgotten)
+            wait_timeout: Seconds a question waits for its in-flight prefetch
+        """
+        self.count = count
+        self.token_budget = token_budget
+        self.reserve_tokens = reserve_tokens
+        self.max_sessions = max_sessions
+        self.wait_timeout = wait_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="chat-prefetch")
+        self._sessions: "OrderedDict[str, _SessionPrefetches]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "Prefetcher":
+        """Build a prefetcher from CHAT_PREFETCH_* environment variables."""
+        return cls(
+            count=int(os.environ.get("CHAT_PREFETCH_COUNT", "2")),
+            token_budget=int(os.environ.get("CHAT_PREFETCH_TOKEN_BUDGET", "6000")),
+            reserve_tokens=int(os.environ.get("CHAT_PREFETCH_RESERVE_TOKENS", "2000")),
+            max_workers=int(os.environ.get("CHAT_PREFETCH_THREADS", "2")),
+        )
+
+    def _session(self, session_id: str) -> _SessionPrefetches:
+        """Get (or start) a session's prefetches. Must be called with the lock held."""
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = _SessionPrefetches()
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        self._sessions.move_to_end(session_id)
+        return session
+
+    @staticmethod
+    def upstream_idle() -> bool:
+        """Check that prefetching wouldn't compete with visitors' questions or the budget."""
+        controller = get_admission_controller()
+        if controller.enabled:
+            stats = controller.stats()
+            if stats["queued"] or stats["active"] >= max(1, stats["max_concurrent"] // 2):
+                return False
+        return get_load_shedder().level() == "normal" and get_usage_ledger().level() == "ok"
+
+    def schedule(self, session_id: str, chat: Any, history: List[Dict[str, str]],
+                 candidates: List[str]) -> List[str]:
+        """
+        Predict the session's next questions and start answering them.
+
+        Questions already asked, already prefetched, or already in the answer
+        cache are skipped.
+
+        Args:
+            session_id: The visitor session
+            chat: A CachedChat over the live backend
+            history: The chat history, ending with the latest answer
+            candidates: Questions the visitor might ask next
+
+        Returns:
+            The questions being prefetched
+        """
+        if not history or not self.upstream_idle():
+            return []
+        asked = {normalize_question(message["content"]) for message in history if message["role"] == "user"}
+        topic = " ".join(message["content"] for message in history[-2:])
+        candidates = [question for question in candidates
+                      if normalize_question(question) not in asked and not chat.is_cached(question)]
+
+        started = []
+        with self._lock:
+            session = self._session(session_id)
+            for question in predict_followups(topic, candidates, self.count):
+                key = normalize_question(question)
+                if key in session.futures:
+                    continue
+                if session.spent + session.reserved + self.reserve_tokens > self.token_budget:
+                    telemetry.get_metrics().inc("chat_prefetch_total", outcome="over_budget")
+                    break
+                session.reserved += self.reserve_tokens
+                session.futures[key] = self._executor.submit(self._generate, session, chat, question)
+                started.append(question)
+        if started:
+            logger.info(f"Prefetching {len(started)} follow-up answers: {started}")
+        return started
+
+    def _generate(self, session: _SessionPrefetches, chat: Any, question: str) -> Optional[str]:
+        """Answer one predicted question and settle its tokens (runs on the prefetch pool)."""
+        record = None
+        answer = None
+        try:
+            # Re-check: visitors may have queued up since the prefetch was scheduled
+            if not self.upstream_idle():
+                telemetry.get_metrics().inc("chat_prefetch_total", outcome="skipped")
+                return None
+            with telemetry.track_request(chat.model) as record:
+                answer = "".join(chat.stream_text(question))
+            telemetry.get_metrics().inc("chat_prefetch_total", outcome="generated")
+            return answer
+        except Exception as e:
+            telemetry.get_metrics().inc("chat_prefetch_total", outcome="failed")
+            logger.info(f"Prefetch failed for {question!r}: {str(e)}")
+            return None
+        finally:
+            usage = record.usage if record is not None else {}
+            with self._lock:
+                session.reserved -= self.reserve_tokens
+                session.spent += billable_tokens({field: usage.get(field, 0) for field in USAGE_FIELDS})
+
+    def take(self, session_id: str, message: str) -> Optional[Future]:
+        """
+        Claim the prefetched answer to a question and drop the session's other
+        predictions (they were made for a turn that is now over).
+
+        Args:
+            session_id: The visitor session
+            message: The question the visitor asked
+
+        Returns:
+            A Future for the answer (None if it couldn't be generated), or None
+            if the question wasn't predicted
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            future = session.futures.pop(normalize_question(message), None)
+            for other in session.futures.values():
+                # Prefetches already running finish and fill the shared cache; one cancelled
+                # before it started never runs _generate, so its reservation is released here
+                if other.cancel():
+                    session.reserved -= self.reserve_tokens
+            session.futures.clear()
+        telemetry.get_metrics().inc("chat_prefetch_total", outcome="hit" if future is not None else "miss")
+        return future
+
+    def stats(self, session_id: str) -> Dict[str, Any]:
+        """
+        Report a session's prefetches.
+
+        Args:
+            session_id: The visitor session
+
+        Returns:
+            Dictionary with the pending and ready predictions and the token spend
+        """
+        with self._lock:
+            session = self._sessions.get(session_id) or _SessionPrefetches()
+            return {
+                "pending": sum(1 for future in session.futures.values() if not future.done()),
+                "ready": sum(1 for future in session.futures.values() if future.done()),
+                "spent": session.spent,
+                "reserved": session.reserved,
+                "token_budget": self.token_budget,
+            }
+
+
+# Shared prefetcher for the whole Streamlit server process
+_prefetcher = Prefetcher.from_env()
+
+
+def get_prefetcher() -> Prefetcher:
+    """Get the process-wide prefetcher."""
+    return _prefetcher
@@ -0,0 +1,280 @@
+"""
+Token-bucket rate limits for chat requests that would reach the upstream API.
+
+Three levels are checked together: per visitor session, per client IP and
+process-wide. A request is admitted only if every level has a token, so one
+client can't drain the shared API key's quota. Answers served from the cache
+don't consume tokens.
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from utils import telemetry
+from utils.chat_base import FriendlyChat
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Classic token bucket: refills at `rate` tokens per second up to `capacity`.
+    Not thread-safe on its own; RateLimiter serializes access.
+    """
+
+    def __init__(self, rate: float, capacity: float, now: Optional[float] = None):
+        """
+        Initialize a full bucket.
+
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum tokens (the allowed burst)
+            now: Current monotonic time (defaults to time.monotonic())
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic() if now is None else now
+
+    def refill(self, now: float):
+        """Add the tokens accrued since the last update."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def retry_after(self, cost: float = 1.0) -> float:
+        """Seconds until `cost` tokens are available (0 if they already are)."""
+        missing = cost - self.tokens
+        if missing <= 0:
+            return 0.0
+        return missing / self.rate if self.rate > 0 else float("inf")
+
+
+class RateLimitDecision:
+    """
+    Outcome of a rate-limit check.
+    """
+
+    def __init__(self, allowed: bool, scope: Optional[str] = None, retry_after: float = 0.0):
+        """
+        Args:
+            allowed: Whether the request may go upstream
+            scope: Which limit refused it ("session", "ip" or "global")
+            retry_after: Seconds until the refusing limit has a token again
+        """
+        self.allowed = allowed
+        self.scope = scope
+        self.retry_after = retry_after
+
+    def __bool__(self) -> bool:
+        return self.allowed
+
+
+class RateLimiter:
+    """
+    Per-session, per-IP and global token buckets checked atomically.
+    """
+
+    def __init__(self, session_per_minute: float = 10, session_burst: float = 5,
+                 ip_per_minute: float = 30, ip_burst: float = 10,
+                 global_per_minute: float = 120, global_burst: float = 30,
+                 max_tracked: int = 10000):
+        """
+        Initialize the limiter. A per-minute rate of 0 disables that level.
+
+        Args:
+            session_per_minute: Sustained requests per minute per session
+            session_burst: Requests a session may make back to back
+            ip_per_minute: Sustained requests per minute per client IP
+            ip_burst: Requests an IP may make back to back
+            global_per_minute: Sustained requests per minute for the whole process
+            global_burst: Burst size for the whole process
+            max_tracked: Maximum session/IP buckets kept (least recently used are dropped)
+        """
+        self.limits = {
+            "session": (session_per_minute / 60.0, session_burst),
+            "ip": (ip_per_minute / 60.0, ip_burst),
+            "global": (global_per_minute / 60.0, global_burst),
+        }
+        self.max_tracked = max_tracked
+        self._buckets: "OrderedDict[Tuple[str, str], TokenBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "RateLimiter":
+        """Build a limiter from CHAT_RATE_* environment variables."""
+        return cls(
+            session_per_minute=float(os.environ.get("CHAT_RATE_SESSION_PER_MIN", "10")),
+            session_burst=float(os.environ.get("CHAT_RATE_SESSION_BURST", "5")),
+            ip_per_minute=float(os.environ.get("CHAT_RATE_IP_PER_MIN", "30")),
+            ip_burst=float(os.environ.get("CHAT_RATE_IP_BURST", "10")),
+            global_per_minute=float(os.environ.get("CHAT_RATE_GLOBAL_PER_MIN", "120")),
+            global_burst=float(os.environ.get("CHAT_RATE_GLOBAL_BURST", "30")),
+        )
+
+    def _bucket(self, scope: str, key: str, now: float) -> Optional[TokenBucket]:
+        """Get (or create) a bucket. Must be called with the lock held."""
+        rate, capacity = self.limits[scope]
+        if rate <= 0:
+            return None
+        bucket_key = (scope, key)
+        bucket = self._buckets.get(bucket_key)
+        if bucket is None:
+            bucket = self._buckets[bucket_key] = TokenBucket(rate, capacity, now)
+            while len(self._buckets) > self.max_tracked:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(bucket_key)
+        bucket.refill(now)
+        return bucket
+
+    def check(self, session_id: Optional[str], client_ip: Optional[str], cost: float = 1.0) -> RateLimitDecision:
+        """
+        Take a token from every level, or from none if any level is exhausted.
+
+        Args:
+            session_id: The visitor session (None skips the session level)
+            client_ip: The client IP (None skips the IP level)
+            cost: Tokens the request costs
+
+        Returns:
+            The RateLimitDecision
+        """
+        now = time.monotonic()
+        with self._lock:
+            buckets = []
+            for scope, key in (("session", session_id), ("ip", client_ip), ("global", "*")):
+                if key is None:
+                    continue
+                bucket = self._bucket(scope, key, now)
+                if bucket is None:
+                    continue
+                wait = bucket.retry_after(cost)
+                if wait > 0:
+                    telemetry.get_metrics().inc("chat_rate_limited_total", scope=scope)
+                    return RateLimitDecision(False, scope, wait)
+                buckets.append(bucket)
+            for bucket in buckets:
+                bucket.tokens -= cost
+        return RateLimitDecision(True)
+
+
+def rate_limit_notice(decision: RateLimitDecision) -> str:
+    """
+    Build the in-chat notice shown when a question is over the limit.
+
+    Args:
+        decision: The refusing RateLimitDecision
+
+    Returns:
+        The notice text
+    """
+    if decision.scope == "global":
+        reason = "The chatbot is very busy right now"
+    else:
+        reason = "You're sending questions faster than I can answer them"
+    return (f"{reason}, so here's a quick answer from Kelby's profile. "
+            f"Try again in about {max(1, round(decision.retry_after))} seconds for a full answer.\n\n")
+
+
+class RateLimitedChat(FriendlyChat):
+    """
+    Wraps a live chat backend for one session, answering from a local fallback
+    with a notice when the session, its IP or the whole process is over its limit.
+    """
+
+    def __init__(self, backend: Any, fallback: Any, session_id: Optional[str], client_ip: Optional[str],
+                 limiter: Optional[RateLimiter] = None,
+                 is_cached: Optional[Callable[[str], bool]] = None):
+        """
+        Initialize the wrapper.
+
+        Args:
+            backend: The live backend (e.g. ResilientChat)
+            fallback: Backend answering over-limit requests (e.g. the registry's MockClaudeChat)
+            session_id: The visitor session
+            client_ip: The client's IP address, if known
+            limiter: The RateLimiter (defaults to the process-wide one)
+            is_cached: Optional callable telling whether a question is answered from the cache
+                (cached answers are never limited)
+        """
+        self.backend = backend
+        self.fallback = fallback
+        self.session_id = session_id
+        self.client_ip = client_ip
+        self.limiter = limiter or get_rate_limiter()
+        self.is_cached = is_cached
+
+    @property
+    def model(self) -> str:
+        return self.backend.model
+
+    def set_system_prompt(self, resume_context: Dict[str, Any]):
+        """Set the system prompt on the wrapped backend."""
+        self.backend.set_system_prompt(resume_context)
+
+    def admit(self, user_message: str, **options) -> RateLimitDecision:
+        """
+        Decide whether a request may reach the live backend.
+
+        Args:
+            user_message: The message from the user/employer
+            **options: The request options (requests with history are never cached)
+
+        Returns:
+            The RateLimitDecision
+        """
+        if self.is_cached is not None and not options.get("history") and self.is_cached(user_message):
+            return RateLimitDecision(True)
+        decision = self.limiter.check(self.session_id, self.client_ip)
+        if not decision:
+            logger.info(f"Chat request over the {decision.scope} rate limit; serving a local answer")
+        return decision
+
+    def create_response(self, user_message: str, **options) -> str:
+        """
+        Get an answer, from the fallback with a notice if over the limit.
+
+        Args:
+            user_message: The message from the user/employer
+            **options: Passed through to the backend
+
+        Returns:
+            The answer as a string
+        """
+        decision = self.admit(user_message, **options)
+        if not decision:
+            return rate_limit_notice(decision) + self.fallback.get_response(user_message)
+        return self.backend.create_response(user_message, **options)
+
+    def stream_text(self, user_message: str, **options) -> Iterator[str]:
+        """
+        Stream an answer, from the fallback with a notice if over the limit.
+
+        Args:
+            user_message: The message from the user/employer
+            **options: Passed through to the backend
+
+        Yields:
+            Text deltas of the answer, in order
+        """
+        decision = self.admit(user_message, **options)
+        if not decision:
+            yield rate_limit_notice(decision)
+            for text in self.fallback.stream_response(user_message):
+                yield text
+            return
+        for text in self.backend.stream_text(user_message, **options):
+            yield text
+
+
+# Shared limiter for the whole Streamlit server process
+_rate_limiter = RateLimiter.from_env()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Get the process-wide rate limiter."""
+    return _rate_limiter
@@ -0,0 +1,415 @@
+"""
+Resilience layer for chat backends: bounded retries with jittered backoff, a
+per-request deadline, and a circuit breaker that degrades to cached or mock
+answers while the upstream API is failing.
+"""
+
+import os
+import time
+import random
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterator, Optional
+
+import anthropic
+
+from utils.claude_api import MockClaudeChat
+from utils.chat_base import FriendlyChat
+from utils.admission import AdmissionRejected, admission_notice
+from utils import telemetry
+
+logger = logging.getLogger(__name__)
+
+# HTTP statuses worth retrying: timeouts, conflicts, rate limits, overload and 5xx
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the circuit breaker is open."""
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    """Extract the HTTP status code from an SDK error, if any."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        response = getattr(error, "response", None)
+        status = getattr(response, "status_code", None)
+    return status
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Decide whether an upstream error is transient and worth retrying.
+
+    Args:
+        error: The exception raised by the backend
+
+    Returns:
+        True for connection errors, timeouts, 429, 529 and 5xx responses
+    """
+    # Covers anthropic.APITimeoutError too
+    if isinstance(error, anthropic.APIConnectionError):
+        return True
+    return _status_code(error) in RETRYABLE_STATUS_CODES
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Read a Retry-After header (in seconds) from an error response, if present."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """
+    Bounded retries with full-jitter exponential backoff inside a per-request deadline.
+    """
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5,
+                 max_delay: float = 4.0, deadline: float = 30.0):
+        """
+        Initialize the retry policy.
+
+        Args:
+            max_attempts: Maximum attempts per request, including the first
+            base_delay: Backoff base in seconds (doubles per attempt)
+            max_delay: Upper bound for a single backoff in seconds
+            deadline: Total seconds a request may take across all attempts
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+
+    def backoff(self, attempt: int, error: Exception = None) -> float:
+        """
+        Compute the delay before the next attempt.
+
+        Args:
+            attempt: Number of attempts made so far (1 after the first failure)
+            error: The error that triggered the retry (its Retry-After is honoured)
+
+        Returns:
+            Seconds to sleep
+        """
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+        retry_after = _retry_after(error) if error is not None else None
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+    @classmethod
+    def from_env(cls) -> "RetryPolicy":
+        """Build a policy from CHAT_RETRY_* / CHAT_REQUEST_DEADLINE environment variables."""
+        return cls(
+            max_attempts=int(os.environ.get("CHAT_RETRY_ATTEMPTS", "3")),
+            base_delay=float(os.environ.get("CHAT_RETRY_BASE_DELAY", "0.5")),
+            max_delay=float(os.environ.get("CHAT_RETRY_MAX_DELAY", "4")),
+            deadline=float(os.environ.get("CHAT_REQUEST_DEADLINE", "30")),
+        )
+
+
+class CircuitBreaker:
+    """
+    Classic closed / open / half-open circuit breaker.
+
+    After `failure_threshold` consecutive failures the breaker opens and rejects
+    calls for `recovery_timeout` seconds. It then lets a single probe through
+    (half-open); a successful probe closes it, a failed one re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str = "anthropic", failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        """
+        Initialize the circuit breaker.
+
+        Args:
+            name: Name used in log messages
+            failure_threshold: Consecutive failures that open the circuit
+            recovery_timeout: Seconds to stay open before allowing a probe
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def _transition(self, state: str):
+        """Change state and log the transition. Must be called with the lock held."""
+        if state == self.state:
+            return
+        log = logger.warning if state == self.OPEN else logger.info
+        log(f"Circuit breaker '{self.name}': {self.state} -> {state} "
+            f"(consecutive failures: {self.consecutive_failures})")
+        self.state = state
+
+    def allow_request(self) -> bool:
+        """
+        Check whether a call may go upstream right now.
+
+        Returns:
+            True if the call is allowed (closed, or the half-open probe)
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+                self._transition(self.HALF_OPEN)
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        """Record a successful upstream call."""
+        with self._lock:
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+            self._transition(self.CLOSED)
+
+    def record_failure(self):
+        """Record a failed upstream call (after retries were exhausted)."""
+        with self._lock:
+            self.consecutive_failures += 1
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._transition(self.OPEN)
+
+    def release_probe(self):
+        """Give back a half-open probe slot without counting a success or failure."""
+        with self._lock:
+            self._probe_in_flight = False
+
+
+def resilient_call(fn: Callable[..., Any], *args, policy: RetryPolicy = None,
+                   breaker: CircuitBreaker = None, **kwargs) -> Any:
+    """
+    Call fn with retries, a deadline and circuit breaking.
+
+    The remaining deadline is passed to fn as its `timeout` keyword argument.
+
+    Args:
+        fn: The upstream call; must accept a `timeout` keyword argument
+        policy: Retry policy (defaults to the process-wide one)
+        breaker: Circuit breaker (defaults to the process-wide one)
+
+    Returns:
+        The result of fn
+
+    Raises:
+        CircuitOpenError: If the breaker rejected the call
+        Exception: The last error once retries or the deadline are exhausted
+    """
+    policy = policy or get_retry_policy()
+    breaker = breaker or get_circuit_breaker()
+    if not breaker.allow_request():
+        raise CircuitOpenError(f"Circuit breaker '{breaker.name}' is open")
+
+    deadline = time.monotonic() + policy.deadline
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            result = fn(*args, timeout=max(0.1, deadline - time.monotonic()), **kwargs)
+        except Exception as e:
+            delay = policy.backoff(attempt, e)
+            if (not is_retryable(e) or attempt >= policy.max_attempts
+                    or time.monotonic() + delay >= deadline):
+                if is_retryable(e):
+                    breaker.record_failure()
+                else:
+                    # Client errors (bad request, auth) say nothing about upstream health
+                    breaker.release_probe()
+                raise
+            logger.info(f"Retrying chat request in {delay:.2f}s after attempt {attempt} failed: {str(e)}")
+            time.sleep(delay)
+            continue
+        breaker.record_success()
+        return result
+
+
+class ResilientChat(FriendlyChat):
+    """
+    Wraps a chat backend with retries, a deadline and a circuit breaker. While
+    the breaker is open, or once retries are exhausted, answers come from the
+    primary's answer cache if available, otherwise from a fallback backend.
+    """
+
+    def __init__(self, primary: Any, fallback: Any = None, policy: RetryPolicy = None,
+                 breaker: CircuitBreaker = None):
+        """
+        Initialize the resilient chat wrapper.
+
+        Args:
+            primary: The live backend (typically a CachedChat around ClaudeChat)
+            fallback: Backend used while degraded (defaults to MockClaudeChat)
+            policy: Retry policy (defaults to the process-wide one)
+            breaker: Circuit breaker (defaults to the process-wide one)
+        """
+        self.primary = primary
+        self.fallback = fallback or MockClaudeChat()
+        self.policy = policy or get_retry_policy()
+        self.breaker = breaker or get_circuit_breaker()
+
+    @property
+    def model(self) -> str:
+        return self.primary.model
+
+    def set_system_prompt(self, resume_context: Dict[str, Any]):
+        """Set the system prompt on both the primary and fallback backends."""
+        self.primary.set_system_prompt(resume_context)
+        self.fallback.set_system_prompt(resume_context)
+
+    def cached_answer(self, user_message: str) -> Optional[str]:
+        """
+        Look up the primary's answer cache without touching the upstream API.
+
+        Args:
+            user_message: The message from the user/employer
+
+        Returns:
+            The cached answer, or None if the primary has no cache or no entry
+        """
+        cache = getattr(self.primary, "cache", None)
+        if cache is None:
+            return None
+        key = self.primary.cache_key(user_message)
+        answer = cache.get(key) if key in cache else None
+        if answer is not None:
+            telemetry.note(backend="cache")
+        return answer
+
+    def degraded_response(self, user_message: str) -> str:
+        """
+        Answer without calling the upstream API.
+
+        Args:
+            user_message: The message from the user/employer
+
+        Returns:
+            A cached answer if the primary has one, otherwise the fallback's answer
+        """
+        answer = self.cached_answer(user_message)
+        if answer is not None:
+            return answer
+        return self.fallback.get_response(user_message)
+
+    def create_response(self, user_message: str, **options) -> str:
+        """
+        Get an answer through the retry/breaker layer, degrading instead of failing.
+
+        Args:
+            user_message: The message from the user/employer
+            **options: Passed through to the primary backend
+
+        Returns:
+            The answer as a string
+        """
+        # Cache hits never reach the breaker, so they can't count as a half-open probe
+        answer = None if options.get("history") else self.cached_answer(user_message)
+        if answer is not None:
+            return answer
+
+        try:
+            return resilient_call(self.primary.create_response, user_message,
+                                  policy=self.policy, breaker=self.breaker, **options)
+        except CircuitOpenError:
+            return self.degraded_response(user_message)
+        except AdmissionRejected as e:
+            # Too busy to queue: answer locally right away rather than adding load
+            return admission_notice(e) + self.degraded_response(user_message)
+        except Exception as e:
+            if not is_retryable(e):
+                raise
+            logger.warning(f"Chat request failed after retries, serving degraded answer: {str(e)}")
+            return self.degraded_response(user_message)
+
+    def stream_text(self, user_message: str, **options) -> Iterator[str]:
+        """
+        Stream an answer through the retry/breaker layer, degrading instead of failing.
+
+        Attempts are only retried if they fail before the first chunk is produced;
+        once text has been shown, an error is raised to the caller.
+
+        Args:
+            user_message: The message from the user/employer
+            **options: Passed through to the primary backend
+
+        Yields:
+            Text deltas of the answer, in order
+        """
+        answer = None if options.get("history") else self.cached_answer(user_message)
+        if answer is not None:
+            yield answer
+            return
+
+        if not self.breaker.allow_request():
+            yield self.degraded_response(user_message)
+            return
+
+        deadline = time.monotonic() + self.policy.deadline
+        attempt = 0
+        while True:
+            attempt += 1
+            started = False
+            try:
+                timeout = max(0.1, deadline - time.monotonic())
+                for text in self.primary.stream_text(user_message, timeout=timeout, **options):
+                    started = True
+                    yield text
+            except GeneratorExit:
+                self.breaker.release_probe()
+                raise
+            except AdmissionRejected as e:
+                # Too busy to queue: answer locally right away rather than adding load
+                self.breaker.release_probe()
+                yield admission_notice(e) + self.degraded_response(user_message)
+                return
+            except Exception as e:
+                delay = self.policy.backoff(attempt, e)
+                retryable = is_retryable(e)
+                if started or not retryable or attempt >= self.policy.max_attempts \
+                        or time.monotonic() + delay >= deadline:
+                    if retryable:
+                        self.breaker.record_failure()
+                    else:
+                        self.breaker.release_probe()
+                    if started or not retryable:
+                        raise
+                    logger.warning(f"Chat stream failed after retries, serving degraded answer: {str(e)}")
+                    yield self.degraded_response(user_message)
+                    return
+                logger.info(f"Retrying chat stream in {delay:.2f}s after attempt {attempt} failed: {str(e)}")
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return
+
+
+# Shared policy and breaker for the whole Streamlit server process (one upstream API)
+_retry_policy = RetryPolicy.from_env()
+_circuit_breaker = CircuitBreaker(
+    name="anthropic",
+    failure_threshold=int(os.environ.get("CHAT_BREAKER_FAILURES", "5")),
+    recovery_timeout=float(os.environ.get("CHAT_BREAKER_RECOVERY", "30")),
+)
+
+
+def get_retry_policy() -> RetryPolicy:
+    """Get the process-wide retry policy."""
+    return _retry_policy
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    """Get the process-wide circuit breaker for the Anthropic API."""
+    return _circuit_breaker
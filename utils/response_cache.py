@@ -0,0 +1,273 @@
+"""
+In-process answer cache for chat responses, keyed on normalized questions.
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Iterator, Optional, Tuple
+
+from utils.claude_api import RequestCoalescer, get_request_coalescer, normalize_question
+from utils.chat_base import FriendlyChat
+from utils.load_shedding import get_load_shedder
+from utils.usage_ledger import get_usage_ledger
+from utils import telemetry
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache with a per-entry TTL and hit/miss counters.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 3600.0):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of answers kept before evicting the least recently used
+            ttl_seconds: Seconds an answer stays valid after it is stored
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, str, str], Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def make_key(question: str, model: str, data_version: str) -> Tuple[str, str, str]:
+        """
+        Build the cache key for a question.
+
+        Args:
+            question: The raw question text
+            model: The model (or backend name) that produces the answer
+            data_version: Version of the resume data the answer is grounded in
+
+        Returns:
+            A hashable cache key
+        """
+        return (normalize_question(question), model, data_version)
+
+    def get(self, key: Tuple[str, str, str]) -> Optional[str]:
+        """
+        Look up a cached answer.
+
+        Args:
+            key: A key from make_key()
+
+        Returns:
+            The cached answer, or None on a miss or expired entry
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            answer, expires_at = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return answer
+
+    def put(self, key: Tuple[str, str, str], answer: str):
+        """
+        Store an answer, evicting the least recently used entries if the cache is full.
+
+        Args:
+            key: A key from make_key()
+            answer: The answer text to cache
+        """
+        with self._lock:
+            self._entries[key] = (answer, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def __contains__(self, key: Tuple[str, str, str]) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[1] > time.monotonic()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def clear(self):
+        """Remove all cached answers (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache counters.
+
+        Returns:
+            Dictionary with size, hits, misses, evictions, expirations and hit rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class CachedChat(FriendlyChat):
+    """
+    Wraps a chat backend (ClaudeChat or MockClaudeChat) with a ResponseCache.
+    Only successful answers to standalone questions are cached; errors,
+    follow-ups sent with conversation history and answers downgraded while
+    shedding load or past the soft budget cap are never stored. Concurrent
+    cache misses for the same key share one upstream call.
+    """
+
+    def __init__(self, backend: Any, cache: ResponseCache, data_version: str,
+                 coalescer: Optional[RequestCoalescer] = None):
+        """
+        Initialize the cached chat wrapper.
+
+        Args:
+            backend: The chat backend to put the cache in front of
+            cache: The shared ResponseCache
+            data_version: Version of the resume data the backend was built from
+            coalescer: Single-flight coalescer for misses (defaults to the process-wide one)
+        """
+        self.backend = backend
+        self.cache = cache
+        self.data_version = data_version
+        self.coalescer = coalescer or get_request_coalescer()
+
+    @property
+    def model(self) -> str:
+        return self.backend.model
+
+    def set_system_prompt(self, resume_context: Dict[str, Any]):
+        """Set the system prompt on the wrapped backend."""
+        self.backend.set_system_prompt(resume_context)
+
+    def cache_key(self, user_message: str) -> Tuple[str, str, str]:
+        """Build the cache key for a message on this backend."""
+        return self.cache.make_key(user_message, self.backend.model, self.data_version)
+
+    @staticmethod
+    def answers_degraded() -> bool:
+        """
+        Check whether answers are currently downgraded (a smaller model and output
+        cap while shedding load or past the soft budget cap), so they must not be
+        cached under the full-quality key.
+        """
+        return get_load_shedder().level() != "normal" or get_usage_ledger().level() != "ok"
+
+    def is_cached(self, user_message: str) -> bool:
+        """Check whether a standalone question would be answered from the cache (counters unaffected)."""
+        return self.cache_key(user_message) in self.cache
+
+    def _fetch(self, key: Tuple[str, str, str], user_message: str, **options) -> str:
+        """Call the backend and cache the answer (runs once per in-flight key)."""
+        # An identical request may have finished between our miss and becoming leader
+        if key in self.cache:
+            answer = self.cache.get(key)
+            if answer is not None:
+                telemetry.note(backend="cache")
+                return answer
+        # Checked before and after the call: the shedding level is held for a while once it
+        # rises and the budget level only drops at midnight, so an answer routed while
+        # degraded always sees a degraded level at one end
+        degraded = self.answers_degraded()
+        answer = self.backend.create_response(user_message, **options)
+        if not (degraded or self.answers_degraded()):
+            self.cache.put(key, answer)
+        return answer
+
+    def _stream(self, key: Tuple[str, str, str], user_message: str, **options) -> Iterator[str]:
+        """Stream from the backend and cache the full answer (runs once per in-flight key)."""
+        degraded = self.answers_degraded()
+        chunks = []
+        for text in self.backend.stream_text(user_message, **options):
+            chunks.append(text)
+            yield text
+        if not (degraded or self.answers_degraded()):
+            self.cache.put(key, "".join(chunks))
+
+    def create_response(self, user_message: str, **options) -> str:
+        """
+        Get an answer from the cache, or from the backend on a miss (raising on errors).
+
+        Args:
+            user_message: The message from the user/employer
+            **options: Passed through to the backend (e.g. timeout, history)
+
+        Returns:
+            The answer as a string
+        """
+        # Follow-up answers depend on the conversation, so they bypass the cache
+        if options.get("history"):
+            return self.backend.create_response(user_message, **options)
+
+        key = self.cache_key(user_message)
+        answer = self.cache.get(key)
+        if answer is None:
+            answer = self.coalescer.run(key, self._fetch, key, user_message, **options)
+        else:
+            telemetry.note(backend="cache")
+        return answer
+
+    def stream_text(self, user_message: str, **options) -> Iterator[str]:
+        """
+        Stream an answer, serving cache hits as a single chunk (raising on errors).
+
+        Args:
+            user_message: The message from the user/employer
+            **options: Passed through to the backend (e.g. timeout, history)
+
+        Yields:
+            Text deltas of the answer, in order
+        """
+        # Follow-up answers depend on the conversation, so they bypass the cache
+        if options.get("history"):
+            for text in self.backend.stream_text(user_message, **options):
+                yield text
+            return
+
+        key = self.cache_key(user_message)
+        answer = self.cache.get(key)
+        if answer is not None:
+            telemetry.note(backend="cache")
+            yield answer
+            return
+
+        for text in self.coalescer.stream(key, self._stream, key, user_message, **options):
+            yield text
+
+
+# Shared answer cache for the whole Streamlit server process
+_response_cache = ResponseCache(
+    max_entries=int(os.environ.get("CHAT_RESPONSE_CACHE_SIZE", "256")),
+    ttl_seconds=float(os.environ.get("CHAT_RESPONSE_CACHE_TTL", "3600")),
+)
+
+
+def get_response_cache() -> ResponseCache:
+    """
+    Get the process-wide response cache.
+
+    Returns:
+        The shared ResponseCache instance
+    """
+    return _response_cache
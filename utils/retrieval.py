@@ -0,0 +1,247 @@
+"""
+Local retrieval over the resume data, so chat prompts only include the context
+relevant to each question instead of pasting every highlight and FAQ.
+
+The structures in data/resume_data.py are split into small labelled chunks and
+indexed with BM25 using NumPy. The index is rebuilt only when the resume data
+version changes.
+"""
+
+import os
+import re
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from utils.conversation_memory import estimate_tokens
+
+# How many times a chunk's source label counts towards its terms
+SOURCE_WEIGHT = 3
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[+#][a-z0-9+#]*)?")
+
+# Common English words that carry no retrieval signal
+STOPWORDS = frozenset("""
+a about an and any are as at be been but by can could did do does for from had has have
+how i in is it its me my of on or our so that the their them there these they this to
+was we were what when where which who why will with would you your yours tell please
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase index terms, dropping stopwords and folding plurals.
+
+    Args:
+        text: The text to tokenize
+
+    Returns:
+        List of terms
+    """
+    return [_stem(token) for token in _TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+def _stem(token: str) -> str:
+    """Fold simple plurals ("certifications" -> "certification")."""
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def chunk_resume_data(resume_data: Dict[str, Any]) -> List[Dict[str, str]]:
+    """
+    Split the resume data into labelled, self-contained text chunks.
+
+    Args:
+        resume_data: Dictionary with any of personal_info, skills, work_experience,
+            certifications, testimonials, key_achievements and chatbot_context
+
+    Returns:
+        List of chunks, each with "source" and "text" keys
+    """
+    chunks = []
+
+    def add(source: str, text: str):
+        chunks.append({"source": source, "text": " ".join(text.split())})
+
+    personal_info = resume_data.get("personal_info")
+    if personal_info:
+        add("Summary", f"{personal_info['name']}, {personal_info['title']}. {personal_info['summary']}")
+
+    skills = resume_data.get("skills")
+    if skills:
+        add("Skills", "Skills (proficiency out of 10): " + ", ".join(f"{name} {level}" for name, level in skills.items()))
+
+    for job in resume_data.get("work_experience", []):
+        role = f"{job['title']} at {job['company']} ({job['start_date']} to {job['end_date']}, {job['location']})"
+        add("Experience", f"{role}: {job['description']} Skills: {', '.join(job['skills'])}.")
+        for achievement in job.get("achievements", []):
+            add("Achievement", f"As {role}: {achievement}")
+
+    certifications = resume_data.get("certifications")
+    if certifications:
+        add("Certifications", "Certifications: " + "; ".join(
+            f"{cert['name']} ({cert['issuer']}, {cert['date_earned']})" for cert in certifications))
+
+    for testimonial in resume_data.get("testimonials", []):
+        add("Testimonial", f"Testimonial from {testimonial['author']}, {testimonial['title']} at "
+                           f"{testimonial['company']} ({testimonial['relationship']}): \"{testimonial['quote']}\"")
+
+    for achievement in resume_data.get("key_achievements", []):
+        add("Key achievement", achievement)
+
+    context = resume_data.get("chatbot_context", {})
+    if context.get("strengths"):
+        add("Strengths", "Key strengths: " + "; ".join(context["strengths"]))
+    if context.get("unique_selling_points"):
+        add("Unique selling points", "Unique selling points: " + "; ".join(context["unique_selling_points"]))
+    if context.get("job_seeking_preferences"):
+        add("Job preferences", "Job preferences: " + "; ".join(context["job_seeking_preferences"]))
+    for project in context.get("project_highlights", []):
+        add("Project", f"{project['name']}: {project['description']} Technologies: {', '.join(project['technologies'])}.")
+    for faq in context.get("frequently_asked_questions", []):
+        add("FAQ", f"Q: {faq['question']} A: {faq['answer']}")
+
+    return chunks
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a small set of chunks, with scoring vectorized in NumPy.
+    """
+
+    def __init__(self, chunks: List[Dict[str, str]], k1: float = 1.5, b: float = 0.75):
+        """
+        Build the index.
+
+        Args:
+            chunks: Chunks from chunk_resume_data()
+            k1: Term-frequency saturation parameter
+            b: Document-length normalization parameter
+        """
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+
+        # Source labels are indexed with extra weight, so "certifications" finds the certifications chunk
+        documents = [tokenize(f"{chunk['source']} " * SOURCE_WEIGHT + chunk["text"]) for chunk in chunks]
+        self.vocabulary: Dict[str, int] = {}
+        for document in documents:
+            for term in document:
+                self.vocabulary.setdefault(term, len(self.vocabulary))
+
+        term_freqs = np.zeros((len(chunks), max(1, len(self.vocabulary))), dtype=np.float32)
+        for row, document in enumerate(documents):
+            for term in document:
+                term_freqs[row, self.vocabulary[term]] += 1
+
+        doc_lengths = term_freqs.sum(axis=1)
+        average_length = doc_lengths.mean() if len(chunks) else 1.0
+        doc_freqs = (term_freqs > 0).sum(axis=0)
+        self.idf = np.log(1.0 + (len(chunks) - doc_freqs + 0.5) / (doc_freqs + 0.5)).astype(np.float32)
+
+        # Precompute the BM25 term weights so a query is a column gather and a sum
+        norm = self.k1 * (1.0 - self.b + self.b * doc_lengths / max(average_length, 1e-9))
+        self.weights = (term_freqs * (self.k1 + 1.0)) / (term_freqs + norm[:, None]) * self.idf[None, :]
+
+    def scores(self, query: str) -> np.ndarray:
+        """
+        Score every chunk against a query.
+
+        Args:
+            query: The question text
+
+        Returns:
+            Array of BM25 scores, one per chunk
+        """
+        columns = [self.vocabulary[term] for term in set(tokenize(query)) if term in self.vocabulary]
+        if not columns:
+            return np.zeros(len(self.chunks), dtype=np.float32)
+        return self.weights[:, columns].sum(axis=1)
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[Dict[str, str], float]]:
+        """
+        Find the chunks most relevant to a query.
+
+        Args:
+            query: The question text
+            k: Maximum number of results
+
+        Returns:
+            List of (chunk, score) pairs with positive scores, best first
+        """
+        scores = self.scores(query)
+        if not len(scores):
+            return []
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self.chunks[i], float(scores[i])) for i in top if scores[i] > 0]
+
+    def build_context(self, query: str, token_budget: int = 600, k: int = 6) -> str:
+        """
+        Build a prompt section from the chunks relevant to a query.
+
+        Args:
+            query: The question text
+            token_budget: Maximum estimated tokens for the section
+            k: Maximum number of chunks considered
+
+        Returns:
+            Bullet list of relevant chunks, or "" if nothing matched
+        """
+        lines = []
+        used = 0
+        for chunk, _ in self.search(query, k):
+            line = f"- [{chunk['source']}] {chunk['text']}"
+            cost = estimate_tokens(line)
+            if used + cost > token_budget:
+                continue
+            lines.append(line)
+            used += cost
+        return "\n".join(lines)
+
+
+# One index per resume data version for the whole process
+_indexes: Dict[str, BM25Index] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_resume_index(resume_data: Dict[str, Any], data_version: Optional[str] = None) -> BM25Index:
+    """
+    Get the retrieval index for the resume data, building it only when the data changes.
+
+    Args:
+        resume_data: Dictionary containing resume information
+        data_version: Precomputed resume data version (computed if None)
+
+    Returns:
+        The BM25Index for this data version
+    """
+    if data_version is None:
+        # Imported here to avoid a circular import with the registry module
+        from utils.chat_registry import compute_data_version
+        data_version = compute_data_version(resume_data)
+
+    with _indexes_lock:
+        index = _indexes.get(data_version)
+        if index is None:
+            index = BM25Index(chunk_resume_data(resume_data))
+            # Older versions will never be queried again
+            _indexes.clear()
+            _indexes[data_version] = index
+        return index
+
+
+def retrieval_settings() -> Tuple[int, int]:
+    """
+    Read the retrieval budget from the environment.
+
+    Returns:
+        (token_budget, top_k) from CHAT_RETRIEVAL_TOKEN_BUDGET and CHAT_RETRIEVAL_TOP_K
+    """
+    return (
+        int(os.environ.get("CHAT_RETRIEVAL_TOKEN_BUDGET", "600")),
+        int(os.environ.get("CHAT_RETRIEVAL_TOP_K", "6")),
+    )
@@ -0,0 +1,200 @@
+"""
+Offline test doubles for the chat backends, so request shapes and UI flows can be
+checked without network access or an API key.
+"""
+
+import re
+import time
+import threading
+from types import SimpleNamespace
+from typing import List, Dict, Any, Iterator, Optional
+
+from utils.claude_api import USAGE_FIELDS
+
+
+def _estimate_tokens(text: str) -> int:
+    """Rough token estimate (about 4 characters per token)."""
+    return max(1, len(text) // 4)
+
+
+def _system_text(system: Any) -> str:
+    """Flatten a `system` parameter (string or list of text blocks) into text."""
+    if isinstance(system, str):
+        return system
+    return "".join(block.get("text", "") for block in system or [])
+
+
+def verify_prompt_cache_request(request: Dict[str, Any]) -> List[str]:
+    """
+    Check that a recorded Messages API request is set up for prompt caching.
+
+    Args:
+        request: The keyword arguments (or JSON body) of a messages request
+
+    Returns:
+        A list of problems; empty if the request shape is correct
+    """
+    problems = []
+    system = request.get("system")
+    if not isinstance(system, list) or not system:
+        return ["system must be a non-empty list of content blocks"]
+
+    breakpoints = 0
+    for index, block in enumerate(system):
+        if block.get("type") != "text" or not isinstance(block.get("text"), str):
+            problems.append(f"system[{index}] must be a text block")
+        cache_control = block.get("cache_control")
+        if cache_control is not None:
+            breakpoints += 1
+            if cache_control != {"type": "ephemeral"}:
+                problems.append(f"system[{index}] has unsupported cache_control {cache_control!r}")
+
+    if breakpoints == 0:
+        problems.append("no system block is marked with cache_control")
+    if breakpoints > 4:
+        problems.append(f"{breakpoints} cache breakpoints exceed the API limit of 4")
+    if system[0].get("cache_control") is None:
+        problems.append("the static resume context (system[0]) is not cacheable")
+    return problems
+
+
+class _RecordedStream:
+    """Context manager mimicking the SDK's MessageStream for a canned reply."""
+
+    def __init__(self, message: SimpleNamespace):
+        self._message = message
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def close(self):
+        pass
+
+    @property
+    def text_stream(self):
+        for chunk in re.findall(r"\S+\s*", self._message.content[0].text):
+            yield chunk
+
+    def get_final_message(self) -> SimpleNamespace:
+        return self._message
+
+
+class _RecordingMessages:
+    """The `messages` resource of RecordingAnthropicClient."""
+
+    def __init__(self, owner: "RecordingAnthropicClient"):
+        self._owner = owner
+
+    def create(self, **kwargs) -> SimpleNamespace:
+        return self._owner._respond(kwargs)
+
+    def stream(self, **kwargs) -> _RecordedStream:
+        return _RecordedStream(self._owner._respond(kwargs))
+
+
+class RecordingAnthropicClient:
+    """
+    Drop-in replacement for anthropic.Anthropic that records every request and
+    returns a canned reply. Usage mimics the prompt cache: the first request
+    with a given cacheable prefix (the system blocks up to the last
+    cache_control breakpoint) reports cache creation, later ones report reads.
+
+    Example:
+        client = RecordingAnthropicClient()
+        chat = ClaudeChat(api_key="offline", client=client, prompt_caching=True)
+        chat.set_system_prompt(resume_data)
+        chat.get_response("What certifications do you have?")
+        assert verify_prompt_cache_request(client.requests[-1]) == []
+    """
+
+    def __init__(self, reply: str = "This is a recorded test reply."):
+        self.reply = reply
+        self.requests: List[Dict[str, Any]] = []
+        self.messages = _RecordingMessages(self)
+        self._cached_prefixes = set()
+
+    def _respond(self, request: Dict[str, Any]) -> SimpleNamespace:
+        self.requests.append(request)
+
+        usage = {field: 0 for field in USAGE_FIELDS}
+        system = request.get("system")
+        # Only the blocks up to the last cache breakpoint are cached; later ones are regular input
+        breakpoint = 0
+        if isinstance(system, list):
+            for index, block in enumerate(system):
+                if block.get("cache_control"):
+                    breakpoint = index + 1
+        if breakpoint:
+            prefix = _system_text(system[:breakpoint])
+            if prefix in self._cached_prefixes:
+                usage["cache_read_input_tokens"] = _estimate_tokens(prefix)
+            else:
+                usage["cache_creation_input_tokens"] = _estimate_tokens(prefix)
+                self._cached_prefixes.add(prefix)
+            if system[breakpoint:]:
+                usage["input_tokens"] += _estimate_tokens(_system_text(system[breakpoint:]))
+        else:
+            usage["input_tokens"] += _estimate_tokens(_system_text(system))
+
+        for message in request.get("messages", []):
+            content = message.get("content")
+            usage["input_tokens"] += _estimate_tokens(content if isinstance(content, str) else str(content))
+        usage["output_tokens"] = _estimate_tokens(self.reply)
+
+        return SimpleNamespace(
+            content=[SimpleNamespace(type="text", text=self.reply)],
+            usage=SimpleNamespace(**usage),
+            model=request.get("model"),
+            stop_reason="end_turn",
+        )
+
+    @property
+    def last_request(self) -> Optional[Dict[str, Any]]:
+        """The most recent recorded request, or None."""
+        return self.requests[-1] if self.requests else None
+
+
+class StubChatBackend:
+    """
+    Deterministic local chat backend with the same interface as ClaudeChat.
+    Useful for running warm-up jobs and UI flows without network access.
+    """
+
+    def __init__(self, latency: float = 0.0, model: str = "stub"):
+        """
+        Initialize the stub backend.
+
+        Args:
+            latency: Seconds to sleep per request, to simulate upstream latency
+            model: Model name reported to caches and metrics
+        """
+        self.model = model
+        self.latency = latency
+        self.system_prompt = ""
+        self.calls: List[str] = []
+        self._lock = threading.Lock()
+
+    def set_system_prompt(self, resume_context: Dict[str, Any]):
+        """Record a short system prompt derived from the resume context."""
+        name = resume_context.get("personal_info", {}).get("name", "the candidate")
+        self.system_prompt = f"Stub assistant for {name}"
+
+    def create_response(self, user_message: str, **options) -> str:
+        """Return a canned answer that echoes the question (options are ignored)."""
+        with self._lock:
+            self.calls.append(user_message)
+        if self.latency:
+            time.sleep(self.latency)
+        return f"[stub answer] {user_message.strip()}"
+
+    def stream_text(self, user_message: str, **options) -> Iterator[str]:
+        """Stream the canned answer word by word (options are ignored)."""
+        for chunk in re.findall(r"\S+\s*", self.create_response(user_message)):
+            yield chunk
+
+    # The stub never fails, so the non-raising variants are the same calls
+    get_response = create_response
+    stream_response = stream_text
@@ -0,0 +1,503 @@
+"""
+In-process chat telemetry: latency and time-to-first-token histograms, token
+and request counters, exported in the Prometheus text exposition format.
+
+Each chat request is tracked by a RequestRecord bound to the current thread.
+The backend layers that actually produce the answer (live API, mock, answer
+cache) annotate it through note(), so the record ends up labelled with the
+backend that served the request without threading state through every call.
+"""
+
+import os
+import math
+import time
+import logging
+import threading
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from typing import List, Dict, Any, Callable, Iterator, Optional, Sequence, Tuple
+
+from utils.cancellation import current_token
+from utils.chat_base import FriendlyChat
+
+logger = logging.getLogger(__name__)
+
+# Seconds; covers cache hits (sub-millisecond) up to slow multi-retry calls
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Usage fields recorded as chat_tokens_total{kind=...}
+TOKEN_KINDS = {
+    "input_tokens": "input",
+    "output_tokens": "output",
+    "cache_read_input_tokens": "cache_read",
+    "cache_creation_input_tokens": "cache_write",
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(**labels: str) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: Labels, extra: Sequence[Tuple[str, str]] = ()) -> str:
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram, plus a window of recent samples for exact quantiles.
+    """
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS, window: int = 2048):
+        """
+        Initialize the histogram.
+
+        Args:
+            buckets: Upper bounds of the buckets, ascending (+Inf is implied)
+            window: Number of recent samples kept for quantiles
+        """
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.samples: deque = deque(maxlen=window)
+
+    def observe(self, value: float):
+        """Record one sample."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.samples.append(value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Compute a quantile over the recent samples.
+
+        Args:
+            q: Quantile between 0 and 1
+
+        Returns:
+            The quantile (nearest-rank), or None if there are no samples
+        """
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+class MetricsRegistry:
+    """
+    Thread-safe set of labelled counters and histograms.
+    """
+
+    def __init__(self):
+        self._help: Dict[str, str] = {}
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name: str, help_text: str):
+        """Set the HELP text of a metric."""
+        self._help[name] = help_text
+
+    def inc(self, name: str, value: float = 1.0, **labels: str):
+        """
+        Increment a counter.
+
+        Args:
+            name: Metric name
+            value: Amount to add
+            **labels: Label values
+        """
+        key = _labels(**labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels: str):
+        """
+        Record a histogram sample.
+
+        Args:
+            name: Metric name
+            value: The sample (seconds for latencies)
+            **labels: Label values
+        """
+        key = _labels(**labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(value)
+
+    def counter_value(self, name: str, **labels: str) -> float:
+        """Get the current value of one counter series (0 if never incremented)."""
+        with self._lock:
+            return self._counters.get(name, {}).get(_labels(**labels), 0.0)
+
+    def quantiles(self, name: str, **labels: str) -> Dict[str, Optional[float]]:
+        """
+        Get p50/p95/p99 for a histogram, merging every series that matches the labels.
+
+        Args:
+            name: Metric name
+            **labels: Label values to filter on (omitted labels match anything)
+
+        Returns:
+            Dictionary like {"p50": ..., "p95": ..., "p99": ..., "count": ...}
+        """
+        wanted = set(_labels(**labels))
+        merged = Histogram()
+        with self._lock:
+            for key, histogram in self._histograms.get(name, {}).items():
+                if wanted <= set(key):
+                    merged.samples.extend(histogram.samples)
+                    merged.count += histogram.count
+        result = {f"p{int(q * 100)}": merged.quantile(q) for q in QUANTILES}
+        result["count"] = merged.count
+        return result
+
+    def render_prometheus(self) -> str:
+        """
+        Render every metric in the Prometheus text exposition format.
+
+        Histograms also get a "<name>_quantile" gauge with p50/p95/p99 over the
+        recent sample window.
+
+        Returns:
+            The exposition text
+        """
+        lines: List[str] = []
+        with self._lock:
+            for name in sorted(self._counters):
+                lines.append(f"# HELP {name} {self._help.get(name, name)}")
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in sorted(self._counters[name].items()):
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+            for name in sorted(self._histograms):
+                series = sorted(self._histograms[name].items())
+                lines.append(f"# HELP {name} {self._help.get(name, name)}")
+                lines.append(f"# TYPE {name} histogram")
+                for labels, histogram in series:
+                    cumulative = 0
+                    for bound, count in zip(list(histogram.buckets) + [math.inf], histogram.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(labels, [('le', _format_value(bound))])} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(histogram.sum)}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+
+                lines.append(f"# HELP {name}_quantile Quantiles of {name} over recent requests")
+                lines.append(f"# TYPE {name}_quantile gauge")
+                for labels, histogram in series:
+                    for q in QUANTILES:
+                        value = histogram.quantile(q)
+                        if value is not None:
+                            lines.append(f"{name}_quantile{_format_labels(labels, [('quantile', str(q))])} "
+                                         f"{_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        """Drop every recorded value."""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+_metrics = MetricsRegistry()
+_metrics.describe("chat_requests_total", "Chat requests by serving backend, model and outcome")
+_metrics.describe("chat_errors_total", "Failed chat requests by error class")
+_metrics.describe("chat_tokens_total", "Tokens used by chat requests, by model and kind")
+_metrics.describe("chat_latency_seconds", "Total chat request latency by backend and routed model")
+_metrics.describe("chat_ttft_seconds", "Time to the first streamed chunk of a chat answer by backend and routed model")
+_metrics.describe("chat_rate_limited_total", "Chat requests refused by a rate limit, by limit scope")
+_metrics.describe("chat_hedges_total", "Hedged chat requests, by which request produced the answer")
+_metrics.describe("chat_cancelled_total", "Chat generations cancelled before finishing, by reason")
+_metrics.describe("chat_admission_rejected_total", "Upstream chat requests refused by the admission queue, by reason")
+_metrics.describe("chat_admission_wait_seconds", "Time upstream chat requests waited in the admission queue")
+_metrics.describe("chat_spend_usd_total", "Estimated upstream API spend in US dollars, by model")
+_metrics.describe("chat_budget_degraded_total", "Chat requests answered locally because of the daily budget, by budget level")
+_metrics.describe("chat_shed_level_changes_total", "Latency SLO load-shedding level changes, by new level")
+_metrics.describe("chat_shed_total", "Chat requests answered locally to hold the latency SLO, by source")
+_metrics.describe("chat_prefetch_total", "Speculative follow-up prefetches and lookups, by outcome")
+_metrics.describe("chat_http_requests_total", "HTTP requests to the Anthropic API, by whether they opened a new connection or reused one")
+
+
+def get_metrics() -> MetricsRegistry:
+    """Get the process-wide metrics registry."""
+    return _metrics
+
+
+class RequestRecord:
+    """
+    Telemetry for one chat request, filled in while it runs.
+    """
+
+    def __init__(self, model: str):
+        self.model = model
+        self.backend: Optional[str] = None
+        self.usage: Dict[str, int] = {}
+        self.error: Optional[str] = None
+        self.cancelled = False
+        self.started_at = time.perf_counter()
+        self.first_chunk_at: Optional[float] = None
+        # Hedged requests annotate one record from two threads
+        self.lock = threading.Lock()
+
+    def first_chunk(self):
+        """Mark the arrival of the first streamed chunk (later calls are ignored)."""
+        if self.first_chunk_at is None:
+            self.first_chunk_at = time.perf_counter()
+
+
+_local = threading.local()
+
+
+def current_record() -> Optional[RequestRecord]:
+    """Get the request record bound to this thread, if a request is being tracked."""
+    return getattr(_local, "record", None)
+
+
+def note(backend: Optional[str] = None, usage: Optional[Dict[str, int]] = None,
+         error: Optional[str] = None, model: Optional[str] = None):
+    """
+    Annotate the request being tracked on this thread (no-op when none is).
+
+    Args:
+        backend: Which backend served the answer ("live", "mock", "cache", "coalesced",
+            "faq", "prefetch")
+        usage: Token usage from usage_to_dict(), added to the record
+        error: Error class name, for failures turned into a friendly message instead of raised
+        model: The model actually called, when routing picked a different one
+    """
+    record = current_record()
+    if record is None:
+        return
+    with record.lock:
+        if model is not None:
+            record.model = model
+        if backend is not None:
+            record.backend = backend
+        if error is not None:
+            record.error = error
+        if usage:
+            for field, value in usage.items():
+                record.usage[field] = record.usage.get(field, 0) + value
+
+
+@contextmanager
+def bind_record(record: Optional[RequestRecord]) -> Iterator[None]:
+    """
+    Bind a request record to the current thread, so work done on a helper
+    thread on behalf of a tracked request is annotated on that request.
+
+    Args:
+        record: The record from current_record() on the requesting thread (None binds nothing)
+    """
+    previous = current_record()
+    _local.record = record
+    try:
+        yield
+    finally:
+        _local.record = previous
+
+
+# Called with every finished record, its latency and outcome (see add_listener)
+_listeners: List[Callable[[RequestRecord, float, str], None]] = []
+
+
+def add_listener(listener: Callable[[RequestRecord, float, str], None]):
+    """
+    Call a function with every finished request (e.g. to track latency SLOs).
+
+    Args:
+        listener: Function taking the RequestRecord, its latency in seconds and
+            its outcome ("ok", "error" or "cancelled"); it must be fast and thread-safe
+    """
+    _listeners.append(listener)
+
+
+def finish_record(record: RequestRecord):
+    """
+    Publish a finished request record to the metrics registry.
+
+    Args:
+        record: The finished record
+    """
+    latency = time.perf_counter() - record.started_at
+    backend = record.backend or "unknown"
+    # Errors raised by aborting a cancelled stream aren't failures
+    if record.cancelled:
+        outcome = "cancelled"
+    else:
+        outcome = "error" if record.error else "ok"
+
+    _metrics.inc("chat_requests_total", backend=backend, model=record.model, outcome=outcome)
+    # Split by the routed model too, so each model tier's latency can be compared
+    _metrics.observe("chat_latency_seconds", latency, backend=backend, model=record.model)
+    if record.first_chunk_at is not None:
+        _metrics.observe("chat_ttft_seconds", record.first_chunk_at - record.started_at,
+                         backend=backend, model=record.model)
+    if record.error and not record.cancelled:
+        _metrics.inc("chat_errors_total", error=record.error)
+    for field, kind in TOKEN_KINDS.items():
+        if record.usage.get(field):
+            _metrics.inc("chat_tokens_total", record.usage[field], model=record.model, kind=kind)
+    for listener in _listeners:
+        try:
+            listener(record, latency, outcome)
+        except Exception as e:
+            logger.debug(f"Telemetry listener failed: {str(e)}")
+
+
+@contextmanager
+def track_request(model: str) -> Iterator[RequestRecord]:
+    """
+    Track one chat request on the current thread.
+
+    Exceptions are recorded by class name and re-raised. Requests whose
+    cancellation token (see utils.cancellation) was cancelled are recorded as
+    cancelled. Nested tracking on the same thread reuses the outer record.
+
+    Args:
+        model: The model the request is for
+
+    Yields:
+        The RequestRecord
+    """
+    outer = current_record()
+    if outer is not None:
+        yield outer
+        return
+
+    record = RequestRecord(model)
+    _local.record = record
+    try:
+        yield record
+    except BaseException as e:
+        if not isinstance(e, GeneratorExit):
+            record.error = type(e).__name__
+        raise
+    finally:
+        _local.record = None
+        token = current_token()
+        record.cancelled = token is not None and token.cancelled
+        finish_record(record)
+
+
+class InstrumentedChat(FriendlyChat):
+    """
+    Wraps a chat backend and records telemetry for every request.
+    """
+
+    def __init__(self, backend: Any):
+        """
+        Initialize the wrapper.
+
+        Args:
+            backend: Any chat backend (ClaudeChat, CachedChat, ResilientChat, ...)
+        """
+        self.backend = backend
+
+    @property
+    def model(self) -> str:
+        return self.backend.model
+
+    def set_system_prompt(self, resume_context: Dict[str, Any]):
+        """Set the system prompt on the wrapped backend."""
+        self.backend.set_system_prompt(resume_context)
+
+    def create_response(self, user_message: str, **options) -> str:
+        """
+        Get an answer from the wrapped backend, raising on errors.
+
+        Args:
+            user_message: The message from the user/employer
+            **options: Passed through to the backend
+
+        Returns:
+            The answer as a string
+        """
+        with track_request(self.model):
+            return self.backend.create_response(user_message, **options)
+
+    def stream_text(self, user_message: str, **options) -> Iterator[str]:
+        """
+        Stream an answer from the wrapped backend, raising on errors.
+
+        Args:
+            user_message: The message from the user/employer
+            **options: Passed through to the backend
+
+        Yields:
+            Text deltas of the answer, in order
+        """
+        # The generator runs in whichever thread consumes it, so the record is bound there
+        with track_request(self.model) as record:
+            for text in self.backend.stream_text(user_message, **options):
+                record.first_chunk()
+                yield text
+
+
+def write_metrics_file(path: str):
+    """
+    Write the current metrics to a file atomically (for a textfile collector to scrape).
+
+    Args:
+        path: Destination file path
+    """
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as handle:
+        handle.write(_metrics.render_prometheus())
+    os.replace(temp_path, path)
+
+
+_exporter: Optional[threading.Thread] = None
+_exporter_lock = threading.Lock()
+
+
+def start_metrics_export() -> Optional[threading.Thread]:
+    """
+    Periodically dump metrics to CHAT_METRICS_FILE every CHAT_METRICS_INTERVAL seconds.
+
+    Runs once per process; does nothing if CHAT_METRICS_FILE is not set.
+
+    Returns:
+        The exporter thread, or None if export is disabled
+    """
+    global _exporter
+    path = os.environ.get("CHAT_METRICS_FILE", "")
+    if not path:
+        return None
+
+    interval = float(os.environ.get("CHAT_METRICS_INTERVAL", "15"))
+
+    def export_loop():
+        while True:
+            try:
+                write_metrics_file(path)
+            except OSError as e:
+                logger.warning(f"Could not write chat metrics to {path}: {str(e)}")
+            time.sleep(interval)
+
+    with _exporter_lock:
+        if _exporter is None:
+            _exporter = threading.Thread(target=export_loop, name="chat-metrics-export", daemon=True)
+            _exporter.start()
+            logger.info(f"Exporting chat metrics to {path} every {interval:g}s")
+        return _exporter
@@ -0,0 +1,483 @@
+"""
+Persistent daily token and spend ledger for the shared Anthropic API key.
+
+Every live response's usage is added to a SQLite table keyed by (UTC day,
+model), with its estimated cost. Optional soft and hard daily caps, in
+tokens and/or US dollars, degrade the chatbot instead of letting one busy
+day burn the month's budget:
+
+- past the soft cap, questions are routed to a cheaper model with a smaller
+  output cap, and follow-up questions are answered from the answer cache
+  when possible;
+- past the hard cap, every answer comes from the local mock backend.
+
+The ledger can be inspected with:
+
+    python -m utils.usage_ledger
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from utils.claude_api import USAGE_FIELDS
+from utils.chat_base import FriendlyChat
+from utils import telemetry
+
+logger = logging.getLogger(__name__)
+
+# USD per million (input, output) tokens, matched by model-name prefix
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "claude-3-haiku": (0.25, 1.25),
+    "claude-3-5-haiku": (0.80, 4.00),
+    "claude-haiku-4": (1.00, 5.00),
+    "claude-3-5-sonnet": (3.00, 15.00),
+    "claude-3-7-sonnet": (3.00, 15.00),
+    "claude-sonnet-4": (3.00, 15.00),
+    "claude-3-opus": (15.00, 75.00),
+    "claude-opus-4": (15.00, 75.00),
+}
+# Unknown models are priced like Sonnet, so the spend estimate errs high
+DEFAULT_PRICE = (3.00, 15.00)
+# Prompt-cache writes and reads, relative to the input price
+CACHE_WRITE_MULTIPLIER = 1.25
+CACHE_READ_MULTIPLIER = 0.1
+
+BUDGET_LEVELS = ("ok", "soft", "hard")
+
+
+class BudgetExceeded(Exception):
+    """Raised when a request would call the API past the hard daily cap."""
+
+
+def model_price(model: str) -> Tuple[float, float]:
+    """
+    Look up the price of a model.
+
+    Args:
+        model: The model name (dated or alias)
+
+    Returns:
+        (input, output) USD per million tokens
+    """
+    matches = [prefix for prefix in MODEL_PRICES if model.startswith(prefix)]
+    return MODEL_PRICES[max(matches, key=len)] if matches else DEFAULT_PRICE
+
+
+def usage_cost(model: str, usage: Dict[str, int]) -> float:
+    """
+    Estimate the cost of one response.
+
+    Args:
+        model: The model that answered
+        usage: Usage dict with every field in USAGE_FIELDS
+
+    Returns:
+        Cost in US dollars
+    """
+    input_price, output_price = model_price(model)
+    return (
+        usage["input_tokens"] * input_price
+        + usage["cache_creation_input_tokens"] * input_price * CACHE_WRITE_MULTIPLIER
+        + usage["cache_read_input_tokens"] * input_price * CACHE_READ_MULTIPLIER
+        + usage["output_tokens"] * output_price
+    ) / 1_000_000
+
+
+def billable_tokens(usage: Dict[str, int]) -> int:
+    """Count the tokens the token caps apply to (cache reads are left to the spend caps)."""
+    return usage["input_tokens"] + usage["cache_creation_input_tokens"] + usage["output_tokens"]
+
+
+def today() -> str:
+    """Get the ledger's current day (UTC, YYYY-MM-DD)."""
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+def _empty_totals() -> Dict[str, Any]:
+    totals: Dict[str, Any] = {"requests": 0, "tokens": 0, "cost_usd": 0.0}
+    totals.update({field: 0 for field in USAGE_FIELDS})
+    return totals
+
+
+class UsageLedger:
+    """
+    Daily usage per model in SQLite, with soft and hard caps.
+    """
+
+    def __init__(self, path: str = ":memory:", soft_tokens: int = 0, hard_tokens: int = 0,
+                 soft_usd: float = 0.0, hard_usd: float = 0.0,
+                 soft_model: str = "claude-3-haiku-20240307", soft_max_tokens: int = 300,
+                 refresh_interval: float = 10.0):
+        """
+        Open (or create) the ledger.
+
+        Args:
+            path: SQLite database file (":memory:" keeps the ledger in this process only)
+            soft_tokens: Daily tokens after which answers are degraded (0 = no cap)
+            hard_tokens: Daily tokens after which the API is no longer called (0 = no cap)
+            soft_usd: Daily spend after which answers are degraded (0 = no cap)
+            hard_usd: Daily spend after which the API is no longer called (0 = no cap)
+            soft_model: Model used past the soft cap
+            soft_max_tokens: Output-token cap past the soft cap
+            refresh_interval: Seconds between re-reads of today's totals, which picks
+                up usage recorded by other server processes sharing the file
+        """
+        self.path = path
+        self.soft_tokens = soft_tokens
+        self.hard_tokens = hard_tokens
+        self.soft_usd = soft_usd
+        self.hard_usd = hard_usd
+        self.soft_model = soft_model
+        self.soft_max_tokens = soft_max_tokens
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._day: Optional[str] = None
+        self._totals = _empty_totals()
+        self._loaded_at = 0.0
+        self._level = "ok"
+
+        try:
+            self._db = self._open(path)
+        except (OSError, sqlite3.Error) as e:
+            # A read-only deployment still gets caps, just not across restarts
+            logger.warning(f"Could not open usage ledger {path}, keeping usage in memory: {str(e)}")
+            self.path = ":memory:"
+            self._db = self._open(self.path)
+
+    @staticmethod
+    def _open(path: str) -> sqlite3.Connection:
+        """Connect to the database and create the usage table if needed."""
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        db = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+        columns = ", ".join(f"{field} INTEGER NOT NULL DEFAULT 0" for field in USAGE_FIELDS)
+        with db:
+            if path != ":memory:":
+                # Several server processes may share the file
+                db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                f"CREATE TABLE IF NOT EXISTS usage (day TEXT NOT NULL, model TEXT NOT NULL, "
+                f"requests INTEGER NOT NULL DEFAULT 0, {columns}, cost_usd REAL NOT NULL DEFAULT 0, "
+                f"PRIMARY KEY (day, model))"
+            )
+        return db
+
+    @classmethod
+    def from_env(cls) -> "UsageLedger":
+        """
+        Build a ledger from CHAT_USAGE_DB and CHAT_BUDGET_* environment variables.
+
+        The CHAT_USAGE_DB file is only used when a cap is set; otherwise (or if
+        CHAT_USAGE_DB is empty) usage is kept in memory.
+        """
+        caps = {
+            "soft_tokens": int(os.environ.get("CHAT_BUDGET_SOFT_TOKENS", "0")),
+            "hard_tokens": int(os.environ.get("CHAT_BUDGET_HARD_TOKENS", "0")),
+            "soft_usd": float(os.environ.get("CHAT_BUDGET_SOFT_USD", "0")),
+            "hard_usd": float(os.environ.get("CHAT_BUDGET_HARD_USD", "0")),
+        }
+        path = os.environ.get("CHAT_USAGE_DB", "")
+        return cls(
+            path=path if path and any(caps.values()) else ":memory:",
+            soft_model=os.environ.get("CHAT_BUDGET_SOFT_MODEL", "claude-3-haiku-20240307"),
+            soft_max_tokens=int(os.environ.get("CHAT_BUDGET_SOFT_MAX_TOKENS", "300")),
+            **caps,
+        )
+
+    def record(self, model: str, usage: Dict[str, int]):
+        """
+        Add one response's usage to today's row for its model.
+
+        Args:
+            model: The model that answered
+            usage: Usage dict with every field in USAGE_FIELDS
+        """
+        cost = usage_cost(model, usage)
+        day = today()
+        updates = ", ".join(f"{field} = {field} + excluded.{field}" for field in USAGE_FIELDS)
+        with self._lock:
+            try:
+                with self._db:
+                    self._db.execute(
+                        f"INSERT INTO usage (day, model, requests, {', '.join(USAGE_FIELDS)}, cost_usd) "
+                        f"VALUES (?, ?, 1, {', '.join('?' for _ in USAGE_FIELDS)}, ?) "
+                        f"ON CONFLICT (day, model) DO UPDATE SET requests = requests + 1, {updates}, "
+                        f"cost_usd = cost_usd + excluded.cost_usd",
+                        (day, model, *(usage[field] for field in USAGE_FIELDS), cost),
+                    )
+            except sqlite3.Error as e:
+                # Losing a row is better than failing the visitor's answer
+                logger.warning(f"Could not record usage in {self.path}: {str(e)}")
+            if self._day == day:
+                self._totals["requests"] += 1
+                for field in USAGE_FIELDS:
+                    self._totals[field] += usage[field]
+                self._totals["tokens"] += billable_tokens(usage)
+                self._totals["cost_usd"] += cost
+        telemetry.get_metrics().inc("chat_spend_usd_total", cost, model=model)
+
+    def _read(self, day: str) -> List[Dict[str, Any]]:
+        """Read a day's rows. Must be called with the lock held."""
+        cursor = self._db.execute(
+            f"SELECT model, requests, {', '.join(USAGE_FIELDS)}, cost_usd FROM usage WHERE day = ? ORDER BY model",
+            (day,),
+        )
+        names = [column[0] for column in cursor.description]
+        return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+    def by_model(self, day: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Get a day's usage per model.
+
+        Args:
+            day: The day (YYYY-MM-DD, defaults to today)
+
+        Returns:
+            One dictionary per model with requests, token counts and cost_usd
+        """
+        with self._lock:
+            return self._read(day or today())
+
+    def totals(self, day: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get a day's usage across all models.
+
+        Args:
+            day: The day (YYYY-MM-DD, defaults to today)
+
+        Returns:
+            Dictionary with requests, each token count, billable tokens and cost_usd
+        """
+        totals = _empty_totals()
+        for row in self.by_model(day):
+            totals["requests"] += row["requests"]
+            for field in USAGE_FIELDS:
+                totals[field] += row[field]
+            totals["tokens"] += billable_tokens(row)
+            totals["cost_usd"] += row["cost_usd"]
+        return totals
+
+    def _today_totals(self) -> Dict[str, Any]:
+        """Get today's totals, re-reading them when the day changes or they are stale."""
+        day = today()
+        now = time.monotonic()
+        with self._lock:
+            if self._day == day and now - self._loaded_at < self.refresh_interval:
+                return dict(self._totals)
+        try:
+            totals = self.totals(day)
+        except sqlite3.Error as e:
+            logger.warning(f"Could not read usage from {self.path}: {str(e)}")
+            with self._lock:
+                return dict(self._totals) if self._day == day else _empty_totals()
+        with self._lock:
+            self._day, self._totals, self._loaded_at = day, totals, now
+            return dict(totals)
+
+    @property
+    def enabled(self) -> bool:
+        return any((self.soft_tokens, self.hard_tokens, self.soft_usd, self.hard_usd))
+
+    def level(self) -> str:
+        """
+        Check today's usage against the caps, logging when the level changes.
+
+        Returns:
+            "ok", "soft" (past a soft cap) or "hard" (past a hard cap)
+        """
+        if not self.enabled:
+            return "ok"
+        totals = self._today_totals()
+
+        def reached(cap: float, value: float) -> bool:
+            return cap > 0 and value >= cap
+
+        if reached(self.hard_tokens, totals["tokens"]) or reached(self.hard_usd, totals["cost_usd"]):
+            level = "hard"
+        elif reached(self.soft_tokens, totals["tokens"]) or reached(self.soft_usd, totals["cost_usd"]):
+            level = "soft"
+        else:
+            level = "ok"
+
+        if level != self._level:
+            self._level = level
+            log = logger.warning if level != "ok" else logger.info
+            log(f"Daily API budget level is now {level}: {totals['tokens']} tokens, "
+                f"${totals['cost_usd']:.4f} spent today")
+        return level
+
+    def apply_budget(self, decision: Any) -> Any:
+        """
+        Adjust a routing decision to today's budget level.
+
+        Args:
+            decision: The RoutingDecision for a question
+
+        Returns:
+            The decision, switched to the soft-cap model and output cap past the soft cap
+
+        Raises:
+            BudgetExceeded: Past the hard cap
+        """
+        level = self.level()
+        if level == "hard":
+            raise BudgetExceeded("Daily API budget exhausted")
+        if level == "soft":
+            decision.model = self.soft_model
+            decision.max_tokens = min(decision.max_tokens, self.soft_max_tokens)
+            decision.reason = f"{decision.reason}; over the soft budget"
+        return decision
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report today's usage against the caps.
+
+        Returns:
+            Dictionary with the level, today's totals and the caps
+        """
+        return {
+            "level": self.level(),
+            "day": today(),
+            **self._today_totals(),
+            "soft_tokens": self.soft_tokens,
+            "hard_tokens": self.hard_tokens,
+            "soft_usd": self.soft_usd,
+            "hard_usd": self.hard_usd,
+        }
+
+
+def budget_notice() -> str:
+    """Build the in-chat notice shown when the daily API budget is used up."""
+    return ("The chatbot has reached its daily usage limit, so here's a quick answer from "
+            "Kelby's profile. Full answers will be back tomorrow.\n\n")
+
+
+class BudgetedChat(FriendlyChat):
+    """
+    Wraps a live chat client with the daily budget: past the soft cap, follow-up
+    questions are answered from the answer cache when possible; past the hard
+    cap, answers come from the fallback with a notice.
+    """
+
+    def __init__(self, backend: Any, fallback: Any, cached_answer: Optional[Callable[[str], Optional[str]]] = None,
+                 ledger: Optional[UsageLedger] = None):
+        """
+        Initialize the wrapper.
+
+        Args:
+            backend: The live chat client
+            fallback: Backend used past the hard cap (the registry's mock)
+            cached_answer: Looks up the cached answer to a standalone question, if any
+                (e.g. ResilientChat.cached_answer)
+            ledger: The UsageLedger (defaults to the process-wide one)
+        """
+        self.backend = backend
+        self.fallback = fallback
+        self.cached_answer = cached_answer
+        self.ledger = ledger or get_usage_ledger()
+
+    @property
+    def model(self) -> str:
+        return self.backend.model
+
+    def set_system_prompt(self, resume_context: Dict[str, Any]):
+        """Set the system prompt on both the backend and the fallback."""
+        self.backend.set_system_prompt(resume_context)
+        self.fallback.set_system_prompt(resume_context)
+
+    def local_answer(self, user_message: str, **options) -> Optional[str]:
+        """
+        Answer without the API if today's budget calls for it.
+
+        Args:
+            user_message: The message from the user/employer
+            **options: The request options
+
+        Returns:
+            The local answer, or None to ask the backend
+        """
+        level = self.ledger.level()
+        if level == "hard":
+            telemetry.get_metrics().inc("chat_budget_degraded_total", level=level)
+            return budget_notice() + self.fallback.get_response(user_message)
+        if level == "soft" and options.get("history") and self.cached_answer is not None:
+            # Standalone questions already check the cache; follow-ups usually don't
+            answer = self.cached_answer(user_message)
+            if answer is not None:
+                telemetry.get_metrics().inc("chat_budget_degraded_total", level=level)
+                return answer
+        return None
+
+    def create_response(self, user_message: str, **options) -> str:
+        """
+        Get an answer within today's budget (raising on errors).
+
+        Args:
+            user_message: The message from the user/employer
+            **options: Passed through to the backend
+
+        Returns:
+            The answer as a string
+        """
+        answer = self.local_answer(user_message, **options)
+        if answer is not None:
+            return answer
+        try:
+            return self.backend.create_response(user_message, **options)
+        except BudgetExceeded:
+            # The hard cap was reached since the check above
+            return budget_notice() + self.fallback.get_response(user_message)
+
+    def stream_text(self, user_message: str, **options) -> Iterator[str]:
+        """
+        Stream an answer within today's budget (raising on errors).
+
+        Args:
+            user_message: The message from the user/employer
+            **options: Passed through to the backend
+
+        Yields:
+            Text deltas of the answer, in order
+        """
+        answer = self.local_answer(user_message, **options)
+        if answer is not None:
+            yield answer
+            return
+        try:
+            for text in self.backend.stream_text(user_message, **options):
+                yield text
+        except BudgetExceeded:
+            # Raised before the first chunk, when the hard cap was reached since the check above
+            yield budget_notice() + self.fallback.get_response(user_message)
+
+
+# Shared ledger for the whole Streamlit server process, opened on first use
+_usage_ledger: Optional[UsageLedger] = None
+_usage_ledger_lock = threading.Lock()
+
+
+def get_usage_ledger() -> UsageLedger:
+    """Get the process-wide usage ledger."""
+    global _usage_ledger
+    with _usage_ledger_lock:
+        if _usage_ledger is None:
+            _usage_ledger = UsageLedger.from_env()
+        return _usage_ledger
+
+
+if __name__ == "__main__":
+    import sys
+
+    ledger = get_usage_ledger()
+    day = sys.argv[1] if len(sys.argv) > 1 else today()
+    for row in ledger.by_model(day):
+        print(f"{row['model']:32} {row['requests']:6} requests  in={row['input_tokens']} "
+              f"out={row['output_tokens']} cache_write={row['cache_creation_input_tokens']} "
+              f"cache_read={row['cache_read_input_tokens']}  ${row['cost_usd']:.4f}")
+    totals = ledger.totals(day)
+    print(f"{day}: {totals['tokens']} billable tokens, ${totals['cost_usd']:.4f}")
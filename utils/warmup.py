@@ -0,0 +1,166 @@
+"""
+Background warm-up of the answer cache for quick questions and FAQs, so the
+first visitor to click a quick question gets an instant answer.
+"""
+
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from utils.response_cache import normalize_question
+
+logger = logging.getLogger(__name__)
+
+
+def collect_warmup_questions(question_lists: Iterable[Iterable[str]],
+                             chatbot_context: Optional[Dict[str, Any]] = None) -> List[str]:
+    """
+    Gather the fixed questions to warm, de-duplicated by their normalized form.
+
+    Args:
+        question_lists: Lists of quick-question button labels
+        chatbot_context: The chatbot_context dict; its FAQ questions are included
+
+    Returns:
+        The unique questions in first-seen order
+    """
+    questions = [question for question_list in question_lists for question in question_list]
+    if chatbot_context:
+        questions += [faq["question"] for faq in chatbot_context.get("frequently_asked_questions", [])]
+
+    seen = set()
+    unique = []
+    for question in questions:
+        normalized = normalize_question(question)
+        if normalized and normalized not in seen:
+            seen.add(normalized)
+            unique.append(question)
+    return unique
+
+
+class WarmupJob:
+    """
+    Generates answers for a list of questions in small concurrent batches and
+    stores them in the chat's answer cache.
+    """
+
+    def __init__(self, chat: Any, questions: List[str], batch_size: int = 4):
+        """
+        Initialize the warm-up job.
+
+        Args:
+            chat: A CachedChat whose cache should be filled
+            questions: Questions to answer
+            batch_size: Number of questions requested concurrently per batch
+        """
+        self.chat = chat
+        self.questions = list(questions)
+        self.batch_size = max(1, batch_size)
+        self.answered: List[str] = []
+        self.skipped: List[str] = []
+        self.errors: Dict[str, str] = {}
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def done(self) -> bool:
+        return self.finished_at is not None
+
+    def run(self):
+        """Answer every question that isn't already cached, one batch at a time."""
+        self.started_at = time.monotonic()
+        pending = []
+        for question in self.questions:
+            if self.chat.cache_key(question) in self.chat.cache:
+                self.skipped.append(question)
+            else:
+                pending.append(question)
+
+        with ThreadPoolExecutor(max_workers=self.batch_size, thread_name_prefix="chat-warmup") as pool:
+            for start in range(0, len(pending), self.batch_size):
+                batch = pending[start:start + self.batch_size]
+                futures = {question: pool.submit(self.chat.create_response, question) for question in batch}
+                for question, future in futures.items():
+                    try:
+                        future.result()
+                        self.answered.append(question)
+                    except Exception as e:
+                        self.errors[question] = str(e)
+                        logger.warning(f"Warm-up failed for {question!r}: {str(e)}")
+
+        self.finished_at = time.monotonic()
+        logger.info(
+            f"Chat warm-up for model={self.chat.model} data_version={self.chat.data_version}: "
+            f"{len(self.answered)} answered, {len(self.skipped)} already cached, "
+            f"{len(self.errors)} failed in {self.finished_at - self.started_at:.1f}s"
+        )
+
+    def start(self) -> "WarmupJob":
+        """Run the job on a daemon thread and return immediately."""
+        self._thread = threading.Thread(target=self.run, name="chat-warmup", daemon=True)
+        self._thread.start()
+        return self
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until the job finishes.
+
+        Args:
+            timeout: Maximum seconds to wait
+
+        Returns:
+            True if the job finished
+        """
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.done
+
+
+# Warm-up jobs by (model, data version), so each version is warmed once per process
+_jobs: Dict[Tuple[str, str], WarmupJob] = {}
+_jobs_lock = threading.Lock()
+
+
+def start_warmup(chat: Any, questions: List[str], batch_size: int = None,
+                 refresh_after: float = None) -> WarmupJob:
+    """
+    Start a background warm-up unless one already ran for this model and data version.
+
+    Args:
+        chat: A CachedChat whose cache should be filled
+        questions: Questions to answer
+        batch_size: Concurrent requests per batch (defaults to CHAT_WARMUP_BATCH_SIZE or 4)
+        refresh_after: Seconds after which a finished job is re-run (defaults to the cache TTL)
+
+    Returns:
+        The running or most recent WarmupJob for this model and data version
+    """
+    if batch_size is None:
+        batch_size = int(os.environ.get("CHAT_WARMUP_BATCH_SIZE", "4"))
+    if refresh_after is None:
+        refresh_after = chat.cache.ttl_seconds
+
+    key = (chat.model, chat.data_version)
+    with _jobs_lock:
+        job = _jobs.get(key)
+        if job is not None and (not job.done or time.monotonic() - job.finished_at < refresh_after):
+            return job
+        job = WarmupJob(chat, questions, batch_size=batch_size)
+        _jobs[key] = job
+    return job.start()
+
+
+if __name__ == "__main__":
+    # Offline demo: warm a fresh cache using the local stub backend
+    from components.chatbot import WARMUP_QUESTIONS
+    from utils.response_cache import CachedChat, ResponseCache
+    from utils.stubs import StubChatBackend
+
+    logging.basicConfig(level=logging.INFO)
+    chat = CachedChat(StubChatBackend(latency=0.2), ResponseCache(), "local")
+    start_warmup(chat, WARMUP_QUESTIONS).wait()
+    print(chat.cache.stats())